@@ -0,0 +1,150 @@
+"""Measure the bytes and latency tradeoff of compressing task list pages.
+
+Each list page is served through the CompressionMiddleware with every available content coding, identity being the
+uncompressed baseline. The server side cost is measured in process, the transfer time is estimated from the response
+size at the bandwidth of a slow mobile network, so the sum shows what a client on such a network waits for.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.compression [--page-sizes 10,50,100] [--requests 2000] [--kbps 400]
+        [--output PATH]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import FastAPI, Response
+from starlette.types import Message, Scope
+
+os.environ.setdefault("DB_TASKS_TABLE", "benchmark-tasks")
+
+from app.compression import CompressionMiddleware, available_encodings
+from app.responses import ModelResponse
+from app.tasks.common import task_reads
+from app.tasks.models import Task
+from app.tasks.schemas import TaskPage
+
+from .harness import RESULTS_DIR, Measurement, ScenarioResult, print_results, summarize, write_report
+
+WARMUP_REQUESTS = 100
+# "slow 3G" in the browser network throttling presets
+DEFAULT_KBPS = 400
+
+
+def _build_app(tasks: list[Task]) -> FastAPI:
+    bench_app = FastAPI()
+    bench_app.add_middleware(CompressionMiddleware)
+
+    @bench_app.get("/tasks", response_model=TaskPage)
+    async def list_tasks() -> Response:
+        return ModelResponse(TaskPage.model_construct(items=task_reads(tasks), next_cursor=None))
+
+    return bench_app
+
+
+async def _request(bench_app: FastAPI, encoding: str) -> bytes:
+    scope: Scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/tasks",
+        "raw_path": b"/tasks",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", encoding.encode("ascii"))],
+        "server": ("benchmark", 80),
+        "client": ("benchmark", 1024),
+    }
+    body = bytearray()
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await bench_app(scope, receive, send)
+    return bytes(body)
+
+
+async def _run(bench_app: FastAPI, encoding: str, requests: int) -> Measurement:
+    for _ in range(WARMUP_REQUESTS):
+        await _request(bench_app, encoding)
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_start = time.perf_counter()
+        await _request(bench_app, encoding)
+        latencies.append(time.perf_counter() - request_start)
+    return Measurement(latencies, time.perf_counter() - start)
+
+
+async def run_suite(page_sizes: list[int], requests: int) -> tuple[list[ScenarioResult], dict[str, int]]:
+    """Serve list pages of each size with every available content coding.
+
+    :param page_sizes: Number of tasks per page.
+    :param requests: Number of measured requests per coding and page size.
+    :return: The scenario results and the response size in bytes of each scenario.
+    """
+    results = []
+    sizes = {}
+    for page_size in page_sizes:
+        tasks = [
+            Task(id=str(uuid4()), description=f"benchmark task {idx}", is_completed=idx % 2 == 0, version=1)
+            for idx in range(page_size)
+        ]
+        bench_app = _build_app(tasks)
+
+        for encoding in ("identity", *available_encodings()):
+            result = summarize(
+                "list_page_compression",
+                {"page_size": page_size, "encoding": encoding},
+                await _run(bench_app, encoding, requests),
+            )
+            results.append(result)
+            sizes[result.key] = len(await _request(bench_app, encoding))
+    return results, sizes
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> int:
+    """Run the compression benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--page-sizes", type=_int_list, default=[10, 50, 100])
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per coding and page size")
+    parser.add_argument("--kbps", type=float, default=DEFAULT_KBPS, help="client bandwidth the transfer is timed at")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "compression.json")
+    args = parser.parse_args()
+
+    results, sizes = asyncio.run(run_suite(args.page_sizes, args.requests))
+    print_results(results)
+    write_report("compression", results, args.output)
+
+    print(f"\n{'scenario':<56} {'bytes':>8} {'ratio':>6} {'server ms':>10} {'transfer ms':>12} {'total ms':>9}")
+    identity_sizes = {
+        result.params["page_size"]: sizes[result.key] for result in results if result.params["encoding"] == "identity"
+    }
+    for result in results:
+        size = sizes[result.key]
+        transfer_ms = size * 8 / args.kbps
+        print(
+            f"{result.key:<56} {size:>8} {identity_sizes[result.params['page_size']] / size:>6.2f} "
+            f"{result.p50_ms:>10.3f} {transfer_ms:>12.1f} {result.p50_ms + transfer_ms:>9.1f}"
+        )
+    print(f"\ntransfer estimated at {args.kbps:g} kbps, results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Measure the latency of concurrent DynamoDB reads at varying connection pool sizes.
+
+Reads go over HTTP to a moto server, so every request checks a connection out of the urllib3 pool of the botocore
+client. When the pool is smaller than the concurrency, requests open extra connections which are discarded when
+returned to the full pool, the reconnects show in the tail latency and the discarded count.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.dynamodb_client [--pool-sizes 2,10,32] [--concurrency 32] [--requests 2000]
+        [--output PATH]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+from moto.server import ThreadedMotoServer
+from pynamodb.connection import TableConnection
+
+os.environ.setdefault("DB_TASKS_TABLE", "benchmark-tasks")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from app.config import Settings
+from app.dynamodb import configure_client, pool_stats
+from app.tasks.models import Task
+
+from .harness import RESULTS_DIR, Measurement, ScenarioResult, print_results, summarize, write_report
+
+TABLE_NAME = "benchmark-tasks"
+SEED_TASKS = 100
+WARMUP_REQUESTS = 100
+
+
+def _seed(host: str) -> list[str]:
+    Task.Meta.table_name = TABLE_NAME
+    Task.Meta.host = host
+    Task._connection = None
+    Task.create_table(billing_mode="PAY_PER_REQUEST", wait=True)
+    ids = [str(uuid4()) for _ in range(SEED_TASKS)]
+    with Task.batch_write() as batch:
+        for idx, task_id in enumerate(ids):
+            batch.save(Task(id=task_id, description=f"benchmark task {idx}", version=1))
+    return ids
+
+
+def _run(connection: TableConnection, ids: list[str], concurrency: int, requests: int) -> Measurement:
+    def get_item(idx: int) -> float:
+        start = time.perf_counter()
+        connection.get_item(ids[idx % len(ids)])
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(get_item, range(WARMUP_REQUESTS)))
+        start = time.perf_counter()
+        latencies = list(executor.map(get_item, range(requests)))
+    return Measurement(latencies, time.perf_counter() - start)
+
+
+def run_suite(
+    host: str, pool_sizes: list[int], concurrency: int, requests: int
+) -> tuple[list[ScenarioResult], dict[str, int]]:
+    """Read tasks concurrently with a client of each pool size.
+
+    :param host: The DynamoDB endpoint.
+    :param pool_sizes: Maximum connections of the client pool.
+    :param concurrency: Number of concurrent reads.
+    :param requests: Number of measured reads per pool size.
+    :return: The scenario results and the connections discarded by the full pool in each scenario.
+    """
+    ids = _seed(host)
+    meta_table = Task._get_connection().get_meta_table()
+    results = []
+    discarded = {}
+    for pool_size in pool_sizes:
+        connection = TableConnection(TABLE_NAME, host=host, meta_table=meta_table)
+        configure_client(connection.connection, Settings(db_tasks_table=TABLE_NAME, db_max_pool_connections=pool_size))
+        discarded_before = pool_stats(connection.connection.client).discarded
+
+        result = summarize(
+            "get_item_pool",
+            {"pool_size": pool_size, "concurrency": concurrency},
+            _run(connection, ids, concurrency, requests),
+        )
+        results.append(result)
+        discarded[result.key] = pool_stats(connection.connection.client).discarded - discarded_before
+    return results, discarded
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> int:
+    """Run the DynamoDB client benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--pool-sizes", type=_int_list, default=[2, 10, 32])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="measured reads per pool size")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "dynamodb_client.json")
+    args = parser.parse_args()
+
+    # the moto server logs every request
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    try:
+        host, port = server.get_host_and_port()
+        results, discarded = run_suite(f"http://{host}:{port}", args.pool_sizes, args.concurrency, args.requests)
+    finally:
+        server.stop()
+
+    print_results(results)
+    write_report("dynamodb_client", results, args.output)
+
+    print(f"\n{'scenario':<48} {'discarded connections':>22}")
+    for result in results:
+        print(f"{result.key:<48} {discarded[result.key]:>22}")
+    print(f"\nresults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""Shared helpers for the benchmark suites: timing statistics, DynamoDB call counting and baseline comparison."""
+
+import json
+import math
+import platform
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from pydantic import BaseModel
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / "dist" / "benchmarks"
+
+
+class ScenarioResult(BaseModel):
+
+    """Latency, throughput and DynamoDB cost of a benchmark scenario."""
+
+    scenario: str
+    params: dict[str, Any]
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    requests_per_second: float
+    db_calls_per_request: float
+
+    @property
+    def key(self) -> str:
+        """Identify the scenario and its parameters across runs."""
+        return f"{self.scenario}[{','.join(f'{name}={value}' for name, value in sorted(self.params.items()))}]"
+
+
+class Measurement(NamedTuple):
+
+    """Raw measurements of a benchmark scenario."""
+
+    latencies: list[float]
+    elapsed: float
+    errors: int = 0
+    db_calls: int = 0
+
+
+class BenchmarkReport(BaseModel):
+
+    """Results of a benchmark run."""
+
+    suite: str
+    created_at: datetime
+    python: str
+    results: list[ScenarioResult]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Return the nearest-rank percentile of the samples.
+
+    :param samples: The samples, in any order.
+    :param pct: The percentile, between 0 and 100.
+    :return: The percentile value, 0 if there are no samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(scenario: str, params: dict[str, Any], measurement: Measurement) -> ScenarioResult:
+    """Build a scenario result from raw measurements.
+
+    :param scenario: The scenario name.
+    :param params: The scenario parameters, e.g. table size and concurrency.
+    :param measurement: The request latencies and wall clock time in seconds, failed requests and DynamoDB calls.
+    :return: The scenario result.
+    """
+    latencies, elapsed, errors, db_calls = measurement
+    count = len(latencies)
+    return ScenarioResult(
+        scenario=scenario,
+        params=params,
+        requests=count,
+        errors=errors,
+        p50_ms=round(percentile(latencies, 50) * 1000, 3),
+        p95_ms=round(percentile(latencies, 95) * 1000, 3),
+        p99_ms=round(percentile(latencies, 99) * 1000, 3),
+        requests_per_second=round(count / elapsed, 1) if elapsed else 0.0,
+        db_calls_per_request=round(db_calls / count, 2) if count else 0.0,
+    )
+
+
+class CallCounter:
+
+    """Thread-safe counter of the calls made by a botocore client, by operation name."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls: dict[str, int] = {}
+
+    @property
+    def total(self) -> int:
+        """Return the total number of calls."""
+        return sum(self.calls.values())
+
+    def reset(self) -> None:
+        """Reset all counters."""
+        with self._lock:
+            self.calls = {}
+
+    def _on_call(self, model: Any, **_: Any) -> None:
+        with self._lock:
+            self.calls[model.name] = self.calls.get(model.name, 0) + 1
+
+    @contextmanager
+    def attach(self, client: Any) -> Iterator["CallCounter"]:
+        """Count the calls of a botocore client while the context is active.
+
+        :param client: The botocore (or aiobotocore) client.
+        """
+        client.meta.events.register("before-call.dynamodb", self._on_call)
+        try:
+            yield self
+        finally:
+            client.meta.events.unregister("before-call.dynamodb", self._on_call)
+
+
+def write_report(suite: str, results: list[ScenarioResult], path: Path) -> BenchmarkReport:
+    """Write the results of a benchmark run as JSON.
+
+    :param suite: The name of the benchmark suite.
+    :param results: The scenario results.
+    :param path: The file to write.
+    :return: The written report.
+    """
+    report = BenchmarkReport(
+        suite=suite, created_at=datetime.now(UTC), python=platform.python_version(), results=results
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(report.model_dump_json(indent=2))
+    return report
+
+
+def compare(report: BenchmarkReport, baseline_path: Path, threshold: float) -> list[str]:
+    """Compare a report with a baseline report and describe the regressions.
+
+    A scenario regresses when its p95 latency grows by more than the threshold, its throughput drops by more than the
+    threshold, or it makes more DynamoDB calls per request.
+
+    :param report: The report of the current run.
+    :param baseline_path: The baseline report file.
+    :param threshold: The tolerated relative change, e.g. 0.2 for 20%.
+    :return: One message per regression.
+    """
+    baseline = BenchmarkReport.model_validate(json.loads(baseline_path.read_text()))
+    baseline_results = {result.key: result for result in baseline.results}
+
+    regressions = []
+    for result in report.results:
+        previous = baseline_results.get(result.key)
+        if previous is None:
+            continue
+        if result.p95_ms > previous.p95_ms * (1 + threshold):
+            regressions.append(f"{result.key}: p95 {previous.p95_ms:.2f} ms -> {result.p95_ms:.2f} ms")
+        if result.requests_per_second < previous.requests_per_second * (1 - threshold):
+            regressions.append(
+                f"{result.key}: throughput {previous.requests_per_second:.1f} -> {result.requests_per_second:.1f} req/s"
+            )
+        if result.db_calls_per_request > previous.db_calls_per_request:
+            regressions.append(
+                f"{result.key}: db calls/request {previous.db_calls_per_request} -> {result.db_calls_per_request}"
+            )
+    return regressions
+
+
+def print_results(results: list[ScenarioResult]) -> None:
+    """Print the scenario results as a table."""
+    print(f"{'scenario':<48} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>9} {'db calls':>9} {'errors':>7}")
+    for result in results:
+        print(
+            f"{result.key:<48} {result.p50_ms:>8.2f} {result.p95_ms:>8.2f} {result.p99_ms:>8.2f} "
+            f"{result.requests_per_second:>9.1f} {result.db_calls_per_request:>9.2f} {result.errors:>7}"
+        )
@@ -0,0 +1,137 @@
+"""Measure the overhead of the profiling middleware on task list pages.
+
+Each list page is served without the ProfilingMiddleware, the baseline of PROFILING_ENABLED=false, with the middleware
+installed but not profiling the requests, as with PROFILING_ENABLED=true and a sample rate of 0, and with every request
+profiled. Profiles are logged, with logging disabled, so only the sampling and bookkeeping costs are measured.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.profiling [--page-sizes 10,100] [--requests 2000] [--output PATH]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import FastAPI, Response
+from starlette.types import Message, Scope
+
+os.environ.setdefault("DB_TASKS_TABLE", "benchmark-tasks")
+
+from app.profiling import ProfilingMiddleware, ProfilingPolicy
+from app.responses import ModelResponse
+from app.tasks.common import task_reads
+from app.tasks.models import Task
+from app.tasks.schemas import TaskPage
+
+from .harness import RESULTS_DIR, Measurement, ScenarioResult, print_results, summarize, write_report
+
+WARMUP_REQUESTS = 100
+# the middleware settings of each mode, None when it is not installed
+MODES: dict[str, float | None] = {"off": None, "installed": 0.0, "profiled": 1.0}
+
+
+def _build_app(tasks: list[Task], sample_rate: float | None) -> FastAPI:
+    bench_app = FastAPI()
+    if sample_rate is not None:
+        bench_app.add_middleware(ProfilingMiddleware, policy=ProfilingPolicy(sample_rate=sample_rate))
+
+    @bench_app.get("/tasks", response_model=TaskPage)
+    async def list_tasks() -> Response:
+        return ModelResponse(TaskPage.model_construct(items=task_reads(tasks), next_cursor=None))
+
+    return bench_app
+
+
+async def _request(bench_app: FastAPI) -> None:
+    scope: Scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/tasks",
+        "raw_path": b"/tasks",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("benchmark", 80),
+        "client": ("benchmark", 1024),
+    }
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_: Message) -> None:
+        pass
+
+    await bench_app(scope, receive, send)
+
+
+async def _run(bench_app: FastAPI, requests: int) -> Measurement:
+    for _ in range(WARMUP_REQUESTS):
+        await _request(bench_app)
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_start = time.perf_counter()
+        await _request(bench_app)
+        latencies.append(time.perf_counter() - request_start)
+    return Measurement(latencies, time.perf_counter() - start)
+
+
+async def run_suite(page_sizes: list[int], requests: int) -> list[ScenarioResult]:
+    """Serve list pages of each size in every profiling mode.
+
+    :param page_sizes: Number of tasks per page.
+    :param requests: Number of measured requests per mode and page size.
+    :return: The scenario results.
+    """
+    results = []
+    for page_size in page_sizes:
+        tasks = [
+            Task(id=str(uuid4()), description=f"benchmark task {idx}", is_completed=idx % 2 == 0, version=1)
+            for idx in range(page_size)
+        ]
+        for mode, sample_rate in MODES.items():
+            measurement = await _run(_build_app(tasks, sample_rate), requests)
+            results.append(summarize("list_page_profiling", {"page_size": page_size, "mode": mode}, measurement))
+    return results
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> int:
+    """Run the profiling benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--page-sizes", type=_int_list, default=[10, 100])
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per mode and page size")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "profiling.json")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = asyncio.run(run_suite(args.page_sizes, args.requests))
+    print_results(results)
+    write_report("profiling", results, args.output)
+
+    print(f"\n{'scenario':<56} {'p50 overhead':>13} {'p99 overhead':>13}")
+    baselines = {result.params["page_size"]: result for result in results if result.params["mode"] == "off"}
+    for result in results:
+        baseline = baselines[result.params["page_size"]]
+        print(
+            f"{result.key:<56} {result.p50_ms / baseline.p50_ms - 1:>13.1%} "
+            f"{result.p99_ms / baseline.p99_ms - 1:>13.1%}"
+        )
+    print(f"\nresults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Compare the serialization paths of task list pages.
+
+The response_model path is how list pages used to be served: TaskRead(**task.attribute_values) per item, then FastAPI
+dumping, validating again and encoding the return value against the response model. The fast path is the one the
+tasks router uses: the raw attribute values of all items validated at once by a precompiled TypeAdapter, then a
+ModelResponse encoded straight to JSON bytes by pydantic-core. Both run in process against tasks held in memory, so
+only the conversion and serialization costs are measured.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.serialization [--page-sizes 10,50,100] [--requests 2000] [--output PATH]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import FastAPI, Response
+from starlette.types import Message, Scope
+
+os.environ.setdefault("DB_TASKS_TABLE", "benchmark-tasks")
+
+from app.responses import ModelResponse
+from app.tasks.common import task_reads
+from app.tasks.models import Task
+from app.tasks.schemas import TaskPage, TaskRead
+
+from .harness import RESULTS_DIR, Measurement, ScenarioResult, print_results, summarize, write_report
+
+WARMUP_REQUESTS = 100
+
+
+def _build_app(tasks: list[Task]) -> FastAPI:
+    bench_app = FastAPI()
+
+    @bench_app.get("/response_model")
+    async def response_model() -> TaskPage:
+        return TaskPage(items=[TaskRead(**task.attribute_values) for task in tasks], next_cursor=None)
+
+    @bench_app.get("/fast_path", response_model=TaskPage)
+    async def fast_path() -> Response:
+        return ModelResponse(TaskPage.model_construct(items=task_reads(tasks), next_cursor=None))
+
+    return bench_app
+
+
+async def _request(bench_app: FastAPI, path: str) -> bytes:
+    scope: Scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("benchmark", 80),
+        "client": ("benchmark", 1024),
+    }
+    body = bytearray()
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await bench_app(scope, receive, send)
+    return bytes(body)
+
+
+async def _run(bench_app: FastAPI, path: str, requests: int) -> Measurement:
+    for _ in range(WARMUP_REQUESTS):
+        await _request(bench_app, path)
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_start = time.perf_counter()
+        await _request(bench_app, path)
+        latencies.append(time.perf_counter() - request_start)
+    return Measurement(latencies, time.perf_counter() - start)
+
+
+async def run_suite(page_sizes: list[int], requests: int) -> list[ScenarioResult]:
+    """Serve list pages of each size through both serialization paths.
+
+    :param page_sizes: Number of tasks per page.
+    :param requests: Number of measured requests per path and page size.
+    :return: The scenario results.
+    """
+    results = []
+    for page_size in page_sizes:
+        tasks = [
+            Task(id=str(uuid4()), description=f"benchmark task {idx}", is_completed=idx % 2 == 0, version=1)
+            for idx in range(page_size)
+        ]
+        bench_app = _build_app(tasks)
+        if await _request(bench_app, "/response_model") != await _request(bench_app, "/fast_path"):
+            raise RuntimeError("the serialization paths return different bodies")
+
+        for path in ("response_model", "fast_path"):
+            measurement = await _run(bench_app, f"/{path}", requests)
+            results.append(summarize(f"list_page_{path}", {"page_size": page_size}, measurement))
+    return results
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> int:
+    """Run the serialization benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--page-sizes", type=_int_list, default=[10, 50, 100])
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per path and page size")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "serialization.json")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_suite(args.page_sizes, args.requests))
+    print_results(results)
+    write_report("serialization", results, args.output)
+
+    by_key = {result.key: result for result in results}
+    for page_size in args.page_sizes:
+        baseline = by_key[f"list_page_response_model[page_size={page_size}]"]
+        fast_path = by_key[f"list_page_fast_path[page_size={page_size}]"]
+        print(f"page_size={page_size}: fast path p50 speedup {baseline.p50_ms / fast_path.p50_ms:.2f}x")
+    print(f"\nresults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
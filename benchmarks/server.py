@@ -0,0 +1,177 @@
+"""Compare the throughput of the Mangum Lambda handler with the multi-worker server.
+
+The Mangum path invokes the Lambda handler in process with API Gateway HTTP API events, one at a time as a Lambda
+instance does. The server path starts python -m app.server with each worker count and sends it concurrent requests
+over HTTP. Tasks are stored in memory, so only the cost of serving the requests is measured, and the request rate of
+a single Lambda instance compares with that of a server of one worker per CPU.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.server [--workers 1,4] [--concurrency 32] [--requests 5000] [--port 8090]
+        [--output PATH]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, cast
+from uuid import uuid4
+
+import httpx
+from mangum.types import LambdaContext
+
+os.environ.setdefault("DB_TASKS_TABLE", "benchmark-tasks")
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["SEARCH_BACKEND"] = "memory"
+# the benchmark reads list pages, several workers would otherwise require the DynamoDB idempotency table
+os.environ["IDEMPOTENCY_BACKEND"] = "none"
+os.environ["METRICS_ENABLED"] = "false"
+
+from app.main import handler
+
+from .harness import RESULTS_DIR, Measurement, ScenarioResult, print_results, summarize, write_report
+
+PATH = "/v1/tasks"
+QUERY = "limit=10"
+WARMUP_REQUESTS = 100
+STARTUP_TIMEOUT_SECONDS = 30.0
+
+
+class _LambdaContext:
+
+    """The attributes of the Lambda context read by the app."""
+
+    def __init__(self) -> None:
+        self.aws_request_id = uuid4().hex
+
+
+def _context() -> LambdaContext:
+    return cast(LambdaContext, _LambdaContext())
+
+
+def _event() -> dict[str, Any]:
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": PATH,
+        "rawQueryString": QUERY,
+        "headers": {"host": "benchmark", "accept": "application/json"},
+        "requestContext": {
+            "http": {"method": "GET", "path": PATH, "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1"},
+            "requestId": uuid4().hex,
+            "stage": "$default",
+        },
+        "isBase64Encoded": False,
+    }
+
+
+def run_mangum(requests: int) -> Measurement:
+    """Invoke the Lambda handler sequentially.
+
+    :param requests: Number of measured invocations.
+    :return: The measurement, failed invocations being those not answered 200.
+    """
+    for _ in range(WARMUP_REQUESTS):
+        handler(_event(), _context())
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        request_start = time.perf_counter()
+        response = handler(_event(), _context())
+        latencies.append(time.perf_counter() - request_start)
+        errors += response["statusCode"] != httpx.codes.OK
+    return Measurement(latencies, time.perf_counter() - start, errors)
+
+
+def _wait_until_ready(port: int, process: subprocess.Popen[bytes]) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"the server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("the server did not start in time")
+
+
+async def _load(port: int, concurrency: int, requests: int) -> Measurement:
+    latencies: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+
+        async def worker(count: int) -> None:
+            nonlocal errors
+            for _ in range(count):
+                request_start = time.perf_counter()
+                response = await client.get(f"{PATH}?{QUERY}")
+                latencies.append(time.perf_counter() - request_start)
+                errors += response.status_code != httpx.codes.OK
+
+        await asyncio.gather(*(worker(WARMUP_REQUESTS // concurrency + 1) for _ in range(concurrency)))
+        latencies.clear()
+        errors = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        return Measurement(latencies, time.perf_counter() - start, errors)
+
+
+def run_server(workers: int, concurrency: int, requests: int, port: int) -> Measurement:
+    """Start the server with a number of workers and send it concurrent requests.
+
+    :param workers: Number of server worker processes.
+    :param concurrency: Number of requests in flight.
+    :param requests: Number of measured requests.
+    :param port: The port the server listens on.
+    :return: The measurement.
+    """
+    env = {**os.environ, "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port), "SERVER_WORKERS": str(workers)}
+    process = subprocess.Popen([sys.executable, "-m", "app.server"], env=env)
+    try:
+        _wait_until_ready(port, process)
+        return asyncio.run(_load(port, concurrency, requests))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> int:
+    """Run the server benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--workers", type=_int_list, default=[1, os.cpu_count() or 1])
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight against the server")
+    parser.add_argument("--requests", type=int, default=5000, help="measured requests per scenario")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "server.json")
+    args = parser.parse_args()
+
+    results: list[ScenarioResult] = [summarize("list_tasks_mangum", {"concurrency": 1}, run_mangum(args.requests))]
+    for workers in dict.fromkeys(args.workers):
+        results.append(
+            summarize(
+                "list_tasks_server",
+                {"workers": workers, "concurrency": args.concurrency},
+                run_server(workers, args.concurrency, args.requests, args.port),
+            )
+        )
+
+    print_results(results)
+    write_report("server", results, args.output)
+    print(f"\nresults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Load test every endpoint of the tasks API at varying table sizes and concurrency levels.
+
+Requests go through the ASGI app in process, with DynamoDB served either by moto in process or by DynamoDB Local
+(``docker compose up``). Reports p50/p95/p99 latency, requests/sec and DynamoDB calls per request, writes them as JSON
+and, given a baseline from a previous run, flags regressions.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.tasks_api [--target moto|dynamodb-local] [--table-sizes 100,1000]
+        [--concurrency 1,8] [--requests 200] [--output PATH] [--compare BASELINE] [--threshold 0.2]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import httpx
+from moto import mock_aws
+
+os.environ.setdefault("DB_TASKS_TABLE", "benchmark-tasks")
+# the benchmark measures the calls to the task table, the search index is kept in process
+os.environ.setdefault("SEARCH_BACKEND", "memory")
+
+from app.main import app
+from app.tasks.batch import batch_write
+from app.tasks.models import Task
+
+from .harness import (
+    RESULTS_DIR,
+    CallCounter,
+    Measurement,
+    ScenarioResult,
+    compare,
+    print_results,
+    summarize,
+    write_report,
+)
+
+TABLE_NAME = "benchmark-tasks"
+BATCH_SIZE = 25
+WARMUP_REQUESTS = 10
+
+RequestFactory = Callable[[int], tuple[str, str, Any]]
+
+
+def _seed(count: int) -> list[str]:
+    tasks = [Task(id=str(uuid4()), description=f"benchmark task {idx}", version=1) for idx in range(count)]
+    if batch_write(put_tasks=tasks):
+        raise RuntimeError("failed to seed the benchmark table")
+    return [task.id for task in tasks]
+
+
+def _reset_table() -> None:
+    if Task.exists():
+        Task.delete_table()
+    Task.create_table(billing_mode="PAY_PER_REQUEST", wait=True)
+
+
+def _scenarios(ids: list[str], requests: int) -> dict[str, Callable[[], RequestFactory]]:
+    """Return a factory per scenario, building its request factory and seeding the items it consumes."""
+    size = len(ids)
+
+    def batch_ids(idx: int) -> list[str]:
+        start = idx * BATCH_SIZE % size
+        return [ids[(start + offset) % size] for offset in range(min(BATCH_SIZE, size))]
+
+    def delete_task() -> RequestFactory:
+        delete_ids = _seed(requests + WARMUP_REQUESTS)
+        return lambda idx: ("DELETE", f"/tasks/{delete_ids[idx]}", None)
+
+    def batch_delete_tasks() -> RequestFactory:
+        delete_ids = _seed((requests + WARMUP_REQUESTS) * BATCH_SIZE)
+        return lambda idx: (
+            "POST",
+            "/tasks:batchDelete",
+            {"ids": delete_ids[idx * BATCH_SIZE : (idx + 1) * BATCH_SIZE]},
+        )
+
+    return {
+        "list_tasks": lambda: lambda _: ("GET", "/tasks?limit=50", None),
+        "export_tasks": lambda: lambda _: ("GET", "/tasks:export", None),
+        "get_task": lambda: lambda idx: ("GET", f"/tasks/{ids[idx % size]}", None),
+        "create_task": lambda: lambda idx: ("POST", "/tasks", {"description": f"created task {idx}"}),
+        "update_task": lambda: lambda idx: ("PATCH", f"/tasks/{ids[idx % size]}", {"is_completed": idx % 2 == 0}),
+        "delete_task": delete_task,
+        "batch_get_tasks": lambda: lambda idx: ("POST", "/tasks:batchGet", {"ids": batch_ids(idx)}),
+        "batch_create_tasks": lambda: (
+            lambda idx: (
+                "POST",
+                "/tasks:batchCreate",
+                {"tasks": [{"description": f"created task {idx}.{offset}"} for offset in range(BATCH_SIZE)]},
+            )
+        ),
+        "batch_update_tasks": lambda: (
+            lambda idx: (
+                "POST",
+                "/tasks:batchUpdate",
+                {"tasks": [{"id": task_id, "is_completed": idx % 2 == 0} for task_id in batch_ids(idx)]},
+            )
+        ),
+        "batch_delete_tasks": batch_delete_tasks,
+    }
+
+
+async def _run(
+    client: httpx.AsyncClient, factory: RequestFactory, first: int, requests: int, concurrency: int
+) -> Measurement:
+    latencies: list[float] = []
+    errors = 0
+    indexes = iter(range(first, first + requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for idx in indexes:
+            method, url, body = factory(idx)
+            start = time.perf_counter()
+            resp = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if resp.status_code >= httpx.codes.BAD_REQUEST:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return Measurement(latencies, time.perf_counter() - start, errors)
+
+
+async def run_suite(
+    table_sizes: list[int], concurrency_levels: list[int], requests: int, scenarios: list[str] | None
+) -> list[ScenarioResult]:
+    """Run the selected scenarios for every table size and concurrency level.
+
+    :param table_sizes: Number of tasks in the table.
+    :param concurrency_levels: Number of requests in flight at the same time.
+    :param requests: Number of measured requests per scenario.
+    :param scenarios: Names of the scenarios to run, all if None.
+    :return: The scenario results.
+    """
+    results = []
+    counter = CallCounter()
+    # httpx types the ASGI scope as a dict, Starlette as a MutableMapping
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark/v1") as client:
+        for table_size in table_sizes:
+            _reset_table()
+            ids = _seed(table_size)
+            for name, build in _scenarios(ids, requests).items():
+                if scenarios is not None and name not in scenarios:
+                    continue
+                for concurrency in concurrency_levels:
+                    factory = build()
+                    await _run(client, factory, requests, WARMUP_REQUESTS, concurrency)
+                    with counter.attach(Task._get_connection().connection.client):
+                        counter.reset()
+                        measurement = await _run(client, factory, 0, requests, concurrency)
+                    result = summarize(
+                        name,
+                        {"table_size": table_size, "concurrency": concurrency},
+                        measurement._replace(db_calls=counter.total),
+                    )
+                    results.append(result)
+                    print(f"{result.key}: p95 {result.p95_ms} ms, {result.requests_per_second} req/s")
+    return results
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> int:
+    """Run the benchmark suite from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--target", choices=["moto", "dynamodb-local"], default="moto")
+    parser.add_argument("--table-sizes", type=_int_list, default=[100, 1000])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), help="comma separated scenario names")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "tasks_api.json")
+    parser.add_argument("--compare", type=Path, help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated relative change (default: 0.2)")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    Task.Meta.table_name = TABLE_NAME
+    with ExitStack() as stack:
+        if args.target == "moto":
+            Task.Meta.host = None
+            stack.enter_context(mock_aws())
+        try:
+            results = asyncio.run(run_suite(args.table_sizes, args.concurrency, args.requests, args.scenarios))
+        finally:
+            if Task.exists():
+                Task.delete_table()
+
+    print_results(results)
+    report = write_report("tasks_api", results, args.output)
+    print(f"\nresults written to {args.output}")
+
+    if args.compare is not None:
+        regressions = compare(report, args.compare, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Report how much each module adds to the import time of the API entry point.
+
+Runs the import in a fresh interpreter with ``-X importtime`` and aggregates the self time of every imported module by
+top level package, so regressions in cold start time are easy to spot. With ``--budget-ms`` it exits with a non-zero
+status when the total import time exceeds the budget.
+
+Usage: python scripts/profile_imports.py [--module app.main] [--top 15] [--budget-ms 1000]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def profile(module: str) -> list[tuple[str, int, int, int]]:
+    """Import a module in a fresh interpreter and return its import time records.
+
+    :param module: The module to import.
+    :return: A list of (module name, self us, cumulative us, nesting level) tuples, in import order.
+    """
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"failed to import {module}:\n{result.stderr}")
+
+    records = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def main() -> int:
+    """Print the import time report and check it against the budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app.main", help="module to profile (default: app.main)")
+    parser.add_argument("--top", type=int, default=15, help="number of packages and modules to report (default: 15)")
+    parser.add_argument("--budget-ms", type=float, help="fail if the total import time exceeds this budget")
+    args = parser.parse_args()
+
+    records = profile(args.module)
+    total_ms = next(cumulative for name, _, cumulative, _ in records if name == args.module) / 1000
+
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in records:
+        by_package[name.split(".")[0]] += self_us
+
+    print(f"total import time of {args.module}: {total_ms:.1f} ms\n")
+    print(f"{'package':<40} {'self ms':>10} {'share':>7}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{package:<40} {self_us / 1000:>10.1f} {self_us / 10 / total_ms:>6.1f}%")
+
+    print(f"\n{'module':<60} {'cumulative ms':>14}")
+    own_modules = [record for record in records if record[0].split(".")[0] == args.module.split(".")[0]]
+    for name, _, cumulative_us, _ in sorted(own_modules, key=lambda record: record[2], reverse=True)[: args.top]:
+        print(f"{name:<60} {cumulative_us / 1000:>14.1f}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nimport time {total_ms:.1f} ms exceeds the budget of {args.budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
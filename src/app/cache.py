@@ -0,0 +1,206 @@
+import importlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Protocol
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+# optimistic transactions retried on a concurrent change of the same key before the key is dropped
+_MAX_REDIS_ATTEMPTS = 5
+
+
+class CacheStats(BaseModel):
+
+    """Cache hit, miss and eviction counters."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class CacheBackend(Protocol):
+
+    """Key-value store used by the cache layers."""
+
+    @property
+    def evictions(self) -> int:
+        """Number of entries dropped by the backend because of capacity or expiry."""
+
+    def get(self, key: str) -> bytes | None:
+        """Return the value stored under key, or None if it is missing or expired."""
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store value under key."""
+
+    def delete(self, key: str) -> None:
+        """Remove key from the cache."""
+
+    def update(self, key: str, replace: Callable[[bytes | None], bytes | None]) -> None:
+        """Atomically store the value replace returns for the value stored under key, None keeping it unchanged."""
+
+
+class NullCache:
+
+    """Cache backend that never stores anything, used when caching is disabled."""
+
+    evictions = 0
+
+    def get(self, key: str) -> bytes | None:
+        """Return None, nothing is ever cached."""
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        """Discard the value."""
+
+    def delete(self, key: str) -> None:
+        """Nothing to delete."""
+
+    def update(self, key: str, replace: Callable[[bytes | None], bytes | None]) -> None:
+        """Discard the update."""
+
+
+class MemoryCache:
+
+    """In-process, thread-safe LRU cache with per-entry TTL.
+
+    :param max_size: Maximum number of entries kept before the least recently used one is evicted.
+    :param ttl_seconds: Number of seconds an entry stays valid after it is set.
+    :param clock: Monotonic clock used to expire entries.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        if max_size < 1:
+            raise ValueError("max_size must be greater than 0")
+
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    @property
+    def evictions(self) -> int:
+        """Number of entries dropped because the cache was full or the entry expired."""
+        return self._evictions
+
+    def get(self, key: str) -> bytes | None:
+        """Return the value stored under key, or None if it is missing or expired."""
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store value under key, evicting the least recently used entries if the cache is full."""
+        with self._lock:
+            self._set(key, value)
+
+    def delete(self, key: str) -> None:
+        """Remove key from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def update(self, key: str, replace: Callable[[bytes | None], bytes | None]) -> None:
+        """Store the value replace returns for the value stored under key, None keeping it unchanged.
+
+        The lock is held while replace runs, so no other write of the cache happens between the read and the write.
+        """
+        with self._lock:
+            value = replace(self._get(key))
+            if value is not None:
+                self._set(key, value)
+
+    def _get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self._evictions += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: str, value: bytes) -> None:
+        self._entries[key] = (value, self._clock() + self._ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+class RedisCache:
+
+    """Cache backend storing entries in any server speaking the Redis protocol.
+
+    Expiry and eviction happen on the server, so evictions are not observable from the client and are reported as 0.
+
+    :param client: The Redis client.
+    :param ttl_seconds: Number of seconds an entry stays valid after it is set.
+    """
+
+    evictions = 0
+
+    def __init__(self, client: "Redis", ttl_seconds: float):
+        self._client = client
+        self._ttl_ms = int(ttl_seconds * 1000)
+
+    @classmethod
+    def from_url(cls, url: str, ttl_seconds: float) -> "RedisCache":
+        """Create a RedisCache connected to the given URL.
+
+        :param url: The Redis connection URL, e.g. redis://localhost:6379/0.
+        :param ttl_seconds: Number of seconds an entry stays valid after it is set.
+        :return: The RedisCache instance.
+        :raises RuntimeError: If the redis package is not installed.
+        """
+        # imported lazily, the redis package is optional and slow to import
+        try:
+            redis = importlib.import_module("redis")
+        except ImportError as exc:
+            raise RuntimeError("redis cache backend requires the 'redis' extra to be installed") from exc
+
+        return cls(redis.Redis.from_url(url), ttl_seconds)
+
+    def get(self, key: str) -> bytes | None:
+        """Return the value stored under key, or None if it is missing or expired."""
+        value = self._client.get(key)
+        return value if isinstance(value, bytes) else None
+
+    def set(self, key: str, value: bytes) -> None:
+        """Store value under key with the configured TTL."""
+        self._client.set(key, value, px=self._ttl_ms)
+
+    def delete(self, key: str) -> None:
+        """Remove key from the cache."""
+        self._client.delete(key)
+
+    def update(self, key: str, replace: Callable[[bytes | None], bytes | None]) -> None:
+        """Store the value replace returns for the value stored under key, None keeping it unchanged.
+
+        The key is updated in an optimistic transaction, retried when another client changed it in between. A key
+        changed by other clients on every attempt is deleted, so that no outdated value is left behind.
+        """
+        watch_error = importlib.import_module("redis.exceptions").WatchError
+        for _ in range(_MAX_REDIS_ATTEMPTS):
+            with self._client.pipeline() as pipe:
+                try:
+                    pipe.watch(key)  # type: ignore[no-untyped-call]
+                    current = pipe.get(key)
+                    value = replace(current if isinstance(current, bytes) else None)
+                    if value is None:
+                        return
+                    pipe.multi()
+                    pipe.set(key, value, px=self._ttl_ms)
+                    pipe.execute()
+                except watch_error:
+                    continue
+                return
+        self._client.delete(key)
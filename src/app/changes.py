@@ -0,0 +1,148 @@
+import asyncio
+import secrets
+import threading
+from collections import deque
+from typing import NamedTuple, Protocol
+
+from .config import Settings
+
+
+class ChangeEvent(NamedTuple):
+
+    """A change published to a change broker.
+
+    :param seq: The sequence number of the change, increasing by one with every published change.
+    :param data: The serialized change.
+    """
+
+    seq: int
+    data: bytes
+
+
+class CursorExpiredError(ValueError):
+
+    """Raised when the changes after a position are no longer, or were never, kept by the broker."""
+
+
+class ChangeBroker(Protocol):
+
+    """Ordered log of changes that readers follow from a sequence number."""
+
+    @property
+    def epoch(self) -> str:
+        """Identify the log, sequence numbers of one log are meaningless in another."""
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the last published change, 0 if none was published."""
+
+    def publish(self, data: bytes) -> int:
+        """Append a change to the log and wake up the waiting readers, returning its sequence number."""
+
+    def read(self, after: int, limit: int) -> list[ChangeEvent]:
+        """Return up to limit changes published after the given sequence number, oldest first."""
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """Wait up to timeout seconds for a change after the given sequence number, returning whether there is one."""
+
+
+class MemoryBroker:
+
+    """In-process, thread-safe change log keeping the last max_size changes.
+
+    Changes are published from the threads running the sync services and read from event loops, waiting readers are
+    woken up on their own loop. The epoch is random, so positions do not survive a restart of the process.
+
+    :param max_size: Maximum number of changes kept before the oldest one is dropped.
+    """
+
+    def __init__(self, max_size: int):
+        if max_size < 1:
+            raise ValueError("max_size must be greater than 0")
+
+        self._epoch = secrets.token_hex(8)
+        self._events: deque[ChangeEvent] = deque(maxlen=max_size)
+        self._last_seq = 0
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def epoch(self) -> str:
+        """Identify the log of this process."""
+        return self._epoch
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the last published change, 0 if none was published."""
+        return self._last_seq
+
+    def publish(self, data: bytes) -> int:
+        """Append a change to the log and wake up the waiting readers.
+
+        :param data: The serialized change.
+        :return: The sequence number of the change.
+        """
+        with self._lock:
+            self._last_seq += 1
+            self._events.append(ChangeEvent(self._last_seq, data))
+            seq = self._last_seq
+            waiters = list(self._waiters)
+
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the loop of the reader was closed without it cleaning up, e.g. at the end of a Lambda invocation
+                with self._lock:
+                    self._waiters.discard((loop, event))
+        return seq
+
+    def read(self, after: int, limit: int) -> list[ChangeEvent]:
+        """Return up to limit changes published after the given sequence number, oldest first.
+
+        :param after: The sequence number of the last change the reader has seen, 0 to read from the start.
+        :param limit: Maximum number of changes to return.
+        :return: The changes.
+        :raises CursorExpiredError: If changes after the sequence number were dropped or it was never published.
+        """
+        with self._lock:
+            if after > self._last_seq:
+                raise CursorExpiredError(f"change {after} was never published")
+            first_seq = self._events[0].seq if self._events else self._last_seq + 1
+            if after < first_seq - 1:
+                raise CursorExpiredError(f"changes after {after} were dropped")
+            start = after - first_seq + 1
+            return [self._events[idx] for idx in range(start, min(start + limit, len(self._events)))]
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        """Wait up to timeout seconds for a change after the given sequence number.
+
+        :param after: The sequence number of the last change the reader has seen.
+        :param timeout: Maximum number of seconds to wait.
+        :return: True if a change was published after the sequence number, False if the wait timed out.
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._last_seq > after:
+                return True
+            self._waiters.add(waiter)
+
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        return True
+
+
+def create_change_broker(config: Settings) -> ChangeBroker | None:
+    """Create the change broker selected by the settings.
+
+    :param config: The project settings.
+    :return: The change broker, None if the change feed is disabled.
+    """
+    if config.changes_backend == "memory":
+        return MemoryBroker(max_size=config.changes_max_size)
+    return None
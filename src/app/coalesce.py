@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Generic, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+# requests of sync endpoints wait out the window in a threadpool worker, Starlette's pool defaults to 40 threads
+DEFAULT_MAX_WAITING = 8
+
+Changes = dict[str, Any]
+
+
+class WriteCoalescerStats(BaseModel):
+
+    """Number of submitted updates, of writes they were merged into and the time they waited for their write.
+
+    :param delay_seconds: The total time the updates waited for their write to start.
+    """
+
+    updates: int = 0
+    writes: int = 0
+    delay_seconds: float = 0.0
+
+    @property
+    def merge_ratio(self) -> float:
+        """Return the mean number of updates merged into a write, 0 before the first write."""
+        return self.updates / self.writes if self.writes else 0.0
+
+
+class _Batch(Generic[T]):
+
+    """Changes submitted for a key while its batch is open, and the outcome of their write."""
+
+    __slots__ = ("changes", "closed", "done", "error", "submissions", "value", "write_at")
+
+    def __init__(self, write_at: float) -> None:
+        self.changes: Changes = {}
+        self.write_at = write_at
+        self.submissions = 0
+        self.closed = threading.Event()
+        self.done = threading.Event()
+        self.value: T | None = None
+        self.error: BaseException | None = None
+
+
+class WriteCoalescer(Generic[T]):
+
+    """Merge the changes submitted for the same key within a window into a single write.
+
+    The first thread submitting changes for a key, the leader, opens a batch and waits for the window to pass. The
+    changes submitted for the key meanwhile are merged into the batch, later values of an attribute replacing earlier
+    ones, then the leader writes them all at once. Every thread gets the result, or the exception, of that write.
+    Changes submitted once the batch was closed open the next batch.
+
+    Every thread of an open batch is held until its write, so once max_waiting threads wait in open batches, a
+    submission closes its batch at once: the leader writes without waiting out the rest of the window.
+
+    :param window_seconds: Number of seconds a batch stays open.
+    :param max_waiting: Maximum number of threads waiting in open batches before batches are closed early.
+    """
+
+    def __init__(self, window_seconds: float, max_waiting: int = DEFAULT_MAX_WAITING) -> None:
+        if max_waiting < 1:
+            raise ValueError("max_waiting must be greater than 0")
+
+        self.window_seconds = window_seconds
+        self.max_waiting = max_waiting
+        self._batches: dict[str, _Batch[T]] = {}
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._updates = 0
+        self._writes = 0
+        self._delay = 0.0
+
+    @property
+    def stats(self) -> WriteCoalescerStats:
+        """Return the update, write and delay counters."""
+        return WriteCoalescerStats(updates=self._updates, writes=self._writes, delay_seconds=self._delay)
+
+    def _record_delay(self, delay: float) -> None:
+        with self._lock:
+            self._delay += delay
+
+    def submit(self, key: str, changes: Changes, write: Callable[[Changes], T]) -> tuple[T, bool, float]:
+        """Merge changes into the open batch of key, or open one, and wait for the batch to be written.
+
+        :param key: The key identifying the written item.
+        :param changes: The changes to write.
+        :param write: The function writing the merged changes, called by the leader only.
+        :return: The result of the write, whether it was shared with a leader and how long the write was delayed.
+        :raises Exception: The exception raised by the write.
+        """
+        start = time.monotonic()
+        with self._lock:
+            self._updates += 1
+            batch = self._batches.get(key)
+            is_leader = batch is None
+            if batch is None:
+                batch = self._batches[key] = _Batch(start + self.window_seconds)
+                self._writes += 1
+            batch.changes.update(changes)
+            if self._waiting >= self.max_waiting:
+                batch.closed.set()
+            else:
+                batch.submissions += 1
+                self._waiting += 1
+
+        if not is_leader:
+            batch.done.wait()
+            self._record_delay(batch.write_at - start)
+            if batch.error is not None:
+                raise batch.error
+            return batch.value, True, batch.write_at - start  # type: ignore[return-value]
+
+        batch.closed.wait(self.window_seconds)
+        with self._lock:
+            del self._batches[key]
+            self._waiting -= batch.submissions
+        batch.write_at = time.monotonic()
+        self._record_delay(batch.write_at - start)
+        try:
+            batch.value = write(batch.changes)
+        except BaseException as exc:
+            batch.error = exc
+            raise
+        finally:
+            batch.done.set()
+        return batch.value, False, batch.write_at - start
+
+
+class AsyncWriteCoalescer(Generic[T]):
+
+    """Merge the changes submitted for the same key within a window into a single awaited write.
+
+    Same as WriteCoalescer for coroutines running on one event loop. The write runs in its own task, so it is made
+    for the other coroutines of the batch even if the one which opened it is cancelled.
+
+    :param window_seconds: Number of seconds a batch stays open.
+    """
+
+    def __init__(self, window_seconds: float) -> None:
+        self.window_seconds = window_seconds
+        self._batches: dict[str, tuple[Changes, asyncio.Task[tuple[T, float]]]] = {}
+        self._updates = 0
+        self._writes = 0
+        self._delay = 0.0
+
+    @property
+    def stats(self) -> WriteCoalescerStats:
+        """Return the update, write and delay counters."""
+        return WriteCoalescerStats(updates=self._updates, writes=self._writes, delay_seconds=self._delay)
+
+    async def _write(self, key: str, changes: Changes, write: Callable[[Changes], Awaitable[T]]) -> tuple[T, float]:
+        try:
+            await asyncio.sleep(self.window_seconds)
+        finally:
+            del self._batches[key]
+        write_at = time.monotonic()
+        return await write(changes), write_at
+
+    async def submit(
+        self, key: str, changes: Changes, write: Callable[[Changes], Awaitable[T]]
+    ) -> tuple[T, bool, float]:
+        """Merge changes into the open batch of key, or open one, and wait for the batch to be written.
+
+        :param key: The key identifying the written item.
+        :param changes: The changes to write.
+        :param write: The coroutine function writing the merged changes, awaited once per batch.
+        :return: The result of the write, whether it was shared with a leader and how long the write was delayed.
+        :raises Exception: The exception raised by the write.
+        """
+        start = time.monotonic()
+        self._updates += 1
+        batch = self._batches.get(key)
+        is_leader = batch is None
+        if batch is None:
+            merged: Changes = {}
+            batch = self._batches[key] = (merged, asyncio.create_task(self._write(key, merged, write)))
+            self._writes += 1
+        batch[0].update(changes)
+
+        value, write_at = await asyncio.shield(batch[1])
+        self._delay += write_at - start
+        return value, not is_leader, write_at - start
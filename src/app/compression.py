@@ -0,0 +1,146 @@
+import gzip
+import importlib
+from collections.abc import Iterable
+from functools import cache
+from types import ModuleType
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# quality 11 is meant for static assets, 4 compresses dynamic responses better than gzip at a similar cost
+BROTLI_QUALITY = 4
+
+# content types worth compressing, the rest, e.g. images, are already compressed
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/problem+json")
+
+
+@cache
+def _brotli() -> ModuleType | None:
+    # brotli is an optional extra, responses are only gzip compressed without it
+    try:
+        return importlib.import_module("brotli")
+    except ImportError:
+        return None
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Return the content codings the responses can be compressed with, in order of preference."""
+    return ("br", "gzip") if _brotli() is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str | None, encodings: Iterable[str]) -> str | None:
+    """Pick the content coding of a response from the Accept-Encoding header of the request.
+
+    :param accept_encoding: The content codings the client accepts, with optional quality values.
+    :param encodings: The content codings the server supports, in order of preference.
+    :return: The accepted coding with the highest quality, the server preference breaking ties, None if none is.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities: dict[str, float] = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        params = params.strip()
+        try:
+            quality = float(params.removeprefix("q=")) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    """Compress a response body.
+
+    :param body: The response body.
+    :param encoding: The content coding, br or gzip.
+    :param gzip_level: The gzip compression level.
+    :param brotli_quality: The brotli compression quality.
+    :return: The compressed body.
+    """
+    brotli = _brotli()
+    if encoding == "br" and brotli is not None:
+        return bytes(brotli.compress(body, quality=brotli_quality))
+    # mtime=0 keeps the output of the same body identical, e.g. for caches comparing bodies
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def _is_compressible(headers: Headers, size: int, min_size: int) -> bool:
+    content_type = headers.get("content-type", "")
+    return size >= min_size and "content-encoding" not in headers and content_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+
+    """Compress responses with brotli or gzip, as negotiated with the Accept-Encoding header of the request.
+
+    Only responses sent in a single body message, of a compressible type, at least min_size bytes long and not already
+    encoded are compressed. Streamed responses, e.g. the task export which compresses itself, pass through unchanged.
+
+    Behind Mangum, compressed bodies are returned base64 encoded, or as text when they happen to be valid UTF-8, which
+    API Gateway turns back into the same bytes.
+
+    :param app: The ASGI app.
+    :param min_size: Minimum size in bytes of the responses to compress, smaller ones gain too little.
+    :param gzip_level: The gzip compression level.
+    :param brotli_quality: The brotli compression quality.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_size: int = DEFAULT_MIN_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, compressing its response if the client accepts it."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        start_message: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # held back until the first body message tells whether the response can be compressed
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=start)
+            if message.get("more_body", False) or not _is_compressible(headers, len(body), self.min_size):
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is not None:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
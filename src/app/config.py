@@ -1,5 +1,8 @@
+from functools import cache
 from importlib.metadata import version
+from typing import Literal
 
+from pydantic import SecretStr
 from pydantic_settings import BaseSettings
 
 MODULE_NAME = "python_api_starter"
@@ -11,17 +14,75 @@ class Settings(BaseSettings):
 
     project_name: str = "Todo List"
     api_prefix: str = "/v1"
+    app_version: str | None = None
+    docs_enabled: bool = True
     debug: bool = False
     db_host: str | None = None
     db_tasks_table: str
+    db_idempotency_table: str | None = None
+    db_stats_table: str | None = None
+    db_search_table: str | None = None
+    db_backend: Literal["sync", "async"] = "sync"
+    storage_backend: Literal["dynamodb", "memory"] = "dynamodb"
+    db_max_pool_connections: int = 10
+    db_connect_timeout_seconds: float = 2.0
+    db_read_timeout_seconds: float = 10.0
+    db_retry_mode: Literal["legacy", "standard", "adaptive"] = "standard"
+    db_max_attempts: int = 4
+    db_tcp_keepalive: bool = False
+    db_prewarm: bool = False
+    write_coalescing_window_seconds: float = 0.0
+    cursor_secret: SecretStr | None = None
+    cache_backend: Literal["none", "memory", "redis"] = "none"
+    cache_max_size: int = 1024
+    cache_ttl_seconds: float = 60.0
+    cache_redis_url: str = "redis://localhost:6379/0"
+    metrics_enabled: bool = True
+    metrics_emf: bool = False
+    metrics_namespace: str = "TodoList"
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    idempotency_backend: Literal["none", "memory", "dynamodb"] = "memory"
+    idempotency_ttl_seconds: float = 86400.0
+    idempotency_wait_seconds: float = 5.0
+    changes_backend: Literal["none", "memory"] = "memory"
+    changes_max_size: int = 1024
+    changes_heartbeat_seconds: float = 15.0
+    search_backend: Literal["none", "memory", "dynamodb"] = "none"
+    search_indexing: Literal["inline", "stream"] = "inline"
+    rate_limit_backend: Literal["none", "memory", "redis"] = "none"
+    rate_limit_per_second: float = 10.0
+    rate_limit_burst: int = 20
+    rate_limit_redis_url: str = "redis://localhost:6379/0"
+    load_shedding_enabled: bool = False
+    load_shedding_max_in_flight: int = 64
+    load_shedding_latency_target_seconds: float = 0.1
+    load_shedding_max_throttle_rate: float = 0.05
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    profiling_token: SecretStr | None = None
+    profiling_output_dir: str | None = None
+    profiling_interval_seconds: float = 0.005
+    server_host: str = "0.0.0.0"
+    server_port: int = 8080
+    server_workers: int = 0
+    server_backlog: int = 2048
+    server_keepalive_seconds: int = 5
+    server_graceful_shutdown_seconds: int = 30
+    server_limit_concurrency: int | None = None
 
     @property
     def version(self) -> str:
-        """Returns the version of the module."""
-        try:
-            return version(MODULE_NAME)
-        except (ImportError, AttributeError):
-            return "0.0.0"
+        """Returns the statically configured app_version, or the version of the module."""
+        return self.app_version or _module_version()
+
+
+@cache
+def _module_version() -> str:
+    try:
+        return version(MODULE_NAME)
+    except (ImportError, AttributeError):
+        return "0.0.0"
 
 
 settings = Settings()  # type: ignore[call-arg]
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import secrets
+from typing import Any
+
+from .config import settings
+
+# Used when no cursor secret is configured, cursors are then only valid within the current process.
+_fallback_secret = secrets.token_bytes(32)
+
+
+class InvalidCursorError(ValueError):
+
+    """Raised when a continuation token is malformed or has been tampered with."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str, secret: bytes) -> str:
+    return _b64encode(hmac.new(secret, payload.encode("utf-8"), hashlib.sha256).digest())
+
+
+def get_cursor_secret() -> bytes:
+    """Return the key used to sign continuation tokens.
+
+    :return: The configured cursor secret, or a per-process random key if none is configured.
+    """
+    if settings.cursor_secret is None:
+        return _fallback_secret
+    return settings.cursor_secret.get_secret_value().encode("utf-8")
+
+
+def encode_cursor(key: dict[str, Any], secret: bytes) -> str:
+    """Encode a DynamoDB last evaluated key into an opaque, signed continuation token.
+
+    :param key: The last evaluated key returned by DynamoDB.
+    :param secret: The key used to sign the token.
+    :return: The continuation token.
+    """
+    payload = _b64encode(json.dumps(key, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+    return f"{payload}.{_sign(payload, secret)}"
+
+
+def decode_cursor(cursor: str, secret: bytes) -> dict[str, Any]:
+    """Decode a continuation token back into a DynamoDB exclusive start key.
+
+    :param cursor: The continuation token produced by encode_cursor.
+    :param secret: The key used to sign the token.
+    :return: The DynamoDB exclusive start key.
+    :raises InvalidCursorError: If the token is malformed or its signature does not match.
+    """
+    payload, _, signature = cursor.partition(".")
+    if not payload or not hmac.compare_digest(signature.encode("utf-8"), _sign(payload, secret).encode("ascii")):
+        raise InvalidCursorError("invalid cursor signature")
+
+    try:
+        key = json.loads(_b64decode(payload))
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidCursorError("invalid cursor payload") from exc
+
+    if not isinstance(key, dict):
+        raise InvalidCursorError("invalid cursor payload")
+    return key
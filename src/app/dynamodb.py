@@ -0,0 +1,119 @@
+import logging
+import threading
+from typing import Any
+
+from botocore.config import Config
+from pydantic import BaseModel
+from pynamodb.connection import Connection
+
+from .config import Settings
+
+# error codes of the DynamoDB calls rejected because the table, account or partition is over its throughput
+THROTTLE_ERROR_CODES = frozenset(
+    {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+)
+
+# logged by urllib3 when a request returns a connection to a pool that is already full
+_POOL_FULL_MESSAGE = "Connection pool is full"
+
+
+class PoolStats(BaseModel):
+
+    """Connection pool usage of a botocore client.
+
+    :param in_use: Number of connections currently checked out of the pool by requests.
+    :param idle: Number of open connections waiting in the pool.
+    :param discarded: Number of connections closed since startup because the pool was full when they were returned, a
+        growing count means the pool is too small for the concurrency.
+    """
+
+    max_connections: int
+    in_use: int = 0
+    idle: int = 0
+    discarded: int = 0
+
+
+class _PoolFullCounter(logging.Filter):
+
+    """Count the connections urllib3 discards because their pool is full, letting its warning through."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Count the record if it reports a discarded connection."""
+        if isinstance(record.msg, str) and record.msg.startswith(_POOL_FULL_MESSAGE):
+            with self._lock:
+                self.count += 1
+        return True
+
+
+_pool_full_counter = _PoolFullCounter()
+logging.getLogger("urllib3.connectionpool").addFilter(_pool_full_counter)
+
+
+def client_options(config: Settings) -> dict[str, Any]:
+    """Return the botocore client config options selected by the settings.
+
+    The options are shared by the botocore client of the PynamoDB models and the aiobotocore client of the async
+    repository.
+
+    :param config: The project settings.
+    :return: The keyword arguments of botocore.config.Config.
+    """
+    return {
+        "connect_timeout": config.db_connect_timeout_seconds,
+        "read_timeout": config.db_read_timeout_seconds,
+        "max_pool_connections": config.db_max_pool_connections,
+        "retries": {"mode": config.db_retry_mode, "total_max_attempts": config.db_max_attempts},
+        "tcp_keepalive": config.db_tcp_keepalive,
+    }
+
+
+def configure_client(connection: Connection, config: Settings) -> None:
+    """Create the botocore client of a PynamoDB connection with the client options selected by the settings.
+
+    PynamoDB model options only cover the timeouts, pool size and attempts, the retry mode and TCP keepalive have to be
+    set on the botocore client itself. PynamoDB creates the client again when it has no credentials, that client keeps
+    the timeouts, pool size and attempts, but uses the standard retry mode without TCP keepalive.
+
+    :param connection: The PynamoDB connection.
+    :param config: The project settings.
+    """
+    options = client_options(config)
+    connection._connect_timeout_seconds = options["connect_timeout"]
+    connection._read_timeout_seconds = options["read_timeout"]
+    connection._max_pool_connections = options["max_pool_connections"]
+    connection._max_retry_attempts_exception = config.db_max_attempts - 1
+
+    client = connection.session.create_client(
+        "dynamodb",
+        connection.region,
+        endpoint_url=connection.host,
+        # parameter validation is disabled by PynamoDB too, the requests are built from the model
+        config=Config(parameter_validation=False, **options),
+    )
+    client.meta.events.register_first("before-send.*.*", connection._before_send)
+    connection._client = client
+
+
+def pool_stats(client: Any) -> PoolStats:
+    """Return the connection pool usage of a botocore client.
+
+    :param client: The botocore client.
+    :return: The usage of the connection pools of every host the client talks to.
+    """
+    stats = PoolStats(max_connections=client.meta.config.max_pool_connections, discarded=_pool_full_counter.count)
+    # the urllib3 pools are not exposed by botocore, every pool queue holds its idle connections and a None for each
+    # connection that can still be opened
+    manager = client._endpoint.http_session._manager
+    for key in list(manager.pools.keys()):
+        pool = manager.pools.get(key)
+        if pool is None or pool.pool is None:
+            continue
+        queued = list(pool.pool.queue)
+        stats.idle += sum(conn is not None for conn in queued)
+        stats.in_use += pool.pool.maxsize - len(queued)
+    return stats
@@ -1,10 +1,15 @@
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
+from pynamodb.exceptions import PynamoDBException
 from starlette import status
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 from .api import ErrorDetail, ErrorResponse
+from .dynamodb import THROTTLE_ERROR_CODES
+from .ratelimit import error_response
+
+THROTTLED_RETRY_AFTER_SECONDS = 1.0
 
 
 def validation_exception_handler(_: Request, exc: Exception) -> JSONResponse:
@@ -24,3 +29,18 @@ def validation_exception_handler(_: Request, exc: Exception) -> JSONResponse:
         content=jsonable_encoder(ErrorResponse(detail=details)),
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
     )
+
+
+def throttling_exception_handler(_: Request, exc: Exception) -> JSONResponse:
+    """Handle DynamoDB throttling, which outlasted the retries of the client, and return a JSON response.
+
+    :param _: The request object (unused).
+    :param exc: The PynamoDB exception to handle.
+    :return: A 503 JSON response asking the client to retry.
+    :raises Exception: The exception itself if it is not caused by throttling.
+    """
+    if not isinstance(exc, PynamoDBException) or exc.cause_response_code not in THROTTLE_ERROR_CODES:
+        raise exc
+
+    message = "database is throttling requests, please retry"
+    return error_response(status.HTTP_503_SERVICE_UNAVAILABLE, message, THROTTLED_RETRY_AFTER_SECONDS)
@@ -0,0 +1,390 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime, timedelta
+from typing import NamedTuple, Protocol
+
+from pydantic import BaseModel
+from pynamodb.attributes import BinaryAttribute, NumberAttribute, TTLAttribute, UnicodeAttribute
+from pynamodb.exceptions import DoesNotExist, PutError
+from pynamodb.models import Model
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import Settings, settings
+from .ratelimit import client_key
+
+IDEMPOTENCY_KEY_HEADER = "idempotency-key"
+REPLAYED_HEADER = "idempotent-replayed"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL_SECONDS = 0.05
+DEFAULT_MAX_KEYS = 10000
+
+
+class IdempotencyRecord(BaseModel):
+
+    """Request made with an idempotency key, and its response once it completed.
+
+    :param fingerprint: Digest of the request, a key cannot be reused for a different request.
+    :param status_code: The status of the response, None while the request is in progress.
+    :param expires_at: Unix time after which the key can be used again.
+    """
+
+    fingerprint: str
+    status_code: int | None = None
+    headers: list[tuple[str, str]] = []
+    body: bytes = b""
+    expires_at: float
+
+    @property
+    def completed(self) -> bool:
+        """Return whether the response of the request is stored."""
+        return self.status_code is not None
+
+
+class IdempotencyPolicy(NamedTuple):
+
+    """How long idempotency keys are kept and retries wait for the request in progress.
+
+    :param ttl_seconds: Number of seconds a key and its response are kept.
+    :param wait_seconds: Maximum number of seconds a retry waits for the request in progress.
+    """
+
+    ttl_seconds: float
+    wait_seconds: float
+
+
+class _KeyedRequest(NamedTuple):
+
+    """A request holding the reservation of its idempotency key, with the body read to fingerprint it."""
+
+    key: str
+    fingerprint: str
+    body: bytes
+
+
+class IdempotencyStore(Protocol):
+
+    """Store of the requests made with an idempotency key."""
+
+    def reserve(self, key: str, fingerprint: str, ttl_seconds: float) -> IdempotencyRecord | None:
+        """Record a request as in progress, unless the key is already in use.
+
+        :param key: The idempotency key.
+        :param fingerprint: Digest of the request.
+        :param ttl_seconds: Number of seconds the key is kept.
+        :return: None if the key was reserved for this request, otherwise the record holding the key.
+        """
+
+    def complete(self, key: str, record: IdempotencyRecord) -> None:
+        """Store the response of a reserved request."""
+
+    def release(self, key: str) -> None:
+        """Free a reserved key, e.g. after the request failed, so it can be retried."""
+
+    def get(self, key: str) -> IdempotencyRecord | None:
+        """Return the record holding the key, or None if it is missing or expired."""
+
+
+class MemoryIdempotencyStore:
+
+    """In-process, thread-safe idempotency store, used for tests and single process deployments.
+
+    :param max_keys: Maximum number of keys kept, the oldest ones are dropped first, even before they expire.
+    :param clock: Clock returning the Unix time, used to expire keys.
+    """
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, clock: Callable[[], float] = time.time):
+        if max_keys < 1:
+            raise ValueError("max_keys must be greater than 0")
+
+        self._max_keys = max_keys
+        self._clock = clock
+        self._records: OrderedDict[str, IdempotencyRecord] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float) -> None:
+        # keys are kept for the same TTL, so the oldest reservations expire first
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.expires_at > now:
+                return
+            del self._records[key]
+
+    def reserve(self, key: str, fingerprint: str, ttl_seconds: float) -> IdempotencyRecord | None:
+        """Record a request as in progress, unless the key is already in use."""
+        with self._lock:
+            now = self._clock()
+            self._purge(now)
+            existing = self._records.get(key)
+            if existing is not None:
+                return existing
+            self._records[key] = IdempotencyRecord(fingerprint=fingerprint, expires_at=now + ttl_seconds)
+            while len(self._records) > self._max_keys:
+                self._records.popitem(last=False)
+            return None
+
+    def complete(self, key: str, record: IdempotencyRecord) -> None:
+        """Store the response of a reserved request."""
+        with self._lock:
+            self._records[key] = record
+
+    def release(self, key: str) -> None:
+        """Free a reserved key."""
+        with self._lock:
+            self._records.pop(key, None)
+
+    def get(self, key: str) -> IdempotencyRecord | None:
+        """Return the record holding the key, or None if it is missing or expired."""
+        with self._lock:
+            record = self._records.get(key)
+            return record if record is not None and record.expires_at > self._clock() else None
+
+
+class IdempotencyModel(Model):
+
+    """Idempotency key DynamoDB model, expired items are removed by the table TTL."""
+
+    class Meta:
+
+        """Idempotency model configuration."""
+
+        host = settings.db_host
+        table_name = settings.db_idempotency_table or f"{settings.db_tasks_table}-idempotency"
+
+    key = UnicodeAttribute(hash_key=True)
+    fingerprint = UnicodeAttribute()
+    status_code = NumberAttribute(null=True)
+    headers = UnicodeAttribute(null=True)
+    body = BinaryAttribute(null=True, legacy_encoding=False)
+    expires_at = TTLAttribute()
+
+    @classmethod
+    def from_record(cls, key: str, record: IdempotencyRecord) -> "IdempotencyModel":
+        """Create the item of a record."""
+        return cls(
+            key,
+            fingerprint=record.fingerprint,
+            status_code=record.status_code,
+            headers=json.dumps(record.headers) if record.completed else None,
+            body=record.body or None,
+            expires_at=datetime.fromtimestamp(record.expires_at, UTC),
+        )
+
+    def to_record(self) -> IdempotencyRecord:
+        """Return the record of the item."""
+        return IdempotencyRecord(
+            fingerprint=self.fingerprint,
+            status_code=None if self.status_code is None else int(self.status_code),
+            headers=json.loads(self.headers) if self.headers else [],
+            body=self.body or b"",
+            expires_at=self.expires_at.timestamp(),
+        )
+
+
+class DynamoDBIdempotencyStore:
+
+    """Idempotency store shared by every instance of the API, built on a conditional put per reservation."""
+
+    def reserve(self, key: str, fingerprint: str, ttl_seconds: float) -> IdempotencyRecord | None:
+        """Record a request as in progress, unless the key is already in use."""
+        while True:
+            now = datetime.now(UTC)
+            item = IdempotencyModel(key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=ttl_seconds))
+            # TTL deletes expired items lazily, so an expired item does not hold the key either
+            try:
+                item.save(condition=IdempotencyModel.key.does_not_exist() | (IdempotencyModel.expires_at <= now))
+                return None
+            except PutError as exc:
+                if exc.cause_response_code != "ConditionalCheckFailedException":
+                    raise
+            # the item holding the key may expire or be released before it is read, the reservation is then retried
+            existing = self.get(key)
+            if existing is not None:
+                return existing
+
+    def complete(self, key: str, record: IdempotencyRecord) -> None:
+        """Store the response of a reserved request."""
+        IdempotencyModel.from_record(key, record).save()
+
+    def release(self, key: str) -> None:
+        """Free a reserved key."""
+        IdempotencyModel(key).delete()
+
+    def get(self, key: str) -> IdempotencyRecord | None:
+        """Return the record holding the key, or None if it is missing or expired."""
+        try:
+            item = IdempotencyModel.get(key, consistent_read=True)
+        except DoesNotExist:
+            return None
+        record = item.to_record()
+        return record if record.expires_at > time.time() else None
+
+
+def create_idempotency_store(config: Settings) -> IdempotencyStore | None:
+    """Create the idempotency store selected by the settings.
+
+    :param config: The project settings.
+    :return: The idempotency store, None if idempotency keys are disabled.
+    """
+    if config.idempotency_backend == "memory":
+        return MemoryIdempotencyStore()
+    if config.idempotency_backend == "dynamodb":
+        return DynamoDBIdempotencyStore()
+    return None
+
+
+def _fingerprint(method: str, path: str, body: bytes) -> str:
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _error(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code)
+
+
+class IdempotencyMiddleware:
+
+    """Make POST requests carrying an Idempotency-Key header safe to retry.
+
+    The first request with a key is handled and its response stored, unless it failed with a server error. Retries
+    with the same key get the stored response back, marked with an Idempotent-Replayed header, without being handled
+    again. A retry arriving while the first request is still in progress waits for its response. Keys are scoped to
+    the client, identified as by the rate limiter, so clients picking the same key do not get each other's responses.
+
+    :param app: The ASGI app.
+    :param store: The idempotency store.
+    :param paths: The paths of the endpoints accepting idempotency keys, relative to the root path.
+    :param policy: How long keys are kept and retries wait.
+    """
+
+    def __init__(self, app: ASGIApp, store: IdempotencyStore, paths: Iterable[str], policy: IdempotencyPolicy) -> None:
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+        self.ttl_seconds = policy.ttl_seconds
+        self.wait_seconds = policy.wait_seconds
+
+    def _key(self, scope: Scope) -> str | None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return None
+        root_path = scope.get("root_path", "")
+        path = scope["path"].removeprefix(root_path) if root_path else scope["path"]
+        if path not in self.paths:
+            return None
+        for name, value in scope["headers"]:
+            if name.decode("latin-1").lower() == IDEMPOTENCY_KEY_HEADER:
+                return str(value.decode("latin-1"))
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, replaying the stored response of a request already made with its idempotency key."""
+        header_key = self._key(scope)
+        if header_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not header_key or len(header_key) > MAX_KEY_LENGTH:
+            detail = f"Idempotency-Key must be between 1 and {MAX_KEY_LENGTH} characters"
+            await _error(status.HTTP_400_BAD_REQUEST, detail)(scope, receive, send)
+            return
+        key = f"{client_key(scope)}#{header_key}"
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        fingerprint = _fingerprint(scope["method"], scope["path"], bytes(body))
+
+        deadline = time.monotonic() + self.wait_seconds
+        response: Response
+        while True:
+            record = await run_in_threadpool(self.store.reserve, key, fingerprint, self.ttl_seconds)
+            if record is None:
+                await self._handle(scope, _KeyedRequest(key, fingerprint, bytes(body)), send)
+                return
+            if record.fingerprint != fingerprint:
+                detail = "Idempotency-Key was already used for a different request"
+                response = _error(status.HTTP_422_UNPROCESSABLE_ENTITY, detail)
+                break
+            record = await self._wait(key, record, deadline)
+            if record is not None:
+                response = self._replay(record) if record.completed else self._in_progress()
+                break
+            # the request in progress failed and released the key, this request is handled in its place
+
+        await response(scope, receive, send)
+
+    async def _handle(self, scope: Scope, request: _KeyedRequest, send: Send) -> None:
+        key, fingerprint, body = request
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        headers: list[tuple[str, str]] = []
+        response_body = bytearray()
+        body_sent = False
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return {"type": "http.disconnect"}
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers.extend((name.decode("latin-1"), value.decode("latin-1")) for name, value in message["headers"])
+            elif message["type"] == "http.response.body":
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except BaseException:
+            await run_in_threadpool(self.store.release, key)
+            raise
+
+        if status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+            await run_in_threadpool(self.store.release, key)
+            return
+        record = IdempotencyRecord(
+            fingerprint=fingerprint,
+            status_code=status_code,
+            headers=headers,
+            body=bytes(response_body),
+            expires_at=time.time() + self.ttl_seconds,
+        )
+        await run_in_threadpool(self.store.complete, key, record)
+
+    async def _wait(self, key: str, record: IdempotencyRecord | None, deadline: float) -> IdempotencyRecord | None:
+        """Poll the record of a request in progress until it completes, is released or the deadline passes."""
+        while record is not None and not record.completed and time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            record = await run_in_threadpool(self.store.get, key)
+        return record
+
+    @staticmethod
+    def _in_progress() -> JSONResponse:
+        return _error(status.HTTP_409_CONFLICT, "a request with this Idempotency-Key is in progress")
+
+    @staticmethod
+    def _replay(record: IdempotencyRecord) -> Response:
+        response = Response(record.body, status_code=record.status_code or status.HTTP_200_OK)
+        response.raw_headers = [
+            *(
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in record.headers
+                if name != "content-length"
+            ),
+            (b"content-length", str(len(record.body)).encode("latin-1")),
+            (REPLAYED_HEADER.encode("latin-1"), b"true"),
+        ]
+        return response
@@ -0,0 +1,262 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
+
+from botocore.handlers import BUILTIN_HANDLERS
+from starlette import status
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .dynamodb import THROTTLE_ERROR_CODES
+from .ratelimit import error_response
+
+DEFAULT_WINDOW_SECONDS = 10.0
+DEFAULT_ADJUST_SECONDS = 1.0
+SHED_RETRY_AFTER_SECONDS = 1.0
+_CALL_CONTEXT_KEY = "app_loadshed_call"
+
+
+class HealthStats(NamedTuple):
+
+    """DynamoDB calls made over the health window.
+
+    :param mean_latency: The mean duration of the calls including retries, in seconds.
+    :param throttle_rate: The share of the attempts of the calls rejected by DynamoDB throttling, retried or not.
+    """
+
+    calls: int
+    mean_latency: float
+    throttle_rate: float
+
+
+class LoadSheddingPolicy(NamedTuple):
+
+    """Limits of the requests in flight and the DynamoDB health under which they apply.
+
+    :param max_in_flight: Maximum number of requests in flight while DynamoDB is healthy.
+    :param latency_target_seconds: Mean DynamoDB call latency above which the limit is lowered.
+    :param max_throttle_rate: Share of throttled DynamoDB requests, retries included, above which the limit is lowered.
+    :param min_in_flight: The lowest the limit goes.
+    :param adjust_seconds: Number of seconds between adjustments of the limit.
+    """
+
+    max_in_flight: int
+    latency_target_seconds: float
+    max_throttle_rate: float
+    min_in_flight: int = 1
+    adjust_seconds: float = DEFAULT_ADJUST_SECONDS
+
+
+class DynamoDBHealth:
+
+    """Latency and throttling of the DynamoDB calls of the process over a sliding window.
+
+    The calls are summed per second, so recording a call and reading the stats cost the same whatever the traffic.
+
+    :param window_seconds: Number of seconds of calls the stats are computed over.
+    :param clock: Monotonic clock used to expire the calls.
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self._window_seconds = window_seconds
+        self._clock = clock
+        # [second, calls, duration, attempts, throttled attempts], oldest first
+        self._buckets: deque[list[Any]] = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._buckets and self._buckets[0][0] <= now - self._window_seconds:
+            self._buckets.popleft()
+
+    def record(self, duration: float, attempts: int = 1, throttled: int = 0) -> None:
+        """Record a DynamoDB call.
+
+        :param duration: The duration of the call including retries, in seconds.
+        :param attempts: The number of requests sent for the call, retries included.
+        :param throttled: The number of those requests rejected by DynamoDB throttling.
+        """
+        with self._lock:
+            now = self._clock()
+            second = int(now)
+            if not self._buckets or self._buckets[-1][0] != second:
+                self._buckets.append([second, 0, 0.0, 0, 0])
+            bucket = self._buckets[-1]
+            bucket[1] += 1
+            bucket[2] += duration
+            bucket[3] += attempts
+            bucket[4] += throttled
+            self._expire(now)
+
+    @property
+    def stats(self) -> HealthStats:
+        """Return the calls made over the window."""
+        with self._lock:
+            self._expire(self._clock())
+            calls = sum(bucket[1] for bucket in self._buckets)
+            if not calls:
+                return HealthStats(calls=0, mean_latency=0.0, throttle_rate=0.0)
+            return HealthStats(
+                calls=calls,
+                mean_latency=sum(bucket[2] for bucket in self._buckets) / calls,
+                throttle_rate=sum(bucket[4] for bucket in self._buckets) / sum(bucket[3] for bucket in self._buckets),
+            )
+
+
+dynamodb_health = DynamoDBHealth()
+
+
+def _on_before_call(context: dict[str, Any], **_: Any) -> None:
+    # [start, attempts, throttled attempts]
+    context[_CALL_CONTEXT_KEY] = [time.perf_counter(), 0, 0]
+
+
+def _on_needs_retry(request_dict: dict[str, Any], response: Any = None, **_: Any) -> None:
+    # emitted after every attempt, including those the retries recovered from, which after-call does not see
+    call = request_dict.get("context", {}).get(_CALL_CONTEXT_KEY)
+    if call is not None:
+        call[1] += 1
+        if response is not None:
+            _, parsed = response
+            call[2] += parsed.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+
+def _record_call(context: dict[str, Any]) -> None:
+    call = context.pop(_CALL_CONTEXT_KEY, None)
+    if call is not None:
+        start, attempts, throttled = call
+        dynamodb_health.record(time.perf_counter() - start, max(attempts, 1), throttled)
+
+
+def _on_after_call(context: dict[str, Any], **_: Any) -> None:
+    _record_call(context)
+
+
+def _on_after_call_error(context: dict[str, Any], **_: Any) -> None:
+    _record_call(context)
+
+
+_HANDLERS = [
+    ("before-call.dynamodb", _on_before_call),
+    ("needs-retry.dynamodb", _on_needs_retry),
+    ("after-call.dynamodb", _on_after_call),
+    ("after-call-error.dynamodb", _on_after_call_error),
+]
+
+
+def install_health_hooks() -> None:
+    """Record the DynamoDB calls of every botocore client created afterwards in dynamodb_health."""
+    for handler in _HANDLERS:
+        if handler not in BUILTIN_HANDLERS:
+            BUILTIN_HANDLERS.append(handler)
+
+
+class LoadShedder:
+
+    """Admit requests while the requests in flight stay under a limit adapted to the health of DynamoDB.
+
+    Every adjust interval, the limit is halved, down to min_in_flight, if the mean latency of the DynamoDB calls over
+    the health window exceeds the latency target or their throttle rate exceeds max_throttle_rate. Otherwise, it grows
+    back by a tenth of max_in_flight.
+
+    :param policy: The limits of the requests in flight and the health thresholds.
+    :param health: The health of DynamoDB.
+    :param clock: Monotonic clock used to adjust the limit.
+    """
+
+    def __init__(
+        self,
+        policy: LoadSheddingPolicy,
+        health: DynamoDBHealth = dynamodb_health,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 < policy.min_in_flight <= policy.max_in_flight:
+            raise ValueError("min_in_flight must be greater than 0 and at most max_in_flight")
+
+        self.max_in_flight = policy.max_in_flight
+        self.latency_target_seconds = policy.latency_target_seconds
+        self.max_throttle_rate = policy.max_throttle_rate
+        self.health = health
+        self.min_in_flight = policy.min_in_flight
+        self._adjust_seconds = policy.adjust_seconds
+        self._clock = clock
+        self._limit = policy.max_in_flight
+        self._in_flight = 0
+        self._adjusted_at = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """Return the current limit of requests in flight."""
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of requests in flight."""
+        return self._in_flight
+
+    def _adjust(self) -> None:
+        now = self._clock()
+        if now - self._adjusted_at < self._adjust_seconds:
+            return
+        self._adjusted_at = now
+        stats = self.health.stats
+        if stats.mean_latency > self.latency_target_seconds or stats.throttle_rate > self.max_throttle_rate:
+            self._limit = max(self.min_in_flight, self._limit // 2)
+        else:
+            self._limit = min(self.max_in_flight, self._limit + max(self.max_in_flight // 10, 1))
+
+    def try_acquire(self) -> bool:
+        """Admit a request if the requests in flight are under the limit, release it once it completed.
+
+        :return: Whether the request was admitted.
+        """
+        with self._lock:
+            self._adjust()
+            if self._in_flight >= self._limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self) -> None:
+        """Release an admitted request."""
+        with self._lock:
+            self._in_flight -= 1
+
+
+class LoadSheddingMiddleware:
+
+    """Answer 503 to the requests the load shedder does not admit, before they reach DynamoDB.
+
+    :param app: The ASGI app.
+    :param shedder: The load shedder.
+    :param exempt_paths: Paths, relative to the root path, which are always admitted and not counted in flight, e.g.
+        long-lived streams not calling DynamoDB.
+    """
+
+    def __init__(self, app: ASGIApp, shedder: LoadShedder, exempt_paths: Iterable[str] = ()) -> None:
+        self.app = app
+        self.shedder = shedder
+        self.exempt_paths = frozenset(exempt_paths)
+
+    def _is_exempt(self, scope: Scope) -> bool:
+        root_path = scope.get("root_path", "")
+        path = scope["path"].removeprefix(root_path) if root_path else scope["path"]
+        return path in self.exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request if the load shedder admits it."""
+        if scope["type"] != "http" or self._is_exempt(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.shedder.try_acquire():
+            response = error_response(
+                status.HTTP_503_SERVICE_UNAVAILABLE, "service overloaded, please retry", SHED_RETRY_AFTER_SECONDS
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.shedder.release()
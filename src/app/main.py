@@ -1,18 +1,123 @@
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from mangum import Mangum
+from pynamodb.exceptions import PynamoDBException
 
 from .api import api_router
+from .compression import CompressionMiddleware
 from .config import settings
-from .exception_handlers import validation_exception_handler
+from .exception_handlers import throttling_exception_handler, validation_exception_handler
+from .idempotency import IdempotencyMiddleware, IdempotencyPolicy, create_idempotency_store
+from .loadshed import LoadShedder, LoadSheddingMiddleware, LoadSheddingPolicy, install_health_hooks
+from .metrics import DynamoDBMetricsMiddleware, install_dynamodb_hooks
+from .profiling import ProfilingMiddleware, ProfilingPolicy
+from .ratelimit import RateLimitMiddleware, create_rate_limit_store
+from .tasks.models import close_connection, prewarm_connection, task_pool_stats
+from .tasks.repository import task_repository
 
 logging.basicConfig(level=logging.DEBUG if settings.debug else logging.INFO)
 
-app = FastAPI(title=settings.project_name, version=settings.version, redoc_url=None, root_path=settings.api_prefix)
+# the endpoints creating tasks, retrying them with the same Idempotency-Key does not create duplicates
+IDEMPOTENT_PATHS = ("/tasks", "/tasks:batchCreate")
+# long polls and event streams of the change feed stay open without calling DynamoDB
+LOAD_SHEDDING_EXEMPT_PATHS = ("/tasks:changes",)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Open the shared DynamoDB clients when the app starts and close them when it shuts down.
+
+    Run by long-running servers, see app.server. Mangum runs the app without lifespan, the clients are then created on
+    first use, or by prewarm_connection.
+    """
+    if settings.storage_backend == "dynamodb":
+        prewarm_connection()
+        if settings.db_backend == "async":
+            await task_repository.open()
+    yield
+    await task_repository.close()
+    close_connection()
+
+
+app = FastAPI(
+    title=settings.project_name,
+    version=settings.version,
+    redoc_url=None,
+    docs_url="/docs" if settings.docs_enabled else None,
+    openapi_url="/openapi.json" if settings.docs_enabled else None,
+    root_path=settings.api_prefix,
+    lifespan=lifespan,
+)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.add_exception_handler(PynamoDBException, throttling_exception_handler)
 
 app.include_router(api_router)
 
+idempotency_store = create_idempotency_store(settings)
+if idempotency_store is not None:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=idempotency_store,
+        paths=IDEMPOTENT_PATHS,
+        policy=IdempotencyPolicy(
+            ttl_seconds=settings.idempotency_ttl_seconds,
+            wait_seconds=settings.idempotency_wait_seconds,
+        ),
+    )
+
+if settings.metrics_enabled:
+    install_dynamodb_hooks()
+    app.add_middleware(
+        DynamoDBMetricsMiddleware,
+        emf_namespace=settings.metrics_namespace if settings.metrics_emf else None,
+        pool_stats=task_pool_stats,
+    )
+
+rate_limit_store = create_rate_limit_store(settings)
+if rate_limit_store is not None:
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=rate_limit_store,
+        rate=settings.rate_limit_per_second,
+        burst=settings.rate_limit_burst,
+    )
+
+# sheds requests before they take a token from the rate limits
+if settings.load_shedding_enabled:
+    install_health_hooks()
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        shedder=LoadShedder(
+            LoadSheddingPolicy(
+                max_in_flight=settings.load_shedding_max_in_flight,
+                latency_target_seconds=settings.load_shedding_latency_target_seconds,
+                max_throttle_rate=settings.load_shedding_max_throttle_rate,
+            )
+        ),
+        exempt_paths=LOAD_SHEDDING_EXEMPT_PATHS,
+    )
+
+# outermost, so the idempotency middleware stores and replays uncompressed responses
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware, min_size=settings.compression_min_size)
+
+# profiles cover every other middleware, not installed at all while profiling is off
+if settings.profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        policy=ProfilingPolicy(
+            sample_rate=settings.profiling_sample_rate,
+            token=settings.profiling_token.get_secret_value() if settings.profiling_token is not None else None,
+            output_dir=settings.profiling_output_dir,
+            interval_seconds=settings.profiling_interval_seconds,
+        ),
+    )
+
+if settings.db_prewarm:
+    prewarm_connection()
+
 handler = Mangum(app, lifespan="off")
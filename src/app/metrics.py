@@ -0,0 +1,294 @@
+import json
+import logging
+import sys
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any
+
+from botocore.handlers import BUILTIN_HANDLERS
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .dynamodb import PoolStats
+
+READ_OPERATIONS = frozenset({"BatchGetItem", "GetItem", "Query", "Scan", "TransactGetItems"})
+UNMATCHED_ROUTE = "unmatched"
+
+_RETURN_CONSUMED_CAPACITY = "ReturnConsumedCapacity"
+_EMF_UNITS = {
+    "Latency": "Milliseconds",
+    "DynamoDBCalls": "Count",
+    "DynamoDBLatency": "Milliseconds",
+    "ConsumedReadCapacity": "Count",
+    "ConsumedWriteCapacity": "Count",
+    "CoalescedReads": "Count",
+    "CoalescedWrites": "Count",
+    "WriteCoalescingDelay": "Milliseconds",
+    "PoolConnectionsInUse": "Count",
+    "PoolUtilization": "Percent",
+}
+_CALL_CONTEXT_KEY = "app_metrics_call"
+
+logger = logging.getLogger(__name__)
+
+
+class OperationMetrics:
+
+    """Number and duration of the calls made to a DynamoDB operation."""
+
+    __slots__ = ("calls", "duration")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.duration = 0.0
+
+
+class RequestMetrics:
+
+    """DynamoDB calls, their duration and consumed capacity, recorded while handling a request.
+
+    Reads shared with a concurrent request instead of calling DynamoDB are counted as coalesced reads, updates merged
+    into the write of a concurrent request as coalesced writes. The time updates waited for their merged write to start
+    is recorded as the write coalescing delay.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.duration = 0.0
+        self.read_capacity = 0.0
+        self.write_capacity = 0.0
+        self.coalesced_reads = 0
+        self.coalesced_writes = 0
+        self.write_coalescing_delay = 0.0
+        self.operations: dict[str, OperationMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, duration: float, capacity_units: float) -> None:
+        """Record a DynamoDB call.
+
+        :param operation: The DynamoDB operation name, e.g. GetItem.
+        :param duration: The duration of the call including retries, in seconds.
+        :param capacity_units: The capacity units consumed by the call.
+        """
+        with self._lock:
+            self.calls += 1
+            self.duration += duration
+            if operation in READ_OPERATIONS:
+                self.read_capacity += capacity_units
+            else:
+                self.write_capacity += capacity_units
+            operation_metrics = self.operations.setdefault(operation, OperationMetrics())
+            operation_metrics.calls += 1
+            operation_metrics.duration += duration
+
+    def record_coalesced_read(self) -> None:
+        """Record a read shared with the DynamoDB call of a concurrent request."""
+        with self._lock:
+            self.coalesced_reads += 1
+
+    def record_coalesced_write(self, delay: float, shared: bool) -> None:
+        """Record an update written by write coalescing.
+
+        :param delay: The time the update waited for its write to start, in seconds.
+        :param shared: Whether the update was merged into the write of a concurrent request.
+        """
+        with self._lock:
+            self.coalesced_writes += shared
+            self.write_coalescing_delay += delay
+
+    def server_timing(self, total: float) -> str:
+        """Build the Server-Timing header value, with durations in milliseconds.
+
+        :param total: The duration of the whole request so far, in seconds.
+        """
+        return (
+            f'db;dur={self.duration * 1000:.2f};desc="{self.calls} calls, {self.read_capacity:g} RCU, '
+            f'{self.write_capacity:g} WCU", total;dur={total * 1000:.2f}'
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a JSON serializable dict, with durations in milliseconds."""
+        return {
+            "calls": self.calls,
+            "duration_ms": round(self.duration * 1000, 3),
+            "read_capacity_units": self.read_capacity,
+            "write_capacity_units": self.write_capacity,
+            "coalesced_reads": self.coalesced_reads,
+            "coalesced_writes": self.coalesced_writes,
+            "write_coalescing_delay_ms": round(self.write_coalescing_delay * 1000, 3),
+            "operations": {
+                name: {"calls": operation.calls, "duration_ms": round(operation.duration * 1000, 3)}
+                for name, operation in self.operations.items()
+            },
+        }
+
+
+_current_metrics: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def current_metrics() -> RequestMetrics | None:
+    """Return the metrics of the request being handled, None outside of an instrumented request."""
+    return _current_metrics.get()
+
+
+def _consumed_capacity_units(consumed: Any) -> float:
+    # single item operations return a dict, batch and transaction operations a list with an entry per table
+    if isinstance(consumed, dict):
+        return float(consumed.get("CapacityUnits", 0.0))
+    if isinstance(consumed, list):
+        return sum(_consumed_capacity_units(item) for item in consumed)
+    return 0.0
+
+
+def _on_provide_client_params(params: dict[str, Any], model: Any, **_: Any) -> None:
+    input_shape = model.input_shape
+    if (
+        _current_metrics.get() is not None
+        and input_shape is not None
+        and _RETURN_CONSUMED_CAPACITY in input_shape.members
+    ):
+        params.setdefault(_RETURN_CONSUMED_CAPACITY, "TOTAL")
+
+
+def _on_before_call(model: Any, context: dict[str, Any], **_: Any) -> None:
+    if _current_metrics.get() is not None:
+        context[_CALL_CONTEXT_KEY] = (model.name, time.perf_counter())
+
+
+def _record_call(context: dict[str, Any], consumed: Any) -> None:
+    metrics = _current_metrics.get()
+    call = context.pop(_CALL_CONTEXT_KEY, None)
+    if metrics is None or call is None:
+        return
+    operation, start = call
+    metrics.record(operation, time.perf_counter() - start, _consumed_capacity_units(consumed))
+
+
+def _on_after_call(parsed: dict[str, Any], context: dict[str, Any], **_: Any) -> None:
+    _record_call(context, parsed.get("ConsumedCapacity"))
+
+
+def _on_after_call_error(context: dict[str, Any], **_: Any) -> None:
+    _record_call(context, None)
+
+
+_HANDLERS = [
+    ("provide-client-params.dynamodb", _on_provide_client_params),
+    ("before-call.dynamodb", _on_before_call),
+    ("after-call.dynamodb", _on_after_call),
+    ("after-call-error.dynamodb", _on_after_call_error),
+]
+
+
+def install_dynamodb_hooks() -> None:
+    """Register the DynamoDB hooks on every botocore client created afterwards.
+
+    Both the PynamoDB and the aiobotocore clients are created lazily, registering the hooks as builtin handlers covers
+    them without creating the clients up front. The hooks do nothing outside of an instrumented request.
+    """
+    for handler in _HANDLERS:
+        if handler not in BUILTIN_HANDLERS:
+            BUILTIN_HANDLERS.append(handler)
+
+
+class DynamoDBMetricsMiddleware:
+
+    """Record the DynamoDB calls made by each request.
+
+    The metrics are returned in the Server-Timing header, logged as a JSON line once the response is sent and,
+    optionally, written to stdout in the CloudWatch Embedded Metric Format.
+
+    :param app: The ASGI app to instrument.
+    :param emf_namespace: The CloudWatch namespace of the EMF metrics, EMF output is disabled if None.
+    :param pool_stats: Return the connection pool usage of the DynamoDB client, recorded when each request completes.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        emf_namespace: str | None = None,
+        pool_stats: Callable[[], PoolStats | None] | None = None,
+    ) -> None:
+        self.app = app
+        self.emf_namespace = emf_namespace
+        self.pool_stats = pool_stats
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, recording its DynamoDB calls."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_server_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", metrics.server_timing(time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            _current_metrics.reset(token)
+            self._emit(scope, status_code, metrics, time.perf_counter() - start)
+
+    def _emit(self, scope: Scope, status_code: int, metrics: RequestMetrics, duration: float) -> None:
+        route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+        record = {
+            "method": scope["method"],
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "dynamodb": metrics.as_dict(),
+        }
+        pool = self.pool_stats() if self.pool_stats is not None else None
+        if pool is not None:
+            record["pool"] = pool.model_dump()
+        logger.info(json.dumps(record, separators=(",", ":")))
+
+        if self.emf_namespace is not None:
+            sys.stdout.write(json.dumps(_emf(self.emf_namespace, record), separators=(",", ":")) + "\n")
+
+
+def _emf(namespace: str, record: dict[str, Any]) -> dict[str, Any]:
+    dynamodb = record["dynamodb"]
+    values = {
+        "Latency": record["duration_ms"],
+        "DynamoDBCalls": dynamodb["calls"],
+        "DynamoDBLatency": dynamodb["duration_ms"],
+        "ConsumedReadCapacity": dynamodb["read_capacity_units"],
+        "ConsumedWriteCapacity": dynamodb["write_capacity_units"],
+        "CoalescedReads": dynamodb["coalesced_reads"],
+        "CoalescedWrites": dynamodb["coalesced_writes"],
+        "WriteCoalescingDelay": dynamodb["write_coalescing_delay_ms"],
+    }
+    pool = record.get("pool")
+    if pool is not None:
+        values["PoolConnectionsInUse"] = pool["in_use"]
+        values["PoolUtilization"] = round(pool["in_use"] / pool["max_connections"] * 100, 1)
+
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [["Method", "Route"]],
+                    "Metrics": [{"Name": name, "Unit": _EMF_UNITS[name]} for name in values],
+                }
+            ],
+        },
+        "Method": record["method"],
+        "Route": record["route"],
+        "StatusCode": record["status"],
+        **values,
+    }
@@ -0,0 +1,231 @@
+import hmac
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import NamedTuple
+from uuid import uuid4
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import UNMATCHED_ROUTE
+
+PROFILE_HEADER = "x-debug-profile"
+PROFILE_ID_HEADER = "x-debug-profile-id"
+DEFAULT_INTERVAL_SECONDS = 0.005
+COLLAPSED_SUFFIX = ".collapsed"
+# request ids name the profile files, those of clients are only used if they cannot escape the output directory
+_REQUEST_ID_PATTERN = re.compile(r"[\w-]{1,128}")
+_FILE_NAME_PATTERN = re.compile(r"\W+")
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def _frame_label(code: CodeType) -> str:
+    return f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+
+    """Sample the stacks of every thread of the process from a background thread.
+
+    Unlike a deterministic profiler, the profiled code runs untouched between samples, so the overhead only depends on
+    the sampling interval. Functions running for less than the interval may not show up.
+
+    :param interval_seconds: Number of seconds between two samples.
+    """
+
+    def __init__(self, interval_seconds: float = DEFAULT_INTERVAL_SECONDS) -> None:
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def sample(self) -> None:
+        """Record the current stack of every thread but the calling one, prefixed with the thread name."""
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, top_frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            frame: FrameType | None = top_frame
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            self.sample()
+
+    def start(self) -> None:
+        """Start sampling in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread to exit."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Return the samples as collapsed stacks, a stack and its count per line, as loaded by speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _request_id(scope: Scope, headers: Headers) -> str:
+    # Mangum passes the Lambda context, whose request id also tags the logs of the invocation
+    context = scope.get("aws.context")
+    request_id = getattr(context, "aws_request_id", None) or headers.get("x-request-id")
+    if request_id is None or not _REQUEST_ID_PATTERN.fullmatch(request_id):
+        return uuid4().hex
+    return request_id
+
+
+class ProfilingPolicy(NamedTuple):
+
+    """Which requests are profiled, how often their stacks are sampled and where their profiles go.
+
+    :param sample_rate: Share of the requests profiled, between 0 and 1.
+    :param token: Requests with this value in their X-Debug-Profile header are always profiled, None to only sample.
+    :param output_dir: Directory the profiles are written to, None to log them.
+    :param interval_seconds: Number of seconds between two samples of a profiled request.
+    """
+
+    sample_rate: float = 0.0
+    token: str | None = None
+    output_dir: str | Path | None = None
+    interval_seconds: float = DEFAULT_INTERVAL_SECONDS
+
+
+class ProfilingMiddleware:
+
+    """Profile a fraction of the requests, and the requests carrying the debug token, with a stack sampler.
+
+    At most one request is profiled at a time per process, the requests arriving meanwhile are handled unprofiled. The
+    collapsed stacks of a profiled request are written to a file named after its route and request id in the output
+    directory, or logged as a JSON line with its route and request id without one, and the request id is returned in
+    the X-Debug-Profile-Id header.
+
+    A request runs on the event loop thread and on threadpool workers shared with the other requests, so the sampler
+    records every thread of the process: the stacks of other requests handled meanwhile show up in the profile too.
+    The number of those overlapping requests is logged with the profile, a profile without any only holds the request.
+
+    :param app: The ASGI app.
+    :param policy: The requests profiled, the sampling interval and the output directory.
+    :param sample: Random number generator drawing the requests to profile.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        policy: ProfilingPolicy,
+        sample: Callable[[], float] = random.random,
+    ) -> None:
+        if not 0 <= policy.sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+
+        self.app = app
+        self.sample_rate = policy.sample_rate
+        self.token = policy.token.encode("utf-8") if policy.token else None
+        self.output_dir = Path(policy.output_dir) if policy.output_dir is not None else None
+        self.interval_seconds = policy.interval_seconds
+        self._sample = sample
+        self._lock = threading.Lock()
+        # requests are counted on the event loop thread, the other requests started while profiling included
+        self._in_flight = 0
+        self._overlapping: int | None = None
+
+    def _should_profile(self, headers: Headers) -> bool:
+        header = headers.get(PROFILE_HEADER)
+        if header is not None and self.token is not None and hmac.compare_digest(header.encode("utf-8"), self.token):
+            return True
+        return self.sample_rate > 0 and self._sample() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, profiling it if it is drawn or carries the debug token."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._in_flight += 1
+        if self._overlapping is not None:
+            self._overlapping += 1
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+
+    async def _handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        headers = Headers(scope=scope)
+        if not self._should_profile(headers) or not self._lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope, headers)
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, request_id)
+            await send(message)
+
+        sampler = StackSampler(self.interval_seconds)
+        start = time.perf_counter()
+        self._overlapping = self._in_flight - 1
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            try:
+                self._emit(scope, request_id, sampler, time.perf_counter() - start)
+            finally:
+                self._overlapping = None
+                self._lock.release()
+
+    def _emit(self, scope: Scope, request_id: str, sampler: StackSampler, duration: float) -> None:
+        overlapping = self._overlapping or 0
+        route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+        if self.output_dir is not None:
+            name = _FILE_NAME_PATTERN.sub("_", f"{scope['method']} {route}").strip("_")
+            path = self.output_dir / f"{name}-{request_id}{COLLAPSED_SUFFIX}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(sampler.collapsed(), encoding="utf-8")
+            logger.info(
+                "profiled %s %s in %d samples of every thread of the process, %d other requests overlapping, "
+                "written to %s",
+                scope["method"],
+                route,
+                sampler.samples,
+                overlapping,
+                path,
+            )
+            return
+
+        record = {
+            "profile": request_id,
+            "method": scope["method"],
+            "route": route,
+            "duration_ms": round(duration * 1000, 3),
+            "samples": sampler.samples,
+            # the stacks are those of every thread of the process, other requests included
+            "scope": "process",
+            "overlapping_requests": overlapping,
+            "stacks": dict(sampler.stacks.most_common()),
+        }
+        logger.info(json.dumps(record, separators=(",", ":")))
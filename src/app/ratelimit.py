@@ -0,0 +1,207 @@
+import hashlib
+import importlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Protocol, cast
+
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .api import ErrorDetail, ErrorResponse
+from .config import Settings
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+API_KEY_HEADER = "x-api-key"
+DEFAULT_MAX_KEYS = 10000
+# optimistic transactions retried on a concurrent change of the same bucket before the request is let through
+_MAX_REDIS_ATTEMPTS = 5
+
+
+def take_token(tokens: float, updated_at: float, now: float, rate: float, burst: int) -> tuple[float, float]:
+    """Refill a token bucket up to burst tokens at rate tokens per second, and take a token if one is available.
+
+    :param tokens: The tokens in the bucket when it was last updated.
+    :param updated_at: When the bucket was last updated, in seconds.
+    :param now: The current time, in seconds.
+    :param rate: Number of tokens added per second.
+    :param burst: Maximum number of tokens in the bucket.
+    :return: The tokens left in the bucket, and 0 if a token was taken or the seconds until one is available.
+    """
+    tokens = min(float(burst), tokens + max(now - updated_at, 0.0) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class RateLimitStore(Protocol):
+
+    """Store of the token buckets of the clients."""
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take a token from the bucket of a client, a full bucket of burst tokens if it has none yet.
+
+        :param key: The client key.
+        :param rate: Number of tokens added per second.
+        :param burst: Maximum number of tokens in the bucket.
+        :return: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+
+
+class MemoryRateLimitStore:
+
+    """In-process, thread-safe token buckets, dropping the buckets of the least recently seen clients.
+
+    :param max_keys: Maximum number of buckets kept, a dropped bucket starts full again.
+    :param clock: Monotonic clock used to refill the buckets.
+    """
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        if max_keys < 1:
+            raise ValueError("max_keys must be greater than 0")
+
+        self._max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take a token from the bucket of a client, returning 0 or the seconds until a token is available."""
+        with self._lock:
+            now = self._clock()
+            tokens, updated_at = self._buckets.get(key, (float(burst), now))
+            tokens, retry_after = take_token(tokens, updated_at, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class RedisRateLimitStore:
+
+    """Token buckets shared by every process through a server speaking the Redis protocol.
+
+    Each bucket is a hash updated in an optimistic transaction, it expires once it would be full again. The buckets are
+    refilled with the clock of the processes, which are expected to be roughly in sync.
+
+    :param client: The Redis client.
+    :param clock: Clock returning the Unix time, used to refill the buckets.
+    """
+
+    def __init__(self, client: "Redis", clock: Callable[[], float] = time.time):
+        self._client = client
+        self._clock = clock
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitStore":
+        """Create a RedisRateLimitStore connected to the given URL.
+
+        :param url: The Redis connection URL, e.g. redis://localhost:6379/0.
+        :return: The RedisRateLimitStore instance.
+        :raises RuntimeError: If the redis package is not installed.
+        """
+        try:
+            redis = importlib.import_module("redis")
+        except ImportError as exc:
+            raise RuntimeError("redis rate limit backend requires the 'redis' extra to be installed") from exc
+
+        return cls(redis.Redis.from_url(url))
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take a token from the bucket of a client, returning 0 or the seconds until a token is available.
+
+        A bucket changed by other processes on every attempt lets the request through, rather than adding latency.
+        """
+        name = f"ratelimit:{key}"
+        watch_error = importlib.import_module("redis.exceptions").WatchError
+        for _ in range(_MAX_REDIS_ATTEMPTS):
+            with self._client.pipeline() as pipe:
+                try:
+                    pipe.watch(name)  # type: ignore[no-untyped-call]
+                    now = self._clock()
+                    # the pipeline runs the commands immediately until multi is called
+                    state = cast(list[bytes | None], pipe.hmget(name, ["tokens", "updated_at"]))
+                    tokens, updated_at = (float(burst), now) if None in state else map(float, cast(list[bytes], state))
+                    tokens, retry_after = take_token(tokens, updated_at, now, rate, burst)
+                    pipe.multi()
+                    pipe.hset(name, mapping={"tokens": tokens, "updated_at": now})
+                    pipe.pexpire(name, math.ceil((burst - tokens) / rate * 1000) + 1)
+                    pipe.execute()
+                except watch_error:
+                    continue
+                return retry_after
+        return 0.0
+
+
+def create_rate_limit_store(config: Settings) -> RateLimitStore | None:
+    """Create the rate limit store selected by the settings.
+
+    :param config: The project settings.
+    :return: The rate limit store, None if rate limiting is disabled.
+    """
+    if config.rate_limit_backend == "memory":
+        return MemoryRateLimitStore()
+    if config.rate_limit_backend == "redis":
+        return RedisRateLimitStore.from_url(config.rate_limit_redis_url)
+    return None
+
+
+def client_key(scope: Scope) -> str:
+    """Return the key of the client making a request, its API key if it sent one, otherwise its address.
+
+    API keys are hashed, so they are not stored in a shared backend.
+    """
+    api_key = Headers(scope=scope).get(API_KEY_HEADER)
+    if api_key:
+        return f"key:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:32]}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def error_response(status_code: int, message: str, retry_after: float) -> JSONResponse:
+    """Build an ErrorResponse asking the client to retry after the given number of seconds, rounded up."""
+    return JSONResponse(
+        ErrorResponse(detail=[ErrorDetail(message=message)]).model_dump(),
+        status_code=status_code,
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+
+class RateLimitMiddleware:
+
+    """Limit the rate of requests of each client with a token bucket, answering 429 once it is empty.
+
+    Clients are identified by their API key, or their address when they do not send one.
+
+    :param app: The ASGI app.
+    :param store: The store of the token buckets.
+    :param rate: Number of requests per second a client can make.
+    :param burst: Number of requests a client can make at once after being idle.
+    """
+
+    def __init__(self, app: ASGIApp, store: RateLimitStore, rate: float, burst: int) -> None:
+        self.app = app
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, unless its client ran out of tokens."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await run_in_threadpool(self.store.take, client_key(scope), self.rate, self.burst)
+        if retry_after > 0:
+            response = error_response(status.HTTP_429_TOO_MANY_REQUESTS, "rate limit exceeded", retry_after)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
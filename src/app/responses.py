@@ -0,0 +1,19 @@
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+
+class ModelResponse(JSONResponse):
+
+    """JSON response for Pydantic models the endpoint has already validated.
+
+    Returning a response from an endpoint skips FastAPI's validation and serialization of the return value against
+    the response model. Models are encoded by pydantic-core straight to JSON bytes, other content as a JSONResponse.
+    """
+
+    def render(self, content: Any) -> bytes:
+        """Encode the content, straight to JSON bytes if it is a Pydantic model."""
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return super().render(content)
@@ -0,0 +1,91 @@
+"""Serve the API from a long-running, multi-worker ASGI server, for containers instead of Lambda.
+
+Each worker process runs the app with its lifespan, opening the shared DynamoDB clients on startup and closing them once
+the requests in flight completed on shutdown. uvloop and httptools are used when installed, as by the server extra.
+State kept in memory is not shared by the workers: with several of them, idempotency keys must be kept in DynamoDB and
+the in-memory change feed is disabled, as in the Lambda stack.
+
+Usage:
+    python -m app.server
+"""
+
+import importlib
+import os
+import sys
+from typing import Any
+
+from .config import Settings, settings
+
+APP = "app.main:app"
+
+
+def server_options(config: Settings) -> dict[str, Any]:
+    """Return the uvicorn options of the server configured by the settings.
+
+    :param config: The project settings.
+    :return: The keyword arguments of uvicorn.run.
+    """
+    return {
+        "host": config.server_host,
+        "port": config.server_port,
+        "workers": config.server_workers or os.cpu_count() or 1,
+        "backlog": config.server_backlog,
+        "limit_concurrency": config.server_limit_concurrency,
+        "timeout_keep_alive": config.server_keepalive_seconds,
+        "timeout_graceful_shutdown": config.server_graceful_shutdown_seconds,
+        "loop": "auto",
+        "http": "auto",
+        "lifespan": "on",
+        "proxy_headers": True,
+        # the metrics middleware already logs every request
+        "access_log": not config.metrics_enabled,
+    }
+
+
+def worker_environment(config: Settings, workers: int) -> dict[str, str]:
+    """Return the environment variables the workers are started with, so that they do not keep diverging state.
+
+    The in-memory change feed of a worker only carries its own changes, and its cursors are answered 410 Gone by the
+    other workers, so it is disabled when there are several workers.
+
+    :param config: The project settings.
+    :param workers: The number of worker processes.
+    :return: The settings overridden for the workers.
+    :raises ValueError: If idempotency keys are kept in memory with several workers, each only knowing its own keys.
+    """
+    if workers <= 1:
+        return {}
+    if config.idempotency_backend == "memory":
+        raise ValueError(
+            f"IDEMPOTENCY_BACKEND=memory keeps the keys of each of the {workers} workers apart, "
+            "set IDEMPOTENCY_BACKEND=dynamodb or SERVER_WORKERS=1"
+        )
+    if config.changes_backend == "memory":
+        return {"CHANGES_BACKEND": "none"}
+    return {}
+
+
+def main() -> int:
+    """Run the server until it receives SIGINT or SIGTERM."""
+    # imported lazily, the Lambda package does not ship uvicorn
+    try:
+        uvicorn = importlib.import_module("uvicorn")
+    except ImportError:
+        print("the server requires uvicorn, install the server extra with poetry install -E server", file=sys.stderr)
+        return 1
+
+    options = server_options(settings)
+    try:
+        environment = worker_environment(settings, options["workers"])
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    # the workers are spawned processes, which read their settings from the environment
+    os.environ.update(environment)
+
+    uvicorn.run(APP, **options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class SingleFlightStats(BaseModel):
+
+    """Number of calls made by leaders and of callers that shared a leader's call instead."""
+
+    leaders: int = 0
+    coalesced: int = 0
+
+
+class _Call(Generic[T]):
+
+    """Call in flight, shared by the threads asking for the same key."""
+
+    __slots__ = ("done", "error", "value")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+
+    """Share one call between the threads asking for the same key at the same time.
+
+    The first thread asking for a key, the leader, makes the call. The threads asking for the key while the call is in
+    flight wait for it and get its result or its exception. Nothing is kept once the call returns, a later request
+    makes a new call.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call[T]] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+
+    @property
+    def stats(self) -> SingleFlightStats:
+        """Return the leader and coalesced counters."""
+        return SingleFlightStats(leaders=self._leaders, coalesced=self._coalesced)
+
+    def do(self, key: str, fn: Callable[[], T]) -> tuple[T, bool]:
+        """Call fn, or wait for the call already in flight for key.
+
+        :param key: The key identifying the call.
+        :param fn: The function to call.
+        :return: The result of the call and whether it was shared with a leader.
+        :raises Exception: The exception raised by the call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._leaders += 1
+                is_leader = True
+            else:
+                self._coalesced += 1
+                is_leader = False
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True  # type: ignore[return-value]
+
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+class AsyncSingleFlight(Generic[T]):
+
+    """Share one awaited call between the coroutines asking for the same key at the same time.
+
+    Same as SingleFlight for coroutines running on one event loop. Waiting coroutines are shielded from the
+    cancellation of the leader and make the call again if the leader is cancelled.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[T]] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    @property
+    def stats(self) -> SingleFlightStats:
+        """Return the leader and coalesced counters."""
+        return SingleFlightStats(leaders=self._leaders, coalesced=self._coalesced)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Await fn, or wait for the call already in flight for key.
+
+        :param key: The key identifying the call.
+        :param fn: The coroutine function to await.
+        :return: The result of the call and whether it was shared with a leader.
+        :raises Exception: The exception raised by the call.
+        """
+        while (future := self._calls.get(key)) is not None:
+            self._coalesced += 1
+            try:
+                value = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # the shared call was cancelled with its leader, make it again unless this caller is cancelled too
+                if not future.cancelled():
+                    raise
+                continue
+            return value, True
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self._leaders += 1
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # retrieve the exception, nobody may be waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            del self._calls[key]
+        return value, False
@@ -0,0 +1,216 @@
+from typing import Annotated, Any
+from uuid import UUID, uuid4
+
+from fastapi import Depends, Header, HTTPException, Query, Response
+from pynamodb.exceptions import DeleteError, DoesNotExist, UpdateError
+from starlette import status
+from starlette.concurrency import run_in_threadpool
+
+from ..coalesce import AsyncWriteCoalescer
+from ..config import settings
+from ..cursor import get_cursor_secret
+from ..singleflight import AsyncSingleFlight
+from .cache import task_cache
+from .changes import task_changes
+from .common import (
+    check_etag,
+    condition_failure_error,
+    decode_list_cursor,
+    is_condition_failure,
+    page_etag,
+    parse_fields,
+    parse_if_match,
+    record_coalesced_read,
+    record_coalesced_write,
+    task_etag,
+    task_items,
+    task_page,
+    update_changes,
+)
+from .models import Task
+from .repository import task_repository
+from .schemas import TaskCreate, TaskPage, TaskRead, TaskUpdate
+from .search import task_search
+
+task_get_flight: AsyncSingleFlight[Task] = AsyncSingleFlight()
+task_update_coalescer: AsyncWriteCoalescer[Task] = AsyncWriteCoalescer(settings.write_coalescing_window_seconds)
+
+
+async def get_task_by_id(task_id: UUID) -> Task:
+    """Retrieve a task by its ID, reading through the task cache in the thread pool, its backends block.
+
+    Concurrent cache misses for the same task share one GetItem call, and the same Task object, which must not be
+    modified.
+
+    :param task_id: The ID of the task.
+    :return: The task with the given ID.
+    :raises HTTPException: If the task does not exist.
+    """
+    task = await run_in_threadpool(task_cache.get, str(task_id))
+    if task is not None:
+        return task
+
+    try:
+        task, shared = await task_get_flight.do(str(task_id), lambda: task_repository.get(str(task_id)))
+    except DoesNotExist as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="task not found") from exc
+
+    if shared:
+        record_coalesced_read()
+    else:
+        await run_in_threadpool(task_cache.put, task)
+    return task
+
+
+async def list_tasks(
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=100),
+    is_completed: bool | None = None,
+    fields: str | None = None,
+) -> TaskPage:
+    """List tasks in creation order.
+
+    :param cursor: Continuation token returned by the previous page (optional)
+    :param limit: Maximum number of tasks to list (default: 50, min: 1, max: 100)
+    :param is_completed: Only list tasks with this completion status (optional)
+    :param fields: Comma separated task fields to return, e.g. id,is_completed (optional, default: all fields)
+    :return: TaskPage holding the tasks and the continuation token for the next page
+    :raises HTTPException: If the provided cursor or fields are invalid
+    """
+    selected = parse_fields(fields)
+    secret = get_cursor_secret()
+    tasks, last_evaluated_key = await task_repository.query(
+        limit, decode_list_cursor(cursor, secret, is_completed), is_completed, selected
+    )
+    return task_page(task_items(tasks, selected), last_evaluated_key, secret)
+
+
+async def revalidate_task(
+    task: Annotated[Task, Depends(get_task_by_id)],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Task:
+    """Set the ETag of a task on the response, or answer with 304 if the client already has the current version.
+
+    :param task: The requested task.
+    :param response: The response to set the ETag header on.
+    :param if_none_match: The ETags the client has cached (optional).
+    :return: The requested task.
+    :raises HTTPException: With status 304 if one of the ETags matches the task.
+    """
+    check_etag(task_etag(task), if_none_match, response)
+    return task
+
+
+async def revalidate_page(
+    page: Annotated[TaskPage, Depends(list_tasks)],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> TaskPage:
+    """Set the ETag of a page of tasks on the response, or answer with 304 if the client already has the same page.
+
+    :param page: The requested page of tasks.
+    :param response: The response to set the ETag header on.
+    :param if_none_match: The ETags the client has cached (optional).
+    :return: The requested page of tasks.
+    :raises HTTPException: With status 304 if one of the ETags matches the page.
+    """
+    check_etag(page_etag(page), if_none_match, response)
+    return page
+
+
+async def get_task(task: Annotated[Task, Depends(revalidate_task)]) -> TaskRead:
+    """Retrieve single task by task id.
+
+    :param task: The task object to retrieve.
+    :return: The read-only representation of the task.
+    """
+    return TaskRead(**task.attribute_values)
+
+
+async def create_task(task: TaskCreate) -> TaskRead:
+    """Create a new task.
+
+    :param task: A TaskCreate object representing the task to be created.
+    :return: A TaskRead object representing the created task.
+    """
+    db_task = Task(
+        id=str(uuid4()),
+        description=task.description,
+        is_completed=task.is_completed,
+    )
+    await task_repository.save(db_task)
+    await run_in_threadpool(task_cache.put, db_task)
+    task_changes.publish("created", db_task)
+    await run_in_threadpool(task_search.add, db_task)
+    return TaskRead(**db_task.attribute_values)
+
+
+async def _task_exists(task_id: str) -> bool:
+    try:
+        await task_repository.get(task_id)
+    except DoesNotExist:
+        return False
+    return True
+
+
+async def _update(task_id: str, changes: dict[str, Any], version: int | None) -> tuple[Task, bool]:
+    """Update a task, merging unconditional updates into those of concurrent requests when write coalescing is on.
+
+    :return: The updated task and whether it was written by a concurrent request.
+    """
+    if version is not None or task_update_coalescer.window_seconds <= 0:
+        return await task_repository.update(task_id, changes, version), False
+
+    updated_task, shared, delay = await task_update_coalescer.submit(
+        task_id, changes, lambda merged: task_repository.update(task_id, merged)
+    )
+    record_coalesced_write(delay, shared)
+    return updated_task, shared
+
+
+async def update_task(task_id: UUID, task: TaskUpdate, if_match: Annotated[str | None, Header()] = None) -> TaskRead:
+    """Update the provided fields of a task in a single conditional write.
+
+    :param task_id: The ID of the task.
+    :param task: The updated task.
+    :param if_match: The task version the update is based on (optional).
+    :return: The updated task.
+    :raises HTTPException: If the task does not exist or its version does not match.
+    """
+    version = parse_if_match(if_match)
+    try:
+        updated_task, shared = await _update(str(task_id), update_changes(str(task_id), task), version)
+    except UpdateError as exc:
+        await run_in_threadpool(task_cache.invalidate, str(task_id))
+        if not is_condition_failure(exc):
+            raise
+        raise condition_failure_error(version is not None and await _task_exists(str(task_id))) from exc
+
+    if not shared:
+        await run_in_threadpool(task_cache.put, updated_task)
+        task_changes.publish("updated", updated_task)
+        await run_in_threadpool(task_search.add, updated_task)
+    return TaskRead(**updated_task.attribute_values)
+
+
+async def delete_task(task_id: UUID, if_match: Annotated[str | None, Header()] = None) -> None:
+    """Delete a task in a single conditional write.
+
+    :param task_id: The ID of the task.
+    :param if_match: The task version the deletion is based on (optional).
+    :return: None
+    :raises HTTPException: If the task does not exist or its version does not match.
+    """
+    version = parse_if_match(if_match)
+    try:
+        deleted_task = await task_repository.delete(str(task_id), version)
+    except DeleteError as exc:
+        await run_in_threadpool(task_cache.invalidate, str(task_id))
+        if not is_condition_failure(exc):
+            raise
+        raise condition_failure_error(version is not None and await _task_exists(str(task_id))) from exc
+
+    await run_in_threadpool(task_cache.remove, deleted_task)
+    task_changes.publish("deleted", deleted_task)
+    await run_in_threadpool(task_search.remove, deleted_task)
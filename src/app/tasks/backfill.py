@@ -0,0 +1,92 @@
+"""Write again the tasks whose index keys are missing or stale, so that they are listed.
+
+The task list reads the created_at and open indexes, whose partition key is one of TASKS_BUCKET_SHARDS buckets. Tasks
+stored before the buckets existed, or with another number of buckets, are not in the indexes, or in the wrong shards,
+until they are written again. Run this after deploying such a change.
+
+Usage:
+    python -m app.tasks.backfill [--segments 4]
+"""
+
+import argparse
+import itertools
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from pynamodb.exceptions import PutError
+
+from .common import is_condition_failure
+from .models import Task, bucket_value, open_bucket_value
+
+DEFAULT_SEGMENTS = 4
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillResult(NamedTuple):
+
+    """Outcome of a backfill of the task index keys.
+
+    :param scanned: Number of tasks read.
+    :param written: Number of tasks written again with their current index keys.
+    :param conflicts: Number of tasks changed while being backfilled, their write already set the index keys.
+    """
+
+    scanned: int = 0
+    written: int = 0
+    conflicts: int = 0
+
+
+def is_stale(task: Task) -> bool:
+    """Return whether the index keys of a stored task differ from those it is written with."""
+    return task.bucket != bucket_value(task.id) or task.open_bucket != open_bucket_value(task.id, task.is_completed)
+
+
+def _backfill_segment(segment: int, total_segments: int) -> BackfillResult:
+    scanned = written = conflicts = 0
+    for task in Task.scan(segment=segment, total_segments=total_segments):
+        scanned += 1
+        if not is_stale(task):
+            continue
+        # the save is conditioned on the version read, a task updated meanwhile keeps its update
+        try:
+            task.save()
+        except PutError as exc:
+            if not is_condition_failure(exc):
+                raise
+            logger.info("task %s changed while being backfilled, skipped", task.id)
+            conflicts += 1
+            continue
+        written += 1
+    return BackfillResult(scanned, written, conflicts)
+
+
+def backfill_tasks(segments: int = DEFAULT_SEGMENTS) -> BackfillResult:
+    """Write again the tasks with missing or stale index keys, with a parallel scan of the task table.
+
+    Every written task gets the bucket of its ID, its open bucket and, if it had none, the current time as its
+    creation time. Its version is incremented as with any other write.
+
+    :param segments: Number of table segments scanned in parallel.
+    :return: The number of tasks scanned, written and changed concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        results = list(executor.map(_backfill_segment, range(segments), itertools.repeat(segments)))
+    return BackfillResult(*(sum(counts) for counts in zip(*results, strict=True)))
+
+
+def main() -> int:
+    """Backfill the task index keys from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS, help="table segments scanned in parallel")
+    args = parser.parse_args()
+
+    result = backfill_tasks(args.segments)
+    print(f"scanned {result.scanned} tasks, wrote {result.written}, skipped {result.conflicts} changed meanwhile")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
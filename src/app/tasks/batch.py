@@ -0,0 +1,111 @@
+import logging
+import random
+import time
+from collections.abc import Iterator, Sequence
+from typing import Any, TypeVar
+
+from pynamodb.constants import BATCH_GET_PAGE_LIMIT, BATCH_WRITE_PAGE_LIMIT, KEYS, RESPONSES, UNPROCESSED_KEYS
+from pynamodb.exceptions import PutError
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+MAX_ATTEMPTS = 5
+BASE_DELAY_SECONDS = 0.05
+MAX_DELAY_SECONDS = 2.0
+
+
+def _chunks(items: Sequence[_T], size: int) -> Iterator[Sequence[_T]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _backoff(attempt: int) -> None:
+    """Sleep with capped exponential backoff and full jitter before the given retry attempt."""
+    time.sleep(random.uniform(0, min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * 2**attempt)))
+
+
+def batch_get(task_ids: Sequence[str]) -> tuple[dict[str, Task], set[str]]:
+    """Retrieve tasks with BatchGetItem, retrying unprocessed keys with backoff.
+
+    :param task_ids: The IDs of the tasks to retrieve, without duplicates.
+    :return: The tasks found keyed by ID, and the IDs that were still unprocessed after the last attempt.
+    """
+    connection = Task._get_connection()
+    table_name = Task.Meta.table_name
+    found: dict[str, Task] = {}
+    unprocessed: set[str] = set()
+
+    for chunk in _chunks(task_ids, BATCH_GET_PAGE_LIMIT):
+        keys: list[Any] = [{"id": {"S": task_id}} for task_id in chunk]
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                logger.info("retrying %d unprocessed keys for batch get (attempt %d)", len(keys), attempt)
+                _backoff(attempt)
+            data = connection.batch_get_item(keys)
+            for item in data.get(RESPONSES, {}).get(table_name, []):
+                task = Task.from_raw_data(item)
+                found[task.id] = task
+            keys = data.get(UNPROCESSED_KEYS, {}).get(table_name, {}).get(KEYS, [])
+            if not keys:
+                break
+        unprocessed.update(key["id"]["S"] for key in keys)
+
+    return found, unprocessed
+
+
+def _request_id(request: dict[str, Any]) -> str:
+    if "PutRequest" in request:
+        return str(request["PutRequest"]["Item"]["id"]["S"])
+    return str(request["DeleteRequest"]["Key"]["id"]["S"])
+
+
+def _write_chunk(put_tasks: Sequence[Task], delete_tasks: Sequence[Task]) -> set[str]:
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            logger.info(
+                "retrying %d unprocessed items for batch write (attempt %d)",
+                len(put_tasks) + len(delete_tasks),
+                attempt,
+            )
+            _backoff(attempt)
+
+        batch = Task.batch_write(auto_commit=False)
+        for task in put_tasks:
+            batch.save(task)
+        for task in delete_tasks:
+            batch.delete(task)
+
+        try:
+            batch.commit()
+            return set()
+        except PutError:
+            if not batch.failed_operations:
+                raise
+            unprocessed_ids = {_request_id(request) for request in batch.failed_operations}
+            put_tasks = [task for task in put_tasks if task.id in unprocessed_ids]
+            delete_tasks = [task for task in delete_tasks if task.id in unprocessed_ids]
+
+    return {task.id for task in [*put_tasks, *delete_tasks]}
+
+
+def batch_write(put_tasks: Sequence[Task] = (), delete_tasks: Sequence[Task] = ()) -> set[str]:
+    """Put and delete tasks with BatchWriteItem, retrying unprocessed items with backoff.
+
+    BatchWriteItem does not support condition expressions, so the writes are unconditional.
+
+    :param put_tasks: The tasks to put.
+    :param delete_tasks: The tasks to delete.
+    :return: The IDs of the tasks that were still unprocessed after the last attempt.
+    """
+    operations = [*((task, True) for task in put_tasks), *((task, False) for task in delete_tasks)]
+    unprocessed: set[str] = set()
+    for chunk in _chunks(operations, BATCH_WRITE_PAGE_LIMIT):
+        unprocessed |= _write_chunk(
+            [task for task, is_put in chunk if is_put],
+            [task for task, is_put in chunk if not is_put],
+        )
+    return unprocessed
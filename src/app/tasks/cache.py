@@ -0,0 +1,109 @@
+import json
+import threading
+from typing import Any
+
+from ..cache import CacheBackend, CacheStats, MemoryCache, NullCache, RedisCache
+from ..config import Settings, settings
+from .models import Task
+
+
+def create_cache_backend(config: Settings) -> CacheBackend:
+    """Create the cache backend selected by the settings.
+
+    :param config: The project settings.
+    :return: The cache backend.
+    """
+    if config.cache_backend == "memory":
+        return MemoryCache(max_size=config.cache_max_size, ttl_seconds=config.cache_ttl_seconds)
+    if config.cache_backend == "redis":
+        return RedisCache.from_url(config.cache_redis_url, ttl_seconds=config.cache_ttl_seconds)
+    return NullCache()
+
+
+class TaskCache:
+
+    """Read-through cache of Task items keyed by task id.
+
+    Entries carry the task version, a write never replaces a newer version with an older one, and deleted tasks leave
+    a tombstone behind so a concurrent read cannot put them back into the cache.
+
+    :param backend: The cache backend used to store the entries.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """Return the hit, miss and eviction counters of the cache."""
+        return CacheStats(hits=self._hits, misses=self._misses, evictions=self.backend.evictions)
+
+    def get(self, task_id: str) -> Task | None:
+        """Return the cached task, or None if it is not cached.
+
+        :param task_id: The ID of the task.
+        :return: The cached task or None.
+        """
+        entry = self._load(task_id)
+        with self._lock:
+            if entry is None or entry["item"] is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+
+        return Task.from_raw_data(entry["item"])
+
+    def put(self, task: Task) -> None:
+        """Write a task through to the cache unless a newer version of it is already cached.
+
+        The version is compared and the entry written in one atomic update of the backend, so a concurrent put of a
+        newer version, or a tombstone, cannot be overwritten in between.
+
+        :param task: The task to cache.
+        """
+        entry = self._encode({"version": task.version, "item": task.to_dynamodb_dict()})
+        self.backend.update(self._key(task.id), lambda cached: None if self._is_stale(task, cached) else entry)
+
+    def invalidate(self, task_id: str) -> None:
+        """Drop the cached entry of a task, e.g. after a failed conditional write.
+
+        :param task_id: The ID of the task.
+        """
+        self.backend.delete(self._key(task_id))
+
+    def remove(self, task: Task) -> None:
+        """Replace the cached entry of a deleted task with a tombstone.
+
+        :param task: The deleted task.
+        """
+        self._store(task.id, {"version": task.version, "item": None})
+
+    @staticmethod
+    def _key(task_id: str) -> str:
+        return f"task:{task_id}"
+
+    @staticmethod
+    def _encode(entry: dict[str, Any]) -> bytes:
+        return json.dumps(entry, separators=(",", ":")).encode("utf-8")
+
+    def _load(self, task_id: str) -> dict[str, Any] | None:
+        data = self.backend.get(self._key(task_id))
+        return None if data is None else json.loads(data)
+
+    def _store(self, task_id: str, entry: dict[str, Any]) -> None:
+        self.backend.set(self._key(task_id), self._encode(entry))
+
+    @staticmethod
+    def _is_stale(task: Task, data: bytes | None) -> bool:
+        cached = None if data is None else json.loads(data)
+        if cached is None or cached["version"] is None or task.version is None:
+            return False
+        if cached["item"] is None:
+            return bool(cached["version"] >= task.version)
+        return bool(cached["version"] > task.version)
+
+
+task_cache = TaskCache(create_cache_backend(settings))
@@ -0,0 +1,172 @@
+import json
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+from fastapi import Header, HTTPException
+from starlette import status
+from starlette.responses import Response, StreamingResponse
+
+from ..changes import ChangeBroker, ChangeEvent, CursorExpiredError, create_change_broker
+from ..config import settings
+from .models import Task
+from .schemas import TaskChange, TaskRead
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+MAX_CHANGES = 100
+# API Gateway ends integrations after 29 seconds, long polls return before
+MAX_WAIT_SECONDS = 25.0
+DEFAULT_WAIT_SECONDS = 20.0
+
+
+class TaskChangeFeed:
+
+    """Publish the changes of tasks to a change broker, for clients following them instead of polling the task list.
+
+    :param broker: The change broker, None if the change feed is disabled and changes are not published.
+    """
+
+    def __init__(self, broker: ChangeBroker | None):
+        self.broker = broker
+
+    def publish(self, change_type: str, task: Task) -> None:
+        """Publish a change of a task.
+
+        :param change_type: created, updated or deleted.
+        :param task: The task after the change, or the deleted task.
+        """
+        if self.broker is None:
+            return
+        change = TaskChange.model_validate(
+            {
+                "type": change_type,
+                "id": task.id,
+                "version": task.version,
+                "task": None if change_type == "deleted" else TaskRead(**task.attribute_values),
+            }
+        )
+        self.broker.publish(change.model_dump_json().encode("utf-8"))
+
+
+task_changes = TaskChangeFeed(create_change_broker(settings))
+
+
+def get_broker() -> ChangeBroker:
+    """Return the broker of the task change feed.
+
+    :raises HTTPException: If the change feed is disabled.
+    """
+    if task_changes.broker is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="change feed is disabled")
+    return task_changes.broker
+
+
+def get_cursor(cursor: str | None = None, last_event_id: Annotated[str | None, Header()] = None) -> str | None:
+    """Return the cursor to follow the changes from, the Last-Event-ID of a reconnecting event stream first.
+
+    :param cursor: The cursor of the query string (optional).
+    :param last_event_id: The id of the last server-sent event the client received (optional).
+    :return: The cursor, None to follow the changes made from now on.
+    """
+    return last_event_id or cursor
+
+
+def encode_position(broker: ChangeBroker, seq: int) -> str:
+    """Encode the position after a change into a cursor, only valid for the log of the broker it was read from."""
+    return f"{broker.epoch}-{seq}"
+
+
+def decode_position(broker: ChangeBroker, cursor: str | None) -> int:
+    """Decode a cursor into the sequence number of the last change the client has seen.
+
+    :param broker: The change broker.
+    :param cursor: The cursor returned with the last changes, None to start after the last published change.
+    :return: The sequence number.
+    :raises HTTPException: If the cursor is malformed, or expired because it is from another log or its changes were
+        dropped.
+    """
+    if cursor is None:
+        return broker.last_seq
+    epoch, _, seq = cursor.rpartition("-")
+    if not epoch or not seq.isdigit():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    if epoch != broker.epoch:
+        raise _expired_error()
+    return int(seq)
+
+
+def _expired_error() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_410_GONE, detail="cursor expired, list the tasks again")
+
+
+def _read(broker: ChangeBroker, after: int, limit: int) -> list[ChangeEvent]:
+    try:
+        return broker.read(after, limit)
+    except CursorExpiredError as exc:
+        raise _expired_error() from exc
+
+
+async def poll_changes(broker: ChangeBroker, cursor: str | None, wait_seconds: float, limit: int) -> Response:
+    """Return the changes following a cursor, waiting up to wait_seconds for one if there are none yet.
+
+    Used by clients which cannot hold a stream open, e.g. behind API Gateway and Lambda which buffer responses. The
+    changes are stored serialized, the page is assembled from them without decoding them again.
+
+    :param broker: The change broker.
+    :param cursor: The cursor returned by the previous page, None to start after the last published change.
+    :param wait_seconds: Maximum number of seconds to wait for a change.
+    :param limit: Maximum number of changes to return.
+    :return: A TaskChangePage JSON response.
+    :raises HTTPException: If the cursor is invalid or expired.
+    """
+    after = decode_position(broker, cursor)
+    events = _read(broker, after, limit)
+    if not events and wait_seconds > 0 and await broker.wait(after, wait_seconds):
+        events = _read(broker, after, limit)
+
+    position = encode_position(broker, events[-1].seq if events else after)
+    body = b'{"changes":[%s],"cursor":%s}' % (b",".join(event.data for event in events), json.dumps(position).encode())
+    return Response(body, media_type="application/json")
+
+
+async def event_stream(broker: ChangeBroker, after: int, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+    """Yield the changes following a sequence number as server-sent events, until the client disconnects.
+
+    Every event carries its cursor as id, which browsers send back as Last-Event-ID when they reconnect. A comment is
+    sent after heartbeat_seconds without changes, so proxies do not close the idle connection. A client which fell so
+    far behind that its changes were dropped receives a reset event, and the stream ends.
+
+    :param broker: The change broker.
+    :param after: The sequence number of the last change the client has seen.
+    :param heartbeat_seconds: Number of seconds without changes after which a heartbeat is sent.
+    """
+    while True:
+        try:
+            events = broker.read(after, MAX_CHANGES)
+        except CursorExpiredError:
+            yield b"event: reset\ndata: {}\n\n"
+            return
+
+        for event in events:
+            yield b"id: %s\nevent: change\ndata: %s\n\n" % (encode_position(broker, event.seq).encode(), event.data)
+        if events:
+            after = events[-1].seq
+        elif not await broker.wait(after, heartbeat_seconds):
+            yield b": heartbeat\n\n"
+
+
+def stream_changes(broker: ChangeBroker, cursor: str | None, heartbeat_seconds: float) -> StreamingResponse:
+    """Stream the changes following a cursor as server-sent events.
+
+    :param broker: The change broker.
+    :param cursor: The Last-Event-ID or cursor to resume from, None to start after the last published change.
+    :param heartbeat_seconds: Number of seconds without changes after which a heartbeat is sent.
+    :return: The event stream response.
+    :raises HTTPException: If the cursor is invalid or expired, before the stream starts.
+    """
+    after = decode_position(broker, cursor)
+    _read(broker, after, 1)
+    return StreamingResponse(
+        event_stream(broker, after, heartbeat_seconds),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
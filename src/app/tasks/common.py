@@ -0,0 +1,153 @@
+"""Request handling shared by the sync and async task services."""
+
+import hashlib
+from collections.abc import Iterable
+from typing import Any
+
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+from pynamodb.exceptions import PynamoDBException
+from starlette import status
+
+from ..cursor import InvalidCursorError, decode_cursor, encode_cursor
+from ..metrics import current_metrics
+from .models import TASKS_BUCKETS, Task, open_bucket_value
+from .schemas import TaskPage, TaskPartial, TaskRead, TaskUpdate
+
+_TASK_READ_LIST = TypeAdapter(list[TaskRead])
+_TASK_PARTIAL_LIST = TypeAdapter(list[TaskPartial])
+
+# the attributes of the last evaluated key of each index, a cursor of one index cannot continue a query of another
+_CREATED_AT_CURSOR_KEYS = frozenset({Task.id.attr_name, Task.bucket.attr_name, Task.created_at.attr_name})
+_OPEN_CURSOR_KEYS = frozenset({Task.id.attr_name, Task.open_bucket.attr_name, Task.created_at.attr_name})
+
+
+def record_coalesced_read() -> None:
+    """Count a read served by a concurrent request in the metrics of the current request."""
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.record_coalesced_read()
+
+
+def record_coalesced_write(delay: float, shared: bool) -> None:
+    """Record a write merged into those of concurrent requests in the metrics of the current request."""
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.record_coalesced_write(delay, shared)
+
+
+def task_reads(tasks: Iterable[Task]) -> list[TaskRead]:
+    """Return the read-only representations of tasks."""
+    # validating the raw attribute values in pydantic-core is faster than TaskRead.model_construct per item
+    return _TASK_READ_LIST.validate_python([task.attribute_values for task in tasks])
+
+
+def task_partials(tasks: Iterable[Task], fields: list[str]) -> list[TaskPartial]:
+    """Return the representations of tasks holding the selected fields only."""
+    # attributes left out of the projection are filled with their defaults, so only the requested fields are taken
+    return _TASK_PARTIAL_LIST.validate_python(
+        [{field: task.attribute_values.get(field) for field in fields} for task in tasks]
+    )
+
+
+def task_items(tasks: Iterable[Task], fields: list[str] | None) -> list[TaskRead] | list[TaskPartial]:
+    """Return the representations of tasks, holding the selected fields only if fields are selected."""
+    if fields is None:
+        return task_reads(tasks)
+    return task_partials(tasks, fields)
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    """Return the task fields a fields query parameter selects, None if all fields are selected."""
+    if fields is None:
+        return None
+    selected = list(dict.fromkeys(field.strip() for field in fields.split(",")))
+    unknown = [field for field in selected if field not in TaskPartial.model_fields]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"invalid fields: {', '.join(unknown)}")
+    return selected
+
+
+def decode_list_cursor(cursor: str | None, secret: bytes, is_completed: bool | None = None) -> dict[str, Any] | None:
+    """Return the last evaluated keys a list cursor continues from, None without a cursor."""
+    if cursor is None:
+        return None
+    try:
+        key = decode_cursor(cursor, secret)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor") from exc
+    # the last evaluated key of every bucket shard left to read, None for a shard to read from its start
+    index_keys = _OPEN_CURSOR_KEYS if is_completed is False else _CREATED_AT_CURSOR_KEYS
+    if not isinstance(key, dict) or not key or not set(key) <= set(TASKS_BUCKETS):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    if any(shard_key is not None and set(shard_key) != index_keys for shard_key in key.values()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    return key
+
+
+def task_page(
+    items: list[TaskRead] | list[TaskPartial], last_evaluated_key: dict[str, Any] | None, secret: bytes
+) -> TaskPage:
+    """Return a page of tasks, with the cursor of the next page if there is one."""
+    return TaskPage.model_construct(
+        items=items,
+        next_cursor=encode_cursor(last_evaluated_key, secret) if last_evaluated_key is not None else None,
+    )
+
+
+def task_etag(task: Task) -> str:
+    """Return the strong ETag of a task, derived from its version."""
+    return f'"{task.version or 0}"'
+
+
+def page_etag(page: TaskPage) -> str:
+    """Return the strong ETag of a page of tasks, derived from a digest of its content."""
+    return f'"{hashlib.sha256(page.model_dump_json().encode("utf-8")).hexdigest()[:32]}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def check_etag(etag: str, if_none_match: str | None, response: Response) -> None:
+    """Set the ETag on the response, or answer with 304 if it matches the ETags the client has cached."""
+    if _etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+
+def parse_if_match(if_match: str | None) -> int | None:
+    """Return the task version an If-Match header requires, None if the header is missing or matches any version."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid If-Match header") from exc
+
+
+def update_changes(task_id: str, task: TaskUpdate) -> dict[str, Any]:
+    """Return the attributes a task update sets, keeping the task in the open index while it is incomplete."""
+    # the fields of TaskUpdate only, a TaskBatchUpdateItem also carries the task ID
+    changes = task.model_dump(include=set(TaskUpdate.model_fields), exclude_none=True)
+    if task.is_completed is not None:
+        # keeps the task in the sparse open tasks index while it is incomplete
+        changes["open_bucket"] = open_bucket_value(task_id, task.is_completed)
+    return changes
+
+
+def is_condition_failure(exc: PynamoDBException) -> bool:
+    """Return whether a write failed on its condition, the task being missing or of another version."""
+    return exc.cause_response_code == "ConditionalCheckFailedException"
+
+
+def condition_failure_error(exists: bool) -> HTTPException:
+    """Return the error of a write that failed on its condition, 409 if the task exists and 404 otherwise."""
+    if exists:
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="task version does not match")
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="task not found")
@@ -0,0 +1,138 @@
+import queue
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+
+from starlette.responses import StreamingResponse
+
+from ..compression import negotiate_encoding
+from .repository import sync_task_repository
+from .schemas import TaskRead
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MAX_SEGMENTS = 16
+CHUNK_ITEMS = 100
+GZIP_LEVEL = 6
+
+# chunks each segment may scan ahead of the response, which bounds the memory of a parallel export
+_QUEUED_CHUNKS_PER_SEGMENT = 2
+_QUEUE_TIMEOUT_SECONDS = 0.1
+
+
+def _segment_chunks(segment: int | None = None, total_segments: int | None = None) -> Iterator[bytes]:
+    """Scan the tasks, or one segment of them, and yield them as chunks of NDJSON lines.
+
+    A scan of the task table holds a single page of tasks at a time, whatever the size of the table.
+    """
+    lines = []
+    for task in sync_task_repository.scan(segment, total_segments):
+        lines.append(TaskRead.model_validate(task.attribute_values).model_dump_json())
+        if len(lines) == CHUNK_ITEMS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ParallelScan:
+
+    """Scan the segments of the tasks in threads, handing their chunks over through a bounded queue.
+
+    :param total_segments: Number of segments scanned in parallel.
+    """
+
+    def __init__(self, total_segments: int):
+        self._total_segments = total_segments
+        self._chunks: queue.Queue[bytes | BaseException | None] = queue.Queue(
+            maxsize=total_segments * _QUEUED_CHUNKS_PER_SEGMENT
+        )
+        self._stopped = threading.Event()
+
+    def _put(self, item: bytes | BaseException | None) -> bool:
+        # waits for the response to take chunks, unless the response was closed
+        while not self._stopped.is_set():
+            try:
+                self._chunks.put(item, timeout=_QUEUE_TIMEOUT_SECONDS)
+            except queue.Full:
+                continue
+            return True
+        return False
+
+    def _scan(self, segment: int) -> None:
+        try:
+            for chunk in _segment_chunks(segment, self._total_segments):
+                if not self._put(chunk):
+                    return
+        except Exception as exc:
+            self._put(exc)
+            return
+        self._put(None)
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the chunks of all segments as they are scanned, in no particular order.
+
+        :raises Exception: The first error of a segment scan, which ends the export.
+        """
+        for segment in range(self._total_segments):
+            threading.Thread(target=self._scan, args=(segment,), daemon=True).start()
+
+        try:
+            remaining = self._total_segments
+            while remaining:
+                item = self._chunks.get()
+                if item is None:
+                    remaining -= 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            self._stopped.set()
+
+
+def export_chunks(total_segments: int = 1) -> Iterator[bytes]:
+    """Yield all tasks as chunks of NDJSON lines.
+
+    :param total_segments: Number of table segments scanned in parallel, the table is scanned sequentially if 1.
+    :return: The chunks, each holding up to CHUNK_ITEMS complete lines.
+    """
+    if total_segments == 1:
+        return _segment_chunks()
+    return iter(_ParallelScan(total_segments))
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """Compress chunks into a single gzip stream as they are produced.
+
+    :param chunks: The chunks to compress.
+    :param level: The compression level.
+    :return: The gzip stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """Return whether an Accept-Encoding header accepts gzip."""
+    return negotiate_encoding(accept_encoding, ("gzip",)) is not None
+
+
+def stream_tasks(segments: int, accept_encoding: str | None) -> StreamingResponse:
+    """Stream all tasks as newline delimited JSON, gzip compressed if the client accepts it.
+
+    Tasks are streamed in table order, or in no particular order when segments are scanned in parallel.
+
+    :param segments: Number of table segments scanned in parallel.
+    :param accept_encoding: The content codings the client accepts.
+    :return: The streaming response.
+    """
+    chunks = export_chunks(segments)
+    headers = {"Vary": "Accept-Encoding"}
+    if accepts_gzip(accept_encoding):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,389 @@
+"""Import tasks from NDJSON or CSV.
+
+Usage:
+    python -m app.tasks.importer PATH [--format ndjson|csv] [--workers 4] [--checkpoint PATH]
+"""
+
+import argparse
+import codecs
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Literal, cast
+from uuid import UUID, uuid4, uuid5
+
+import anyio.from_thread
+from pydantic import BaseModel, Field, ValidationError
+from pynamodb.constants import BATCH_WRITE_PAGE_LIMIT
+from pynamodb.exceptions import PutError
+from starlette.concurrency import run_in_threadpool
+
+from ..dynamodb import THROTTLE_ERROR_CODES
+from .batch import BASE_DELAY_SECONDS, MAX_DELAY_SECONDS
+from .changes import task_changes
+from .models import Task
+from .repository import sync_task_repository
+from .schemas import MAX_IMPORT_ERRORS, TaskCreate, TaskImportFailure, TaskImportReport
+from .search import task_search
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["ndjson", "csv"]
+
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 32
+MAX_WRITE_ROUNDS = 8
+PROGRESS_INTERVAL_SECONDS = 1.0
+CHECKPOINT_INTERVAL_SECONDS = 5.0
+
+
+class ImportCheckpoint(BaseModel):
+
+    """Progress of an import, saved to resume it after the rows that were already written.
+
+    Task IDs are derived from the import ID and the row number, so rows written again on resume overwrite the same
+    tasks instead of duplicating them.
+
+    :param rows: Number of leading input rows that were all processed, imported and failed count these rows only.
+    """
+
+    import_id: UUID = Field(default_factory=uuid4)
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "ImportCheckpoint":
+        """Load a checkpoint, or start a new one if the file does not exist."""
+        if not path.exists():
+            return cls()
+        return cls.model_validate_json(path.read_text(encoding="utf-8"))
+
+    def save(self, path: Path) -> None:
+        """Save the checkpoint, replacing the previous one atomically."""
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(self.model_dump_json(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+class AdaptiveThrottle:
+
+    """Delay shared by the import workers before each write.
+
+    The delay doubles whenever DynamoDB throttles a write and halves after every write that was not throttled, so the
+    workers settle on the write rate the table sustains.
+    """
+
+    def __init__(self, base_delay: float = BASE_DELAY_SECONDS, max_delay: float = MAX_DELAY_SECONDS):
+        self.delay = 0.0
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Sleep for the current delay."""
+        if self.delay:
+            time.sleep(self.delay)
+
+    def throttled(self) -> None:
+        """Increase the delay after a throttled write."""
+        with self._lock:
+            self.delay = min(self._max_delay, max(self._base_delay, self.delay * 2))
+
+    def succeeded(self) -> None:
+        """Decrease the delay after a write that was not throttled."""
+        with self._lock:
+            self.delay = 0.0 if self.delay <= self._base_delay else self.delay / 2
+
+
+def _validate(row: Any) -> TaskCreate | str:
+    try:
+        return TaskCreate.model_validate(row)
+    except ValidationError as exc:
+        return "; ".join(f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in exc.errors())
+
+
+def read_tasks(lines: Iterable[str], fmt: ImportFormat) -> Iterator[TaskCreate | str]:
+    """Parse and validate the rows of an import one at a time.
+
+    CSV input has a header row naming the columns, empty cells are treated as missing. Blank NDJSON lines are skipped.
+
+    :param lines: The input lines.
+    :param fmt: The input format.
+    :return: The task of every row, or the reason the row is invalid.
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(lines):
+            yield _validate({name: value for name, value in row.items() if name is not None and value != ""})
+        return
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield f"invalid JSON: {exc.msg}"
+            continue
+        yield _validate(row)
+
+
+def _write_batch(tasks: list[Task], throttle: AdaptiveThrottle) -> set[str]:
+    """Write a batch of tasks, retrying throttled writes, and return the IDs of the tasks that were not written."""
+    pending = tasks
+    for _ in range(MAX_WRITE_ROUNDS):
+        throttle.wait()
+        try:
+            unprocessed = sync_task_repository.batch_write(put_tasks=pending)
+        except PutError as exc:
+            if exc.cause_response_code not in THROTTLE_ERROR_CODES:
+                raise
+            unprocessed = {task.id for task in pending}
+
+        if not unprocessed:
+            throttle.succeeded()
+            return set()
+        throttle.throttled()
+        pending = [task for task in pending if task.id in unprocessed]
+    return {task.id for task in pending}
+
+
+def _import_batch(tasks: list[Task], throttle: AdaptiveThrottle) -> set[str]:
+    """Write a batch of tasks, then publish and index the written tasks as the task services do."""
+    unprocessed = _write_batch(tasks, throttle)
+    for task in tasks:
+        if task.id not in unprocessed:
+            task_changes.publish("created", task)
+            task_search.add(task)
+    return unprocessed
+
+
+class _Batch:
+
+    """Tasks read from a range of input rows and written together."""
+
+    def __init__(self, first_row: int):
+        self.end_row = first_row
+        self.tasks: list[Task] = []
+        self.rows: dict[str, int] = {}
+        self.imported = 0
+        self.failed = 0
+
+
+class _Import:
+
+    """Reads the input, writes its batches across a pool of workers and keeps the report and checkpoint up to date."""
+
+    def __init__(self, workers: int, checkpoint: ImportCheckpoint, on_progress: Callable[[TaskImportReport], None]):
+        self._workers = workers
+        self._checkpoint = checkpoint
+        self._on_progress = on_progress
+        self._throttle = AdaptiveThrottle()
+        self._started = time.perf_counter()
+        self.report = TaskImportReport()
+        # batches are written out of order, the checkpoint only moves past batches whose predecessors are all written
+        self._written: dict[int, _Batch] = {}
+        self._next_to_commit = 0
+
+    def _fail(self, batch: _Batch, row: int, error: str) -> None:
+        batch.failed += 1
+        self.report.failed += 1
+        if len(self.report.errors) < MAX_IMPORT_ERRORS:
+            self.report.errors.append(TaskImportFailure(row=row + 1, error=error))
+
+    def _batches(self, tasks: Iterable[TaskCreate | str]) -> Iterator[_Batch]:
+        resume_from = self._checkpoint.rows
+        batch = _Batch(resume_from)
+        for row, task in enumerate(tasks):
+            if row < resume_from:
+                continue
+            self.report.rows += 1
+            batch.end_row = row + 1
+            if isinstance(task, str):
+                self._fail(batch, row, task)
+                continue
+
+            task_id = str(uuid5(self._checkpoint.import_id, str(row)))
+            # batch writes bypass Model.save, so the initial version is set here
+            batch.tasks.append(
+                Task(id=task_id, description=task.description, is_completed=task.is_completed, version=1)
+            )
+            batch.rows[task_id] = row
+            if len(batch.tasks) == BATCH_WRITE_PAGE_LIMIT:
+                yield batch
+                batch = _Batch(batch.end_row)
+        yield batch
+
+    def _complete(self, idx: int, batch: _Batch, unprocessed: set[str]) -> None:
+        for task_id in unprocessed:
+            self._fail(batch, batch.rows[task_id], "task not written, DynamoDB kept throttling the writes")
+        batch.imported = len(batch.tasks) - len(unprocessed)
+        self.report.imported += batch.imported
+
+        self._written[idx] = batch
+        while self._next_to_commit in self._written:
+            committed = self._written.pop(self._next_to_commit)
+            self._checkpoint.rows = committed.end_row
+            self._checkpoint.imported += committed.imported
+            self._checkpoint.failed += committed.failed
+            self._next_to_commit += 1
+
+        self.report.elapsed_seconds = time.perf_counter() - self._started
+        self.report.tasks_per_second = self.report.imported / self.report.elapsed_seconds
+        self._on_progress(self.report)
+
+    def run(self, tasks: Iterable[TaskCreate | str]) -> TaskImportReport:
+        in_flight: dict[Future[set[str]], tuple[int, _Batch]] = {}
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="task-import") as executor:
+            try:
+                for idx, batch in enumerate(self._batches(tasks)):
+                    # keeps at most two batches per worker in memory, whatever the size of the input
+                    while len(in_flight) >= self._workers * 2:
+                        self._collect(in_flight)
+                    in_flight[executor.submit(_import_batch, batch.tasks, self._throttle)] = (idx, batch)
+                while in_flight:
+                    self._collect(in_flight)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+        return self.report
+
+    def _collect(self, in_flight: dict[Future[set[str]], tuple[int, _Batch]]) -> None:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            idx, batch = in_flight.pop(future)
+            self._complete(idx, batch, future.result())
+
+
+def import_tasks(
+    lines: Iterable[str],
+    fmt: ImportFormat = "ndjson",
+    workers: int = DEFAULT_WORKERS,
+    checkpoint: ImportCheckpoint | None = None,
+    on_progress: Callable[[TaskImportReport], None] | None = None,
+) -> TaskImportReport:
+    """Create tasks from the rows of an NDJSON or CSV input with batch writes spread across a pool of workers.
+
+    The input is read as the writes progress, so memory use does not depend on its size. Tasks are written through the
+    task repository, writes throttled by DynamoDB being retried with a delay shared by all workers, and every written
+    task is published to the change feed and added to the search index.
+
+    :param lines: The input lines.
+    :param fmt: The input format.
+    :param workers: Number of batch writes in flight at once.
+    :param checkpoint: The checkpoint to resume from and keep up to date (optional).
+    :param on_progress: Called with the report after every batch (optional).
+    :return: The report of the rows read from the input in this run.
+    :raises PutError: If a write failed for a reason other than throttling, the checkpoint holds the rows written so far.
+    """
+    return _Import(workers, checkpoint or ImportCheckpoint(), on_progress or (lambda _: None)).run(
+        read_tasks(lines, fmt)
+    )
+
+
+def _lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Split a stream of UTF-8 encoded chunks into lines, keeping their line endings."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        start = 0
+        while (end := pending.find("\n", start)) != -1:
+            yield pending[start : end + 1]
+            start = end + 1
+        pending = pending[start:]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def import_stream(chunks: AsyncIterator[bytes], fmt: ImportFormat, workers: int) -> TaskImportReport:
+    """Import tasks from an async stream, e.g. a request body, while it is received.
+
+    The import runs in a worker thread, which pulls the chunks from the event loop one at a time.
+
+    :param chunks: The UTF-8 encoded input.
+    :param fmt: The input format.
+    :param workers: Number of batch writes in flight at once.
+    :return: The report of the import.
+    """
+
+    def receive() -> Iterator[bytes]:
+        while True:
+            try:
+                yield anyio.from_thread.run(chunks.__anext__)
+            except StopAsyncIteration:
+                return
+
+    report = await run_in_threadpool(import_tasks, _lines(receive()), fmt, workers)
+    logger.info("imported %d of %d tasks in %.2fs", report.imported, report.rows, report.elapsed_seconds)
+    return report
+
+
+class _ProgressPrinter:
+
+    """Print the progress of an import to stderr and save its checkpoint at regular intervals."""
+
+    def __init__(self, checkpoint: ImportCheckpoint, checkpoint_path: Path | None):
+        self._checkpoint = checkpoint
+        self._checkpoint_path = checkpoint_path
+        self._printed_at = 0.0
+        self._saved_at = time.monotonic()
+
+    def __call__(self, report: TaskImportReport) -> None:
+        now = time.monotonic()
+        if now - self._printed_at >= PROGRESS_INTERVAL_SECONDS:
+            self._printed_at = now
+            print(
+                f"rows {report.rows}, imported {report.imported}, failed {report.failed}, "
+                f"{report.tasks_per_second:.0f} tasks/s",
+                file=sys.stderr,
+            )
+        if self._checkpoint_path is not None and now - self._saved_at >= CHECKPOINT_INTERVAL_SECONDS:
+            self._saved_at = now
+            self._checkpoint.save(self._checkpoint_path)
+
+
+def main() -> int:
+    """Run an import from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("path", help="file to import, - to read from stdin")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="input format (default: from the file extension)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="batch writes in flight at once")
+    parser.add_argument("--checkpoint", type=Path, help="progress file, an existing one resumes the import")
+    args = parser.parse_args()
+
+    fmt: ImportFormat
+    if args.format is not None:
+        # argparse restricts it to the choices, which are the import formats
+        fmt = cast(ImportFormat, args.format)
+    elif cast(str, args.path).lower().endswith(".csv"):
+        fmt = "csv"
+    else:
+        fmt = "ndjson"
+    checkpoint = ImportCheckpoint.load(args.checkpoint) if args.checkpoint else ImportCheckpoint()
+    if checkpoint.rows:
+        print(f"resuming after row {checkpoint.rows}", file=sys.stderr)
+
+    with open(
+        sys.stdin.fileno() if args.path == "-" else args.path, encoding="utf-8", newline="", closefd=args.path != "-"
+    ) as f:
+        try:
+            report = import_tasks(f, fmt, args.workers, checkpoint, _ProgressPrinter(checkpoint, args.checkpoint))
+        finally:
+            if args.checkpoint:
+                checkpoint.save(args.checkpoint)
+
+    print(report.model_dump_json(indent=2))
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
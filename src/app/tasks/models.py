@@ -1,7 +1,68 @@
-from pynamodb.attributes import BooleanAttribute, UnicodeAttribute, VersionAttribute
+import zlib
+from datetime import UTC, datetime
+from typing import Any
+
+from pynamodb.attributes import BooleanAttribute, UnicodeAttribute, UTCDateTimeAttribute, VersionAttribute
+from pynamodb.connection import TableConnection
+from pynamodb.indexes import AllProjection, GlobalSecondaryIndex
 from pynamodb.models import Model
 
 from ..config import settings
+from ..dynamodb import PoolStats, configure_client, pool_stats
+
+TASKS_BUCKET = "tasks"
+# the tasks are spread over several index partitions, a single one would cap the write throughput of the table at the
+# throughput of one index partition, changing the number of shards requires writing every task again
+TASKS_BUCKET_SHARDS = 4
+TASKS_BUCKETS = tuple(f"{TASKS_BUCKET}#{shard}" for shard in range(TASKS_BUCKET_SHARDS))
+
+
+def _utc_now() -> datetime:
+    return datetime.now(UTC)
+
+
+def bucket_value(task_id: str) -> str:
+    """Return the index partition of a task, the shard picked by a hash of its ID."""
+    return TASKS_BUCKETS[zlib.crc32(task_id.encode("utf-8")) % TASKS_BUCKET_SHARDS]
+
+
+def open_bucket_value(task_id: str, is_completed: bool | None) -> str | None:
+    """Return the open_bucket of a task, only incomplete tasks are in the sparse open tasks index."""
+    return None if is_completed else bucket_value(task_id)
+
+
+class TaskCreatedAtIndex(GlobalSecondaryIndex["Task"]):  # type: ignore[no-untyped-call]
+
+    """Index for listing tasks in creation order, merging the tasks of every bucket shard."""
+
+    class Meta:
+
+        """Index configuration."""
+
+        index_name = "created_at_index"
+        projection = AllProjection()
+        read_capacity_units = 1
+        write_capacity_units = 1
+
+    bucket = UnicodeAttribute(hash_key=True)
+    created_at = UTCDateTimeAttribute(range_key=True)
+
+
+class TaskOpenIndex(GlobalSecondaryIndex["Task"]):  # type: ignore[no-untyped-call]
+
+    """Sparse index for listing incomplete tasks in creation order, completed tasks have no open_bucket."""
+
+    class Meta:
+
+        """Index configuration."""
+
+        index_name = "open_index"
+        projection = AllProjection()
+        read_capacity_units = 1
+        write_capacity_units = 1
+
+    open_bucket = UnicodeAttribute(hash_key=True)
+    created_at = UTCDateTimeAttribute(range_key=True)
 
 
 class Task(Model):
@@ -14,8 +75,53 @@ class Task(Model):
 
         host = settings.db_host
         table_name = settings.db_tasks_table
+        # the botocore client is configured from the settings, see _get_connection, these are kept consistent with it
+        connect_timeout_seconds = settings.db_connect_timeout_seconds
+        read_timeout_seconds = settings.db_read_timeout_seconds
+        max_pool_connections = settings.db_max_pool_connections
+        max_retry_attempts = settings.db_max_attempts - 1
 
     id = UnicodeAttribute(hash_key=True)
     description = UnicodeAttribute(null=True)
     is_completed = BooleanAttribute(default=False)
     version = VersionAttribute()
+    bucket = UnicodeAttribute()
+    created_at = UTCDateTimeAttribute(default=_utc_now)
+    open_bucket = UnicodeAttribute(null=True)
+
+    created_at_index = TaskCreatedAtIndex()
+    open_index = TaskOpenIndex()
+
+    def serialize(self, null_check: bool = True) -> dict[str, dict[str, Any]]:
+        """Serialize the task, keeping its buckets in line with its ID and is_completed on every full item write."""
+        self.bucket = bucket_value(self.id)
+        self.open_bucket = open_bucket_value(self.id, self.is_completed)
+        return super().serialize(null_check=null_check)
+
+    @classmethod
+    def _get_connection(cls) -> TableConnection:
+        connection = super()._get_connection()
+        if connection.connection._client is None:
+            configure_client(connection.connection, settings)
+        return connection
+
+
+def prewarm_connection() -> None:
+    """Create the botocore client used by the Task model, so the first request does not pay for it."""
+    Task._get_connection().connection.client  # noqa: B018
+
+
+def close_connection() -> None:
+    """Close the botocore client used by the Task model and its connection pool, a new one is created on next use."""
+    connection = Task._connection
+    if connection is None or connection.connection._client is None:
+        return
+    connection.connection._client.close()
+    connection.connection._client = None
+
+
+def task_pool_stats() -> PoolStats | None:
+    """Return the connection pool usage of the client used by the Task model, None until the client is created."""
+    connection = Task._connection
+    client = None if connection is None else connection.connection._client
+    return None if client is None else pool_stats(client)
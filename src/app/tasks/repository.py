@@ -0,0 +1,807 @@
+import asyncio
+import bisect
+import contextvars
+import importlib
+import threading
+import zlib
+from collections import Counter
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from typing import Any, NamedTuple, Protocol
+
+from botocore.exceptions import ClientError
+from pynamodb.attributes import UnicodeAttribute
+from pynamodb.constants import ALL_NEW, ALL_OLD
+from pynamodb.exceptions import DeleteError, DoesNotExist, GetError, PutError, QueryError, UpdateError
+from pynamodb.expressions.condition import Condition
+from pynamodb.expressions.update import Action
+
+from ..config import Settings, settings
+from ..dynamodb import client_options
+from .batch import batch_get, batch_write
+from .models import TASKS_BUCKETS, Task
+
+_VERSION_NAMES = {"#version": Task.version.attr_name}
+_CONDITION_FAILED = "ConditionalCheckFailedException"
+
+
+class TaskRepository(Protocol):
+
+    """Data access for tasks, with the semantics of the Task table.
+
+    Writes of a single task are conditional: they fail with the PynamoDB exception of the operation, caused by a
+    ConditionalCheckFailedException, when the task is missing or its version differs. Listings merge the bucket shards
+    of the created_at and open indexes, and are paginated with the last evaluated key of every shard left to read, keyed
+    by bucket, None for a shard to read from its start.
+    """
+
+    def get(self, task_id: str) -> Task:
+        """Retrieve a task by its ID, raising DoesNotExist if it does not exist."""
+
+    def exists(self, task_id: str) -> bool:
+        """Return whether a task exists."""
+
+    def query(
+        self,
+        limit: int,
+        last_evaluated_key: dict[str, Any] | None = None,
+        is_completed: bool | None = None,
+        attributes: list[str] | None = None,
+    ) -> tuple[list[Task], dict[str, Any] | None]:
+        """Query a page of tasks in creation order, returning them and the last evaluated keys, None on the last page.
+
+        Limit counts the tasks evaluated in each shard before completed tasks are filtered, like the Limit of a DynamoDB
+        query.
+        """
+
+    def scan(
+        self, segment: int | None = None, total_segments: int | None = None, attributes: list[str] | None = None
+    ) -> Iterator[Task]:
+        """Iterate over every task, or the tasks of one of total_segments segments, in no particular order."""
+
+    def save(self, task: Task) -> None:
+        """Save a task, incrementing its version, raising PutError if its version is outdated."""
+
+    def update(self, task_id: str, changes: dict[str, Any], version: int | None = None) -> Task:
+        """Set the given attributes of an existing task, None removes them, and increment its version."""
+
+    def delete(self, task_id: str, version: int | None = None) -> Task:
+        """Delete an existing task, returning it."""
+
+    def batch_get(self, task_ids: Sequence[str]) -> tuple[dict[str, Task], set[str]]:
+        """Retrieve tasks, returning those found keyed by ID and the IDs left unprocessed."""
+
+    def batch_write(self, put_tasks: Sequence[Task] = (), delete_tasks: Sequence[Task] = ()) -> set[str]:
+        """Put and delete tasks unconditionally, returning the IDs left unprocessed."""
+
+
+ShardPage = tuple[list[dict[str, Any]], dict[str, Any] | None]
+
+
+class ShardQuery(NamedTuple):
+
+    """The query of a page of tasks, run against each bucket shard of an index."""
+
+    limit: int
+    is_completed: bool | None
+    attributes: list[str] | None
+
+
+def _index_key(item: dict[str, Any]) -> tuple[str, str]:
+    return item[Task.created_at.attr_name]["S"], item[Task.id.attr_name]["S"]
+
+
+def _index_bucket(is_completed: bool | None) -> UnicodeAttribute:
+    return Task.open_bucket if is_completed is False else Task.bucket
+
+
+def _start_keys(last_evaluated_key: dict[str, Any] | None) -> dict[str, dict[str, Any] | None]:
+    return dict.fromkeys(TASKS_BUCKETS) if last_evaluated_key is None else last_evaluated_key
+
+
+def _projection(attributes: list[str] | None) -> list[str] | None:
+    # the shard pages are merged by index key, which is read whatever the selected attributes
+    if attributes is None:
+        return None
+    return list(dict.fromkeys([*attributes, Task.id.attr_name, Task.created_at.attr_name]))
+
+
+def _merge_shard_pages(
+    pages: dict[str, ShardPage],
+    start_keys: dict[str, dict[str, Any] | None],
+    limit: int,
+    bucket: UnicodeAttribute,
+) -> tuple[list[Task], dict[str, Any] | None]:
+    """Merge the pages read from every bucket shard into one page of tasks in creation order.
+
+    A shard with more tasks to read only evaluated the tasks up to its last evaluated key, so the merged page stops at
+    the lowest last evaluated key, the tasks after it could sort before unread tasks of that shard.
+
+    :param pages: The raw items and last evaluated key of each shard read, keyed by bucket.
+    :param start_keys: The key each shard was read from, keyed by bucket.
+    :param limit: Maximum number of tasks in the page.
+    :param bucket: The bucket attribute of the index the shards were read from.
+    :return: The tasks of the page and the last evaluated key of every shard left to read, None on the last page.
+    """
+    bound = min((_index_key(key) for _, key in pages.values() if key is not None), default=None)
+    candidates = [
+        (_index_key(item), shard, item)
+        for shard, (items, _) in pages.items()
+        for item in items
+        if bound is None or _index_key(item) <= bound
+    ]
+    selected = sorted(candidates, key=lambda candidate: candidate[0])[:limit]
+
+    taken = Counter(shard for _, shard, _ in selected)
+    last_taken = {shard: key for key, shard, _ in selected}
+    next_keys: dict[str, Any] = {}
+    for shard, (items, last_evaluated_key) in pages.items():
+        if taken[shard] == len(items):
+            # every task read from the shard is in the page, it continues after its last evaluated key, if any
+            if last_evaluated_key is not None:
+                next_keys[shard] = last_evaluated_key
+        elif shard in last_taken:
+            created_at, task_id = last_taken[shard]
+            next_keys[shard] = {
+                Task.id.attr_name: {"S": task_id},
+                bucket.attr_name: {"S": shard},
+                Task.created_at.attr_name: {"S": created_at},
+            }
+        else:
+            next_keys[shard] = start_keys[shard]
+    return [Task.from_raw_data(item) for _, _, item in selected], next_keys or None
+
+
+def _condition(version: int | None) -> Condition:
+    condition = Task.id.exists()
+    if version is not None:
+        condition &= Task.version == version
+    return condition
+
+
+def _update_actions(changes: dict[str, Any]) -> list[Action]:
+    attributes = Task.get_attributes()
+    actions = [Task.version.add(1)]
+    for name, value in changes.items():
+        actions.append(attributes[name].remove() if value is None else attributes[name].set(value))
+    return actions
+
+
+class DynamoDBTaskRepository:
+
+    """Data access for the Task table, through the PynamoDB Task model."""
+
+    def get(self, task_id: str) -> Task:
+        """Retrieve a task by its ID.
+
+        :param task_id: The ID of the task.
+        :return: The task.
+        :raises DoesNotExist: If the task does not exist.
+        """
+        return Task.get(task_id)
+
+    def exists(self, task_id: str) -> bool:
+        """Return whether a task exists, reading its ID only."""
+        try:
+            Task.get(task_id, attributes_to_get=[Task.id.attr_name])
+        except DoesNotExist:
+            return False
+        return True
+
+    def query(
+        self,
+        limit: int,
+        last_evaluated_key: dict[str, Any] | None = None,
+        is_completed: bool | None = None,
+        attributes: list[str] | None = None,
+    ) -> tuple[list[Task], dict[str, Any] | None]:
+        """Query a page of tasks in creation order, reading every bucket shard in parallel.
+
+        Incomplete tasks are queried from the sparse open index, the other listings from the created_at index.
+
+        :param limit: Maximum number of tasks to evaluate in each shard.
+        :param last_evaluated_key: The keys to start the query from, as returned by the previous page (optional).
+        :param is_completed: Only return tasks with this completion status (optional).
+        :param attributes: The attributes to project, all attributes if None.
+        :return: The tasks and the last evaluated keys, which are None on the last page.
+        """
+        start_keys = _start_keys(last_evaluated_key)
+        query = ShardQuery(limit, is_completed, attributes)
+        with ThreadPoolExecutor(max_workers=len(start_keys)) as executor:
+            # each shard is read in a copy of the request context, which records the DynamoDB calls of the request
+            futures = {
+                shard: executor.submit(contextvars.copy_context().run, self._query_shard, shard, key, query)
+                for shard, key in start_keys.items()
+            }
+            pages = {shard: future.result() for shard, future in futures.items()}
+        return _merge_shard_pages(pages, start_keys, limit, _index_bucket(is_completed))
+
+    @staticmethod
+    def _query_shard(shard: str, last_evaluated_key: dict[str, Any] | None, query: ShardQuery) -> ShardPage:
+        # a single Query call, the limit of a PynamoDB model query would read pages until it has enough filtered tasks
+        limit, is_completed, attributes = query
+        index = Task.open_index if is_completed is False else Task.created_at_index
+        data = Task._get_connection().query(
+            shard,
+            filter_condition=Task.is_completed == is_completed if is_completed else None,
+            attributes_to_get=_projection(attributes),
+            exclusive_start_key=last_evaluated_key,
+            index_name=index.Meta.index_name,
+            limit=limit,
+        )
+        return data.get("Items", []), data.get("LastEvaluatedKey")
+
+    def scan(
+        self, segment: int | None = None, total_segments: int | None = None, attributes: list[str] | None = None
+    ) -> Iterator[Task]:
+        """Scan the task table, or one segment of it, a page at a time.
+
+        :param segment: The segment to scan, the whole table if None.
+        :param total_segments: Number of segments the table is split into for a parallel scan.
+        :param attributes: The attributes to read, all attributes if None.
+        :return: The tasks, in table order.
+        """
+        return Task.scan(segment=segment, total_segments=total_segments, attributes_to_get=attributes)
+
+    def save(self, task: Task) -> None:
+        """Save a task, incrementing its version on success.
+
+        :param task: The task to save.
+        :raises PutError: If the task could not be saved, e.g. because its version is outdated.
+        """
+        task.save()
+
+    def update(self, task_id: str, changes: dict[str, Any], version: int | None = None) -> Task:
+        """Set the given attributes of an existing task and increment its version, in a single conditional write.
+
+        :param task_id: The ID of the task.
+        :param changes: The new attribute values, by Task attribute name, attributes set to None are removed.
+        :param version: The version the task must have, any version if None.
+        :return: The updated task.
+        :raises UpdateError: If the task could not be updated, e.g. because it does not exist or its version differs.
+        """
+        data = Task._get_connection().update_item(
+            task_id, actions=_update_actions(changes), condition=_condition(version), return_values=ALL_NEW
+        )
+        return Task.from_raw_data(data["Attributes"])
+
+    def delete(self, task_id: str, version: int | None = None) -> Task:
+        """Delete an existing task, in a single conditional write.
+
+        :param task_id: The ID of the task.
+        :param version: The version the task must have, any version if None.
+        :return: The deleted task.
+        :raises DeleteError: If the task could not be deleted, e.g. because it does not exist or its version differs.
+        """
+        data = Task._get_connection().delete_item(task_id, condition=_condition(version), return_values=ALL_OLD)
+        return Task.from_raw_data(data["Attributes"])
+
+    def batch_get(self, task_ids: Sequence[str]) -> tuple[dict[str, Task], set[str]]:
+        """Retrieve tasks with BatchGetItem, see batch_get."""
+        return batch_get(task_ids)
+
+    def batch_write(self, put_tasks: Sequence[Task] = (), delete_tasks: Sequence[Task] = ()) -> set[str]:
+        """Put and delete tasks with BatchWriteItem, see batch_write."""
+        return batch_write(put_tasks, delete_tasks)
+
+
+def _condition_failure(exc_type: type[PutError | UpdateError | DeleteError], operation: str) -> Exception:
+    cause = ClientError({"Error": {"Code": _CONDITION_FAILED, "Message": "The conditional request failed"}}, operation)
+    return exc_type(f"Failed to {operation}: {cause}", cause)
+
+
+def _select(item: dict[str, Any], attributes: list[str]) -> dict[str, Any]:
+    return {name: item[name] for name in attributes if name in item}
+
+
+def _scan_segment(task_id: str, total_segments: int | None) -> int:
+    return zlib.crc32(task_id.encode("utf-8")) % (total_segments or 1)
+
+
+class MemoryTaskRepository:
+
+    """In-process, thread-safe storage of tasks with the semantics of the Task table, for local runs and tests.
+
+    Items are kept serialized, as DynamoDB keeps them, so every read returns new Task objects. Each bucket shard of the
+    created_at and open indexes is a list of (created_at, id) keys kept sorted, a shard page is found by bisecting it
+    and its last evaluated key has the attributes of the DynamoDB index key.
+    """
+
+    def __init__(self) -> None:
+        self._items: dict[str, dict[str, Any]] = {}
+        self._created_at_index: dict[str, list[tuple[str, str]]] = {}
+        self._open_index: dict[str, list[tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _indexes(self, item: dict[str, Any]) -> list[list[tuple[str, str]]]:
+        indexes = []
+        if Task.created_at.attr_name in item:
+            for index, bucket in ((self._created_at_index, Task.bucket), (self._open_index, Task.open_bucket)):
+                if bucket.attr_name in item:
+                    indexes.append(index.setdefault(item[bucket.attr_name]["S"], []))
+        return indexes
+
+    def _put(self, item: dict[str, Any]) -> dict[str, Any] | None:
+        task_id = item[Task.id.attr_name]["S"]
+        old_item = self._remove(task_id)
+        self._items[task_id] = item
+        for index in self._indexes(item):
+            bisect.insort(index, _index_key(item))
+        return old_item
+
+    def _remove(self, task_id: str) -> dict[str, Any] | None:
+        item = self._items.pop(task_id, None)
+        if item is not None and Task.created_at.attr_name in item:
+            key = _index_key(item)
+            for index in self._indexes(item):
+                del index[bisect.bisect_left(index, key)]
+        return item
+
+    def _check(self, task_id: str, version: int | None) -> dict[str, Any] | None:
+        item = self._items.get(task_id)
+        if item is None:
+            return None
+        if version is not None and item.get(Task.version.attr_name, {}).get("N") != str(version):
+            return None
+        return item
+
+    def get(self, task_id: str) -> Task:
+        """Retrieve a task by its ID.
+
+        :param task_id: The ID of the task.
+        :return: The task.
+        :raises DoesNotExist: If the task does not exist.
+        """
+        item = self._items.get(task_id)
+        if item is None:
+            raise DoesNotExist()
+        return Task.from_raw_data(item)
+
+    def exists(self, task_id: str) -> bool:
+        """Return whether a task exists."""
+        return task_id in self._items
+
+    def query(
+        self,
+        limit: int,
+        last_evaluated_key: dict[str, Any] | None = None,
+        is_completed: bool | None = None,
+        attributes: list[str] | None = None,
+    ) -> tuple[list[Task], dict[str, Any] | None]:
+        """Query a page of tasks in creation order, from the open index for incomplete tasks.
+
+        :param limit: Maximum number of tasks to evaluate in each shard.
+        :param last_evaluated_key: The keys to start the query from, as returned by the previous page (optional).
+        :param is_completed: Only return tasks with this completion status (optional).
+        :param attributes: The attributes to project, all attributes if None.
+        :return: The tasks and the last evaluated keys, which are None on the last page.
+        """
+        start_keys = _start_keys(last_evaluated_key)
+        query = ShardQuery(limit, is_completed, attributes)
+        pages = {shard: self._query_shard(shard, key, query) for shard, key in start_keys.items()}
+        return _merge_shard_pages(pages, start_keys, limit, _index_bucket(is_completed))
+
+    def _query_shard(self, shard: str, last_evaluated_key: dict[str, Any] | None, query: ShardQuery) -> ShardPage:
+        limit, is_completed, attributes = query
+        bucket = _index_bucket(is_completed)
+        with self._lock:
+            index = (self._open_index if is_completed is False else self._created_at_index).get(shard, [])
+            start = 0 if last_evaluated_key is None else bisect.bisect_right(index, _index_key(last_evaluated_key))
+            keys = index[start : start + limit]
+            items = [self._items[task_id] for _, task_id in keys]
+            has_more = start + limit < len(index)
+
+        if is_completed:
+            items = [item for item in items if item.get(Task.is_completed.attr_name, {}).get("BOOL", False)]
+        projection = _projection(attributes)
+        if projection is not None:
+            items = [_select(item, projection) for item in items]
+
+        next_key = None
+        if has_more:
+            created_at, task_id = keys[-1]
+            next_key = {
+                Task.id.attr_name: {"S": task_id},
+                bucket.attr_name: {"S": shard},
+                Task.created_at.attr_name: {"S": created_at},
+            }
+        return items, next_key
+
+    def scan(
+        self, segment: int | None = None, total_segments: int | None = None, attributes: list[str] | None = None
+    ) -> Iterator[Task]:
+        """Iterate over the tasks stored when the iteration starts, or those of one segment, split by a hash of the ID.
+
+        :param segment: The segment to iterate over, every task if None.
+        :param total_segments: Number of segments the tasks are split into.
+        :param attributes: The attributes to read, all attributes if None.
+        :return: The tasks, in no particular order.
+        """
+        with self._lock:
+            items = [
+                item
+                for task_id, item in self._items.items()
+                if segment is None or _scan_segment(task_id, total_segments) == segment
+            ]
+        for item in items:
+            yield Task.from_raw_data(item if attributes is None else _select(item, attributes))
+
+    def save(self, task: Task) -> None:
+        """Save a task, incrementing its version on success.
+
+        :param task: The task to save.
+        :raises PutError: If the task could not be saved, e.g. because its version is outdated.
+        """
+        item = task.serialize()
+        version = 1 if task.version is None else task.version + 1
+        item[Task.version.attr_name] = {"N": str(version)}
+        with self._lock:
+            current = self._items.get(task.id)
+            current_version = None if current is None else current.get(Task.version.attr_name, {}).get("N")
+            if current_version != (None if task.version is None else str(task.version)):
+                raise _condition_failure(PutError, "PutItem")
+            self._put(item)
+        task.version = version
+
+    def update(self, task_id: str, changes: dict[str, Any], version: int | None = None) -> Task:
+        """Set the given attributes of an existing task and increment its version.
+
+        :param task_id: The ID of the task.
+        :param changes: The new attribute values, by Task attribute name, attributes set to None are removed.
+        :param version: The version the task must have, any version if None.
+        :return: The updated task.
+        :raises UpdateError: If the task does not exist or its version differs.
+        """
+        attributes = Task.get_attributes()
+        with self._lock:
+            current = self._check(task_id, version)
+            if current is None:
+                raise _condition_failure(UpdateError, "UpdateItem")
+            item = dict(current)
+            for name, value in changes.items():
+                attribute = attributes[name]
+                if value is None:
+                    item.pop(attribute.attr_name, None)
+                else:
+                    item[attribute.attr_name] = {attribute.attr_type: attribute.serialize(value)}
+            item[Task.version.attr_name] = {"N": str(int(current.get(Task.version.attr_name, {}).get("N", 0)) + 1)}
+            self._put(item)
+        return Task.from_raw_data(item)
+
+    def delete(self, task_id: str, version: int | None = None) -> Task:
+        """Delete an existing task.
+
+        :param task_id: The ID of the task.
+        :param version: The version the task must have, any version if None.
+        :return: The deleted task.
+        :raises DeleteError: If the task does not exist or its version differs.
+        """
+        with self._lock:
+            item = self._check(task_id, version)
+            if item is None:
+                raise _condition_failure(DeleteError, "DeleteItem")
+            self._remove(task_id)
+        return Task.from_raw_data(item)
+
+    def batch_get(self, task_ids: Sequence[str]) -> tuple[dict[str, Task], set[str]]:
+        """Retrieve tasks, every ID is processed.
+
+        :param task_ids: The IDs of the tasks to retrieve.
+        :return: The tasks found keyed by ID, and no unprocessed IDs.
+        """
+        with self._lock:
+            items = [self._items[task_id] for task_id in task_ids if task_id in self._items]
+        return {task.id: task for task in map(Task.from_raw_data, items)}, set()
+
+    def batch_write(self, put_tasks: Sequence[Task] = (), delete_tasks: Sequence[Task] = ()) -> set[str]:
+        """Put and delete tasks unconditionally, every task is processed.
+
+        :param put_tasks: The tasks to put.
+        :param delete_tasks: The tasks to delete.
+        :return: No unprocessed IDs.
+        """
+        items = [task.serialize() for task in put_tasks]
+        with self._lock:
+            for item in items:
+                self._put(item)
+            for task in delete_tasks:
+                self._remove(task.id)
+        return set()
+
+
+def _write_condition(version: int | None) -> dict[str, Any]:
+    condition: dict[str, Any] = {
+        "ConditionExpression": "attribute_exists(#id)",
+        "ExpressionAttributeNames": {"#id": Task.id.attr_name},
+        "ExpressionAttributeValues": {},
+    }
+    if version is not None:
+        condition["ConditionExpression"] += " AND #version = :version"
+        condition["ExpressionAttributeNames"].update(_VERSION_NAMES)
+        condition["ExpressionAttributeValues"][":version"] = {"N": str(version)}
+    return condition
+
+
+class AsyncTaskRepository:
+
+    """Async data access for the Task table, built on an aiobotocore DynamoDB client.
+
+    The client and its connection pool are created on first use and shared by every request until close is called.
+    Items are (de)serialized with the Task model and writes follow the same version checks as Task.save and
+    Task.delete, raising the same PynamoDB exceptions.
+
+    :param max_pool_connections: Maximum number of connections kept in the client connection pool.
+    :param client_options: Other botocore client config options, e.g. timeouts and retries.
+    """
+
+    def __init__(self, max_pool_connections: int, client_options: dict[str, Any] | None = None):
+        self._max_pool_connections = max_pool_connections
+        self._client_options = client_options or {}
+        self._client: Any = None
+        self._exit_stack: AsyncExitStack | None = None
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self) -> Any:
+        if self._client is not None:
+            return self._client
+
+        async with self._lock:
+            if self._client is None:
+                # imported lazily, aiobotocore is optional and slow to import
+                try:
+                    aio_config = importlib.import_module("aiobotocore.config")
+                    aio_session = importlib.import_module("aiobotocore.session")
+                except ImportError as exc:
+                    raise RuntimeError("async db backend requires the 'async' extra to be installed") from exc
+
+                exit_stack = AsyncExitStack()
+                self._client = await exit_stack.enter_async_context(
+                    aio_session.get_session().create_client(
+                        "dynamodb",
+                        region_name=getattr(Task.Meta, "region", None),
+                        endpoint_url=Task.Meta.host,
+                        config=aio_config.AioConfig(
+                            **{**self._client_options, "max_pool_connections": self._max_pool_connections}
+                        ),
+                    )
+                )
+                self._exit_stack = exit_stack
+        return self._client
+
+    async def open(self) -> None:
+        """Create the shared client up front, so the first request does not pay for it."""
+        await self._get_client()
+
+    async def close(self) -> None:
+        """Close the shared client and its connection pool, if it was created."""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._client = None
+        self._exit_stack = None
+        # the lock is bound to the event loop of its first waiter
+        self._lock = asyncio.Lock()
+
+    async def get(self, task_id: str) -> Task:
+        """Retrieve a task by its ID.
+
+        :param task_id: The ID of the task.
+        :return: The task.
+        :raises DoesNotExist: If the task does not exist.
+        :raises GetError: If the task could not be retrieved.
+        """
+        client = await self._get_client()
+        try:
+            data = await client.get_item(TableName=Task.Meta.table_name, Key={"id": {"S": task_id}})
+        except ClientError as exc:
+            raise GetError(f"Failed to get item: {exc}", exc) from exc
+
+        if "Item" not in data:
+            raise DoesNotExist()
+        return Task.from_raw_data(data["Item"])
+
+    async def query(
+        self,
+        limit: int,
+        last_evaluated_key: dict[str, Any] | None = None,
+        is_completed: bool | None = None,
+        attributes: list[str] | None = None,
+    ) -> tuple[list[Task], dict[str, Any] | None]:
+        """Query a page of tasks in creation order, reading every bucket shard concurrently.
+
+        Incomplete tasks are queried from the sparse open index, the other listings from the created_at index.
+
+        :param limit: Maximum number of tasks to evaluate in each shard.
+        :param last_evaluated_key: The keys to start the query from, as returned by the previous page (optional).
+        :param is_completed: Only return tasks with this completion status (optional).
+        :param attributes: The attributes to project, all attributes if None.
+        :return: The tasks and the last evaluated keys, which are None on the last page.
+        :raises QueryError: If the query failed.
+        """
+        start_keys = _start_keys(last_evaluated_key)
+        query = ShardQuery(limit, is_completed, attributes)
+        results = await asyncio.gather(*(self._query_shard(shard, key, query) for shard, key in start_keys.items()))
+        pages = dict(zip(start_keys, results, strict=True))
+        return _merge_shard_pages(pages, start_keys, limit, _index_bucket(is_completed))
+
+    async def _query_shard(self, shard: str, last_evaluated_key: dict[str, Any] | None, query: ShardQuery) -> ShardPage:
+        limit, is_completed, attributes = query
+        client = await self._get_client()
+        index = Task.open_index if is_completed is False else Task.created_at_index
+        query_args: dict[str, Any] = {
+            "TableName": Task.Meta.table_name,
+            "IndexName": index.Meta.index_name,
+            "KeyConditionExpression": "#bucket = :bucket",
+            "ExpressionAttributeNames": {"#bucket": _index_bucket(is_completed).attr_name},
+            "ExpressionAttributeValues": {":bucket": {"S": shard}},
+            "Limit": limit,
+        }
+        if is_completed:
+            query_args["FilterExpression"] = "#is_completed = :is_completed"
+            query_args["ExpressionAttributeNames"]["#is_completed"] = Task.is_completed.attr_name
+            query_args["ExpressionAttributeValues"][":is_completed"] = {"BOOL": True}
+        projection = _projection(attributes)
+        if projection is not None:
+            query_args["ProjectionExpression"] = ", ".join(f"#p{idx}" for idx in range(len(projection)))
+            query_args["ExpressionAttributeNames"].update({f"#p{idx}": name for idx, name in enumerate(projection)})
+        if last_evaluated_key is not None:
+            query_args["ExclusiveStartKey"] = last_evaluated_key
+
+        try:
+            data = await client.query(**query_args)
+        except ClientError as exc:
+            raise QueryError(f"Failed to query items: {exc}", exc) from exc
+
+        return data.get("Items", []), data.get("LastEvaluatedKey")
+
+    async def save(self, task: Task) -> None:
+        """Save a task, incrementing its version on success.
+
+        :param task: The task to save.
+        :raises PutError: If the task could not be saved, e.g. because its version is outdated.
+        """
+        client = await self._get_client()
+        item = task.serialize()
+        put_args: dict[str, Any] = {"TableName": Task.Meta.table_name, "ExpressionAttributeNames": _VERSION_NAMES}
+        if task.version is None:
+            put_args["ConditionExpression"] = "attribute_not_exists(#version)"
+            item[Task.version.attr_name] = {"N": "1"}
+        else:
+            put_args["ConditionExpression"] = "#version = :version"
+            put_args["ExpressionAttributeValues"] = {":version": {"N": str(task.version)}}
+            item[Task.version.attr_name] = {"N": str(task.version + 1)}
+
+        try:
+            await client.put_item(Item=item, **put_args)
+        except ClientError as exc:
+            raise PutError(f"Failed to put item: {exc}", exc) from exc
+
+        task.version = 1 if task.version is None else task.version + 1
+
+    async def update(self, task_id: str, changes: dict[str, Any], version: int | None = None) -> Task:
+        """Set the given attributes of an existing task and increment its version, in a single write.
+
+        :param task_id: The ID of the task.
+        :param changes: The new attribute values, by Task attribute name, attributes set to None are removed.
+        :param version: The version the task must have, any version if None.
+        :return: The updated task.
+        :raises UpdateError: If the task could not be updated, e.g. because it does not exist or its version differs.
+        """
+        client = await self._get_client()
+        update_args = _write_condition(version)
+        update_args["ExpressionAttributeNames"].update(_VERSION_NAMES)
+        update_args["ExpressionAttributeValues"][":one"] = {"N": "1"}
+        assignments = []
+        removals = []
+        attributes = Task.get_attributes()
+        for idx, (name, value) in enumerate(changes.items()):
+            attribute = attributes[name]
+            update_args["ExpressionAttributeNames"][f"#attr{idx}"] = attribute.attr_name
+            if value is None:
+                removals.append(f"#attr{idx}")
+                continue
+            update_args["ExpressionAttributeValues"][f":attr{idx}"] = {attribute.attr_type: attribute.serialize(value)}
+            assignments.append(f"#attr{idx} = :attr{idx}")
+
+        update_expression = "ADD #version :one"
+        if assignments:
+            update_expression = f"SET {', '.join(assignments)} {update_expression}"
+        if removals:
+            update_expression = f"{update_expression} REMOVE {', '.join(removals)}"
+
+        try:
+            data = await client.update_item(
+                TableName=Task.Meta.table_name,
+                Key={"id": {"S": task_id}},
+                UpdateExpression=update_expression,
+                ReturnValues="ALL_NEW",
+                **update_args,
+            )
+        except ClientError as exc:
+            raise UpdateError(f"Failed to update item: {exc}", exc) from exc
+
+        return Task.from_raw_data(data["Attributes"])
+
+    async def delete(self, task_id: str, version: int | None = None) -> Task:
+        """Delete an existing task, in a single write.
+
+        :param task_id: The ID of the task.
+        :param version: The version the task must have, any version if None.
+        :return: The deleted task.
+        :raises DeleteError: If the task could not be deleted, e.g. because it does not exist or its version differs.
+        """
+        client = await self._get_client()
+        delete_args = _write_condition(version)
+        if not delete_args["ExpressionAttributeValues"]:
+            del delete_args["ExpressionAttributeValues"]
+
+        try:
+            data = await client.delete_item(
+                TableName=Task.Meta.table_name, Key={"id": {"S": task_id}}, ReturnValues="ALL_OLD", **delete_args
+            )
+        except ClientError as exc:
+            raise DeleteError(f"Failed to delete item: {exc}", exc) from exc
+
+        return Task.from_raw_data(data["Attributes"])
+
+
+class AsyncMemoryTaskRepository:
+
+    """Async interface of a MemoryTaskRepository, serving the async services from the same in-memory tasks.
+
+    :param repository: The in-memory repository.
+    """
+
+    def __init__(self, repository: MemoryTaskRepository):
+        self._repository = repository
+
+    async def open(self) -> None:
+        """Nothing to open."""
+
+    async def close(self) -> None:
+        """Nothing to close."""
+
+    async def get(self, task_id: str) -> Task:
+        """Retrieve a task by its ID, see MemoryTaskRepository.get."""
+        return self._repository.get(task_id)
+
+    async def query(
+        self,
+        limit: int,
+        last_evaluated_key: dict[str, Any] | None = None,
+        is_completed: bool | None = None,
+        attributes: list[str] | None = None,
+    ) -> tuple[list[Task], dict[str, Any] | None]:
+        """Query a page of tasks in creation order, see MemoryTaskRepository.query."""
+        return self._repository.query(limit, last_evaluated_key, is_completed, attributes)
+
+    async def save(self, task: Task) -> None:
+        """Save a task, see MemoryTaskRepository.save."""
+        self._repository.save(task)
+
+    async def update(self, task_id: str, changes: dict[str, Any], version: int | None = None) -> Task:
+        """Update an existing task, see MemoryTaskRepository.update."""
+        return self._repository.update(task_id, changes, version)
+
+    async def delete(self, task_id: str, version: int | None = None) -> Task:
+        """Delete an existing task, see MemoryTaskRepository.delete."""
+        return self._repository.delete(task_id, version)
+
+
+def create_task_repositories(
+    config: Settings,
+) -> tuple[TaskRepository, AsyncTaskRepository | AsyncMemoryTaskRepository]:
+    """Create the task repositories of the sync and async services from the storage backend selected by the settings.
+
+    :param config: The project settings.
+    :return: The sync and the async task repository, sharing the same tasks.
+    """
+    if config.storage_backend == "memory":
+        repository = MemoryTaskRepository()
+        return repository, AsyncMemoryTaskRepository(repository)
+    return DynamoDBTaskRepository(), AsyncTaskRepository(
+        max_pool_connections=config.db_max_pool_connections, client_options=client_options(config)
+    )
+
+
+sync_task_repository, task_repository = create_task_repositories(settings)
@@ -1,40 +1,156 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
 from starlette import status
+from starlette.responses import StreamingResponse
 
-from .schemas import TaskRead
-from .services import create_task, delete_task, get_task, list_tasks, update_task
+from ..changes import ChangeBroker
+from ..config import settings
+from ..responses import ModelResponse
+from . import async_services, changes, export, importer, search, services, stats
+from .schemas import (
+    TaskBatchResponse,
+    TaskChangePage,
+    TaskImportReport,
+    TaskPage,
+    TaskRead,
+    TaskSearchPage,
+    TaskStats,
+)
+
+# the endpoints return the service results as ModelResponse, which skips validating them against the response model
+# again, the response models are only declared for the OpenAPI schema
+tasks_router = APIRouter(default_response_class=ModelResponse)
+
+# the batch, export, import, search and stats endpoints are only served by the sync services
+_services = async_services if settings.db_backend == "async" else services
+
+
+@tasks_router.get("", response_model=TaskPage)
+async def list_tasks(tasks: Annotated[TaskPage, Depends(_services.revalidate_page)], response: Response) -> Response:
+    """Retrieve a page of tasks."""
+    return ModelResponse(tasks, headers=response.headers)
+
+
+@tasks_router.get(
+    ":export",
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {export.NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_tasks(
+    segments: Annotated[int, Query(ge=1, le=export.MAX_SEGMENTS)] = 1,
+    accept_encoding: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Stream all tasks as newline delimited JSON, scanning the given number of table segments in parallel.
+
+    Only the long-running server streams the export, API Gateway and Lambda buffer it whole within the payload limit.
+    """
+    return export.stream_tasks(segments, accept_encoding)
+
+
+@tasks_router.get(
+    ":changes",
+    response_model=TaskChangePage,
+    responses={status.HTTP_200_OK: {"content": {changes.EVENT_STREAM_MEDIA_TYPE: {}}}},
+)
+async def list_changes(
+    broker: Annotated[ChangeBroker, Depends(changes.get_broker)],
+    cursor: Annotated[str | None, Depends(changes.get_cursor)],
+    wait: Annotated[float, Query(ge=0, le=changes.MAX_WAIT_SECONDS)] = changes.DEFAULT_WAIT_SECONDS,
+    limit: Annotated[int, Query(ge=1, le=changes.MAX_CHANGES)] = changes.MAX_CHANGES,
+    accept: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Follow the changes of tasks after a cursor, as server-sent events or with a long poll."""
+    if accept is not None and changes.EVENT_STREAM_MEDIA_TYPE in accept:
+        return changes.stream_changes(broker, cursor, settings.changes_heartbeat_seconds)
+    return await changes.poll_changes(broker, cursor, wait, limit)
 
-tasks_router = APIRouter()
 
+@tasks_router.get("/stats", response_model=TaskStats)
+async def get_stats(task_stats: Annotated[TaskStats, Depends(stats.get_stats)]) -> Response:
+    """Retrieve the number of tasks and of completed tasks."""
+    return ModelResponse(task_stats)
 
-@tasks_router.get("")  # type: ignore[no-redef]
-def list_tasks(tasks: Annotated[list[TaskRead], Depends(list_tasks)]) -> list[TaskRead]:
-    """Retrieve a list of tasks."""
-    return tasks
 
+@tasks_router.get("/search", response_model=TaskSearchPage)
+async def search_tasks(page: Annotated[TaskSearchPage, Depends(search.search_tasks)]) -> Response:
+    """Search tasks by the words of their description."""
+    return ModelResponse(page)
 
-@tasks_router.get("/{task_id}")  # type: ignore[no-redef]
-def get_task(task: Annotated[TaskRead, Depends(get_task)]) -> TaskRead:
+
+@tasks_router.get("/{task_id}", response_model=TaskRead)
+async def get_task(task: Annotated[TaskRead, Depends(_services.get_task)], response: Response) -> Response:
     """Retrieve a task by its ID."""
-    return task
+    return ModelResponse(task, headers=response.headers)
 
 
-@tasks_router.post("", status_code=status.HTTP_201_CREATED)  # type: ignore[no-redef]
-def create_task(created_task: Annotated[TaskRead, Depends(create_task)]) -> TaskRead:
+@tasks_router.post("", response_model=TaskRead, status_code=status.HTTP_201_CREATED)
+async def create_task(created_task: Annotated[TaskRead, Depends(_services.create_task)]) -> Response:
     """Create a new task."""
-    return created_task
+    return ModelResponse(created_task, status_code=status.HTTP_201_CREATED)
 
 
-@tasks_router.patch("/{task_id}")  # type: ignore[no-redef]
-def update_task(updated_task: Annotated[TaskRead, Depends(update_task)]) -> TaskRead:
+@tasks_router.patch("/{task_id}", response_model=TaskRead)
+async def update_task(updated_task: Annotated[TaskRead, Depends(_services.update_task)]) -> Response:
     """Update an existing task and return updated task."""
-    return updated_task
+    return ModelResponse(updated_task)
 
 
-@tasks_router.delete(  # type: ignore[no-redef]
-    "/{task_id}", dependencies=[Depends(delete_task)], status_code=status.HTTP_204_NO_CONTENT
+@tasks_router.delete(
+    "/{task_id}", dependencies=[Depends(_services.delete_task)], status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_task() -> None:
+async def delete_task() -> None:
     """Delete a task by the task_id."""
+
+
+@tasks_router.post(":batchGet", response_model=TaskBatchResponse)
+async def batch_get_tasks(
+    results: Annotated[TaskBatchResponse, Depends(services.batch_get_tasks)],
+) -> Response:
+    """Retrieve multiple tasks by their IDs."""
+    return ModelResponse(results)
+
+
+@tasks_router.post(":batchCreate", response_model=TaskBatchResponse)
+async def batch_create_tasks(
+    results: Annotated[TaskBatchResponse, Depends(services.batch_create_tasks)],
+) -> Response:
+    """Create multiple tasks."""
+    return ModelResponse(results)
+
+
+@tasks_router.post(":batchUpdate", response_model=TaskBatchResponse)
+async def batch_update_tasks(
+    results: Annotated[TaskBatchResponse, Depends(services.batch_update_tasks)],
+) -> Response:
+    """Update multiple tasks."""
+    return ModelResponse(results)
+
+
+@tasks_router.post(":batchDelete", response_model=TaskBatchResponse)
+async def batch_delete_tasks(
+    results: Annotated[TaskBatchResponse, Depends(services.batch_delete_tasks)],
+) -> Response:
+    """Delete multiple tasks."""
+    return ModelResponse(results)
+
+
+@tasks_router.post(
+    ":import",
+    response_model=TaskImportReport,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                export.NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def import_tasks(
+    request: Request, workers: Annotated[int, Query(ge=1, le=importer.MAX_WORKERS)] = importer.DEFAULT_WORKERS
+) -> Response:
+    """Create tasks from an NDJSON body, or a CSV body with a header row, while it is received."""
+    fmt: importer.ImportFormat = "csv" if request.headers.get("Content-Type", "").startswith("text/csv") else "ndjson"
+    return ModelResponse(await importer.import_stream(request.stream(), fmt, workers))
@@ -1,7 +1,11 @@
 import uuid
-from typing import Self
+from datetime import datetime
+from typing import Any, Literal, Self
 
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, Field, SerializerFunctionWrapHandler, model_serializer, model_validator
+
+BATCH_MAX_ITEMS = 100
+MAX_IMPORT_ERRORS = 100
 
 
 class TaskBase(BaseModel):
@@ -19,6 +23,43 @@ class TaskRead(TaskBase):
     id: uuid.UUID
 
 
+class TaskPartial(BaseModel):
+
+    """Represents the selected fields of a task, fields that were not selected are left out when serialized."""
+
+    description: str | None = None
+    is_completed: bool | None = None
+    id: uuid.UUID | None = None
+
+    @model_serializer(mode="wrap")
+    def serialize_selected(self, handler: SerializerFunctionWrapHandler) -> dict[str, Any]:
+        """Serialize the fields that were set only."""
+        return {name: value for name, value in handler(self).items() if name in self.model_fields_set}
+
+
+class TaskPage(BaseModel):
+
+    """Represents a page of tasks and the continuation token for the next page."""
+
+    items: list[TaskRead] | list[TaskPartial]
+    next_cursor: str | None = None
+
+
+class TaskSearchResult(TaskRead):
+
+    """Represents a task matching a search query and its relevance score."""
+
+    score: float
+
+
+class TaskSearchPage(BaseModel):
+
+    """Represents a page of search results, best matches first, and the continuation token for the next page."""
+
+    items: list[TaskSearchResult]
+    next_cursor: str | None = None
+
+
 class TaskCreate(TaskBase):
 
     """Define and validate the input data for Task creation operations."""
@@ -37,3 +78,133 @@ class TaskUpdate(TaskBase):
         if self.description is None and self.is_completed is None:
             raise ValueError("at least one field must be provided")
         return self
+
+
+def _ensure_unique(task_ids: list[uuid.UUID]) -> None:
+    if len(set(task_ids)) != len(task_ids):
+        raise ValueError("task ids must be unique")
+
+
+class TaskBatchGet(BaseModel):
+
+    """Define and validate the input data for batch get operations."""
+
+    ids: list[uuid.UUID] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+    @model_validator(mode="after")
+    def validate_ids(self) -> Self:
+        """Validate method is used to check the task ids are unique."""
+        _ensure_unique(self.ids)
+        return self
+
+
+class TaskBatchDelete(TaskBatchGet):
+
+    """Define and validate the input data for batch delete operations."""
+
+
+class TaskBatchCreate(BaseModel):
+
+    """Define and validate the input data for batch create operations."""
+
+    tasks: list[TaskCreate] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class TaskBatchUpdateItem(TaskUpdate):
+
+    """Define and validate a single task update of a batch update operation."""
+
+    id: uuid.UUID
+
+
+class TaskBatchUpdate(BaseModel):
+
+    """Define and validate the input data for batch update operations."""
+
+    tasks: list[TaskBatchUpdateItem] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+
+    @model_validator(mode="after")
+    def validate_ids(self) -> Self:
+        """Validate method is used to check the task ids are unique."""
+        _ensure_unique([task.id for task in self.tasks])
+        return self
+
+
+class TaskBatchResult(BaseModel):
+
+    """Represents the outcome of a single item of a batch operation.
+
+    :param status: The HTTP status code the item would have had as a single request.
+    """
+
+    id: uuid.UUID
+    status: int
+    task: TaskRead | None = None
+    error: str | None = None
+
+
+class TaskBatchResponse(BaseModel):
+
+    """Represents the per item results of a batch operation."""
+
+    results: list[TaskBatchResult]
+
+
+class TaskImportFailure(BaseModel):
+
+    """Represents a row of an import that was not imported.
+
+    :param row: The number of the row in the input, starting at 1.
+    """
+
+    row: int
+    error: str
+
+
+class TaskImportReport(BaseModel):
+
+    """Represents the outcome of an import.
+
+    :param errors: The first failed rows, up to MAX_IMPORT_ERRORS.
+    """
+
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[TaskImportFailure] = []
+    elapsed_seconds: float = 0.0
+    tasks_per_second: float = 0.0
+
+
+class TaskStats(BaseModel):
+
+    """Represents the task counters.
+
+    :param updated_at: When the counters last changed, None if they were never written.
+    """
+
+    total: int = 0
+    completed: int = 0
+    updated_at: datetime | None = None
+
+
+class TaskChange(BaseModel):
+
+    """Represents a change of a task published to the change feed.
+
+    :param version: The version of the task after the change, the deleted version for deletions.
+    :param task: The task after the change, None for deletions.
+    """
+
+    type: Literal["created", "updated", "deleted"]
+    id: uuid.UUID
+    version: int | None = None
+    task: TaskRead | None = None
+
+
+class TaskChangePage(BaseModel):
+
+    """Represents the changes following a cursor and the cursor to continue from."""
+
+    changes: list[TaskChange]
+    cursor: str
@@ -0,0 +1,394 @@
+"""Search tasks by the words of their description, and rebuild the search index.
+
+The index maps every term of the task descriptions to the tasks holding it. It is updated by the task services as
+tasks are created, updated and deleted, or with SEARCH_INDEXING=stream by a Lambda function consuming the task table
+stream, off the request path. Rebuild it from a scan of the tasks for tasks written without the services, or after
+switching to the DynamoDB search index.
+
+Usage:
+    SEARCH_BACKEND=dynamodb python -m app.tasks.search [--segments 4]
+"""
+
+import argparse
+import bisect
+import heapq
+import itertools
+import logging
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Protocol
+
+from fastapi import HTTPException, Query
+from pynamodb.attributes import JSONAttribute, NumberAttribute, UnicodeAttribute
+from pynamodb.exceptions import DoesNotExist
+from pynamodb.models import Model
+from starlette import status
+
+from ..config import Settings, settings
+from ..cursor import InvalidCursorError, decode_cursor, encode_cursor, get_cursor_secret
+from .models import Task
+from .repository import sync_task_repository
+from .schemas import TaskSearchPage, TaskSearchResult
+
+MAX_TERM_LENGTH = 64
+# shorter query terms only match whole terms, longer ones match the terms they are a prefix of
+MIN_PREFIX_LENGTH = 2
+MAX_QUERY_TERMS = 8
+MAX_QUERY_LENGTH = 256
+DEFAULT_SEGMENTS = 4
+_TERM_PATTERN = re.compile(r"\w+")
+_DOCUMENT_ENTRY = "#terms"
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text: str | None) -> dict[str, int]:
+    """Split a text into lowercase word terms, longer terms being truncated.
+
+    :param text: The text.
+    :return: The number of occurrences of each term, in order of first occurrence.
+    """
+    if not text:
+        return {}
+    return dict(Counter(term[:MAX_TERM_LENGTH] for term in _TERM_PATTERN.findall(text.casefold())))
+
+
+class Posting(NamedTuple):
+
+    """Occurrences of a term in a task.
+
+    :param occurrences: The number of occurrences of the term in the task description.
+    """
+
+    term: str
+    task_id: str
+    occurrences: int
+
+
+class SearchIndex(Protocol):
+
+    """Inverted index of the terms of the task descriptions."""
+
+    def index(self, task_id: str, terms: dict[str, int]) -> None:
+        """Replace the indexed terms of a task, an empty dict removes the task from the index."""
+
+    def postings(self, term: str, prefix: bool) -> list[Posting]:
+        """Return the occurrences of a term, or of every term starting with it if prefix is true."""
+
+
+class MemorySearchIndex:
+
+    """Process local search index, its terms kept sorted so prefix lookups only visit the matching terms."""
+
+    def __init__(self) -> None:
+        self._postings: dict[str, dict[str, int]] = {}
+        self._terms: list[str] = []
+        self._documents: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, task_id: str) -> None:
+        for term in self._documents.pop(task_id, {}):
+            postings = self._postings[term]
+            del postings[task_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def index(self, task_id: str, terms: dict[str, int]) -> None:
+        """Replace the indexed terms of a task."""
+        with self._lock:
+            self._remove(task_id)
+            for term, count in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._terms, term)
+                postings[task_id] = count
+            if terms:
+                self._documents[task_id] = dict(terms)
+
+    def postings(self, term: str, prefix: bool) -> list[Posting]:
+        """Return the occurrences of a term, or of every term starting with it."""
+        with self._lock:
+            if not prefix:
+                return [Posting(term, task_id, count) for task_id, count in self._postings.get(term, {}).items()]
+
+            matches: list[Posting] = []
+            idx = bisect.bisect_left(self._terms, term)
+            while idx < len(self._terms) and self._terms[idx].startswith(term):
+                matched = self._terms[idx]
+                matches.extend(Posting(matched, task_id, count) for task_id, count in self._postings[matched].items())
+                idx += 1
+            return matches
+
+
+class TaskSearchTerm(Model):
+
+    """Search index DynamoDB model, an item per term of every task and an item per task listing its terms.
+
+    Term items are partitioned by the first characters of the term and sorted by term then task, so the tasks of a
+    term, or of every term starting with a prefix, are read with a single query.
+    """
+
+    class Meta:
+
+        """Search index model configuration."""
+
+        host = settings.db_host
+        table_name = settings.db_search_table or f"{settings.db_tasks_table}-search"
+
+    shard = UnicodeAttribute(hash_key=True)
+    entry = UnicodeAttribute(range_key=True)
+    # named count in the table, which would shadow Model.count
+    occurrences = NumberAttribute(default=0, attr_name="count")
+    terms = JSONAttribute(null=True)
+
+
+def _term_item(term: str, task_id: str, count: int = 0) -> TaskSearchTerm:
+    return TaskSearchTerm(term[:MIN_PREFIX_LENGTH], f"{term}#{task_id}", occurrences=count)
+
+
+class DynamoDBSearchIndex:
+
+    """Search index stored in the search table, shared by every instance of the API.
+
+    Indexing a task reads its indexed terms then writes the differences, which is not atomic: concurrent updates of
+    the same task may leave stale terms. The task table stream consumer applies the changes of a task one at a time.
+    """
+
+    def index(self, task_id: str, terms: dict[str, int]) -> None:
+        """Replace the indexed terms of a task, only writing the term items which changed."""
+        document = TaskSearchTerm(f"#{task_id}", _DOCUMENT_ENTRY, terms=terms)
+        try:
+            indexed = TaskSearchTerm.get(document.shard, document.entry).terms or {}
+        except DoesNotExist:
+            indexed = {}
+        if indexed == terms:
+            return
+
+        with TaskSearchTerm.batch_write() as batch:
+            for term in indexed.keys() - terms.keys():
+                batch.delete(_term_item(term, task_id))
+            for term, count in terms.items():
+                if indexed.get(term) != count:
+                    batch.save(_term_item(term, task_id, count))
+            if terms:
+                batch.save(document)
+            else:
+                batch.delete(document)
+
+    def postings(self, term: str, prefix: bool) -> list[Posting]:
+        """Return the occurrences of a term, or of every term starting with it, with a query of the term partition."""
+        condition = TaskSearchTerm.entry.startswith(term if prefix else f"{term}#")
+        postings = []
+        for item in TaskSearchTerm.query(term[:MIN_PREFIX_LENGTH], condition):
+            matched, _, task_id = item.entry.rpartition("#")
+            postings.append(Posting(matched, task_id, int(item.occurrences)))
+        return postings
+
+
+def create_search_index(config: Settings) -> SearchIndex | None:
+    """Create the search index selected by the settings.
+
+    :param config: The project settings.
+    :return: The search index, None if search is disabled.
+    """
+    if config.search_backend == "memory":
+        return MemorySearchIndex()
+    if config.search_backend == "dynamodb":
+        return DynamoDBSearchIndex()
+    return None
+
+
+class TaskSearch:
+
+    """Keep the search index up to date with the tasks and rank the tasks matching a query.
+
+    Every term of the query must match a term of the task description. A term matched as a whole counts its
+    occurrences, a term matched by prefix counts them weighted by the share of the term the prefix covers, and the
+    score of a task is the sum over the query terms.
+
+    :param index: The search index, None if search is disabled and tasks are not indexed.
+    :param inline: Whether the task services index the tasks they write, rather than the task table stream consumer.
+    """
+
+    def __init__(self, index: SearchIndex | None, inline: bool = True):
+        self.index = index
+        self.inline = inline
+
+    def index_task(self, task_id: str, description: str | None) -> None:
+        """Replace the indexed terms of a task, a description of None removes the task from the index."""
+        if self.index is not None:
+            self.index.index(task_id, tokenize(description))
+
+    def _index_written(self, task_id: str, description: str | None) -> None:
+        if not self.inline:
+            return
+        # the task is written already, a failed index update is repaired by a rebuild rather than failing the request
+        try:
+            self.index_task(task_id, description)
+        except Exception:
+            logger.exception("failed to index task %s", task_id)
+
+    def add(self, task: Task) -> None:
+        """Index a task created or updated by the services."""
+        self._index_written(task.id, task.description)
+
+    def remove(self, task: Task) -> None:
+        """Remove a task deleted by the services from the index."""
+        self._index_written(task.id, None)
+
+    def rank(
+        self, query: str, after: tuple[float, str] | None = None, limit: int | None = None
+    ) -> list[tuple[str, float]]:
+        """Return the IDs of the tasks matching a query with their score, by decreasing score then ID.
+
+        The index is read once per query term, so ranking costs the number of occurrences of the terms matched,
+        whatever the number of tasks. Only the requested tasks are sorted, a page costs the matches plus its size.
+
+        :param query: The words to search for.
+        :param after: Score and ID of the last task of the previous page, only the tasks ranked after it are returned.
+        :param limit: Maximum number of tasks to return, all of them if None.
+        """
+        if self.index is None:
+            return []
+
+        scores: dict[str, float] | None = None
+        for term in list(tokenize(query))[:MAX_QUERY_TERMS]:
+            term_scores: dict[str, float] = defaultdict(float)
+            for posting in self.index.postings(term, len(term) >= MIN_PREFIX_LENGTH):
+                term_scores[posting.task_id] += posting.occurrences * len(term) / len(posting.term)
+            if scores is not None:
+                term_scores = {
+                    task_id: score + term_scores[task_id] for task_id, score in scores.items() if task_id in term_scores
+                }
+            if not term_scores:
+                return []
+            scores = term_scores
+
+        ranked: Iterable[tuple[str, float]] = (scores or {}).items()
+        if after is not None:
+            last = (-after[0], after[1])
+            ranked = [item for item in ranked if _rank_key(item) > last]
+        if limit is None:
+            return sorted(ranked, key=_rank_key)
+        return heapq.nsmallest(limit, ranked, key=_rank_key)
+
+
+def _rank_key(item: tuple[str, float]) -> tuple[float, str]:
+    # by decreasing score then ID
+    return -item[1], item[0]
+
+
+task_search = TaskSearch(create_search_index(settings), inline=settings.search_indexing == "inline")
+
+
+def _decode_search_cursor(cursor: str | None, secret: bytes) -> tuple[float, str] | None:
+    if cursor is None:
+        return None
+    try:
+        key = decode_cursor(cursor, secret)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor") from exc
+    if set(key) != {"score", "id"} or not isinstance(key["score"], int | float) or not isinstance(key["id"], str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid cursor")
+    return key["score"], key["id"]
+
+
+def search_tasks(
+    q: str = Query(min_length=1, max_length=MAX_QUERY_LENGTH),
+    cursor: str | None = None,
+    limit: int = Query(default=20, ge=1, le=100),
+) -> TaskSearchPage:
+    """Search tasks by the words of their description, best matches first.
+
+    Query terms of at least two characters also match the terms they are a prefix of. Tasks deleted since they were
+    indexed are left out, so pages may hold fewer tasks than the limit while there are more to list.
+
+    :param q: The words to search for
+    :param cursor: Continuation token returned by the previous page (optional)
+    :param limit: Maximum number of tasks to return (default: 20, min: 1, max: 100)
+    :return: TaskSearchPage holding the matching tasks and the continuation token for the next page
+    :raises HTTPException: If search is disabled, the query has no terms or the cursor is invalid
+    """
+    if task_search.index is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="search is disabled")
+    if not tokenize(q):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="query has no terms")
+
+    secret = get_cursor_secret()
+    ranked = task_search.rank(q, _decode_search_cursor(cursor, secret), limit + 1)
+    page, more = ranked[:limit], len(ranked) > limit
+
+    found, _ = sync_task_repository.batch_get([task_id for task_id, _ in page]) if page else ({}, set())
+    items = [
+        TaskSearchResult(**found[task_id].attribute_values, score=score) for task_id, score in page if task_id in found
+    ]
+    next_cursor = encode_cursor({"score": page[-1][1], "id": page[-1][0]}, secret) if more else None
+    return TaskSearchPage(items=items, next_cursor=next_cursor)
+
+
+def _index_segment(segment: int, total_segments: int) -> int:
+    indexed = 0
+    for task in sync_task_repository.scan(segment, total_segments, [Task.id.attr_name, Task.description.attr_name]):
+        task_search.index_task(task.id, task.description)
+        indexed += 1
+    return indexed
+
+
+def rebuild_index(segments: int = DEFAULT_SEGMENTS) -> int:
+    """Index every task with a parallel scan of the task repository.
+
+    Tasks missing from the repository are not removed from the index, searches leave them out. Tasks updated while
+    the table is scanned may keep stale terms in the DynamoDB index, rebuild while writes are quiet.
+
+    :param segments: Number of table segments scanned in parallel.
+    :return: The number of indexed tasks.
+    """
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        return sum(executor.map(_index_segment, range(segments), itertools.repeat(segments)))
+
+
+def _description(image: dict[str, Any] | None) -> str | None:
+    description = image.get(Task.description.attr_name, {}).get("S") if image is not None else None
+    return str(description) if description is not None else None
+
+
+def apply_stream_records(records: Iterable[dict[str, Any]]) -> None:
+    """Index the tasks changed by DynamoDB stream records of the task table, in the order of the records.
+
+    :param records: The stream records, with both the old and the new image of the items.
+    """
+    for record in records:
+        change = record.get("dynamodb", {})
+        old_image, new_image = change.get("OldImage"), change.get("NewImage")
+        if old_image is not None and new_image is not None and _description(old_image) == _description(new_image):
+            continue
+        task_search.index_task(change["Keys"][Task.id.attr_name]["S"], _description(new_image))
+
+
+def handler(event: dict[str, Any], _context: Any) -> None:
+    """Apply a batch of task table stream records to the search index.
+
+    The records of a task are applied one at a time and in order, and indexing a task again is idempotent, so a
+    batch retried after a failed invocation leaves the index up to date.
+    """
+    apply_stream_records(event.get("Records", []))
+
+
+def main() -> int:
+    """Rebuild the search index from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS, help="table segments scanned in parallel")
+    args = parser.parse_args()
+
+    print(f"indexed {rebuild_index(args.segments)} tasks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
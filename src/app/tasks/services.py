@@ -1,16 +1,62 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import Annotated, Any
 from uuid import UUID, uuid4
 
-from fastapi import Depends, HTTPException, Query
-from pynamodb.exceptions import DoesNotExist
+from fastapi import Depends, Header, HTTPException, Query, Response
+from pynamodb.exceptions import DeleteError, DoesNotExist, UpdateError
 from starlette import status
 
+from ..coalesce import WriteCoalescer
+from ..config import settings
+from ..cursor import get_cursor_secret
+from ..singleflight import SingleFlight
+from .cache import task_cache
+from .changes import task_changes
+from .common import (
+    check_etag,
+    condition_failure_error,
+    decode_list_cursor,
+    is_condition_failure,
+    page_etag,
+    parse_fields,
+    parse_if_match,
+    record_coalesced_read,
+    record_coalesced_write,
+    task_etag,
+    task_items,
+    task_page,
+    update_changes,
+)
 from .models import Task
-from .schemas import TaskCreate, TaskRead, TaskUpdate
+from .repository import sync_task_repository
+from .schemas import (
+    TaskBatchCreate,
+    TaskBatchDelete,
+    TaskBatchGet,
+    TaskBatchResponse,
+    TaskBatchResult,
+    TaskBatchUpdate,
+    TaskBatchUpdateItem,
+    TaskCreate,
+    TaskPage,
+    TaskRead,
+    TaskUpdate,
+)
+from .search import task_search
+
+# conditional writes of a batch update in flight at once
+_BATCH_UPDATE_WORKERS = 10
+
+task_get_flight: SingleFlight[Task] = SingleFlight()
+task_update_coalescer: WriteCoalescer[Task] = WriteCoalescer(settings.write_coalescing_window_seconds)
 
 
 def get_task_by_id(task_id: UUID) -> Task:
-    """Retrieve a task by its ID.
+    """Retrieve a task by its ID, reading through the task cache.
+
+    Concurrent cache misses for the same task share one GetItem call, and the same Task object, which must not be
+    modified.
 
     :param task_id: The ID of the task.
     :type task_id: UUID
@@ -19,31 +65,86 @@ def get_task_by_id(task_id: UUID) -> Task:
     :raises HTTPException: If the task does not exist.
     :raises Exception: If there is an error retrieving the task.
     """
+    task = task_cache.get(str(task_id))
+    if task is not None:
+        return task
+
     try:
-        return Task.get(str(task_id))
+        task, shared = task_get_flight.do(str(task_id), lambda: sync_task_repository.get(str(task_id)))
     except DoesNotExist as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="task not found") from exc
 
+    if shared:
+        record_coalesced_read()
+    else:
+        task_cache.put(task)
+    return task
 
-def list_tasks(after_id: UUID | None = None, limit: int = Query(default=50, ge=1, le=100)) -> list[TaskRead]:
-    """List tasks.
 
-    :param after_id: UUID of the task to start listing from (optional)
+def list_tasks(
+    cursor: str | None = None,
+    limit: int = Query(default=50, ge=1, le=100),
+    is_completed: bool | None = None,
+    fields: str | None = None,
+) -> TaskPage:
+    """List tasks in creation order.
+
+    Incomplete tasks are read from the sparse open tasks index, completed tasks are filtered from the created_at
+    index, so their pages may hold fewer tasks than the limit while there are more to list. Selected fields are
+    projected by the repository, the other attributes are neither read nor returned.
+
+    :param cursor: Continuation token returned by the previous page (optional)
     :param limit: Maximum number of tasks to list (default: 50, min: 1, max: 100)
-    :return: List of TaskRead objects representing the tasks
-    :raises HTTPException: If the provided after_id is invalid
+    :param is_completed: Only list tasks with this completion status (optional)
+    :param fields: Comma separated task fields to return, e.g. id,is_completed (optional, default: all fields)
+    :return: TaskPage holding the tasks and the continuation token for the next page
+    :raises HTTPException: If the provided cursor or fields are invalid
     """
-    scan_opt: dict[str, Any] = {"limit": limit}
-    if after_id is not None:
-        try:
-            scan_opt["last_evaluated_key"] = {"id": {"S": get_task_by_id(after_id).id}}
-        except HTTPException as exc:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid task id") from exc
+    selected = parse_fields(fields)
+    secret = get_cursor_secret()
+    tasks, last_evaluated_key = sync_task_repository.query(
+        limit, decode_list_cursor(cursor, secret, is_completed), is_completed, selected
+    )
+    return task_page(task_items(tasks, selected), last_evaluated_key, secret)
+
 
-    return [TaskRead(**task.attribute_values) for task in Task.scan(**scan_opt)]
+def revalidate_task(
+    task: Annotated[Task, Depends(get_task_by_id)],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Task:
+    """Set the ETag of a task on the response, or answer with 304 if the client already has the current version.
+
+    The task is read through the task cache, so a cached task is revalidated without calling DynamoDB.
+
+    :param task: The requested task.
+    :param response: The response to set the ETag header on.
+    :param if_none_match: The ETags the client has cached (optional).
+    :return: The requested task.
+    :raises HTTPException: With status 304 if one of the ETags matches the task.
+    """
+    check_etag(task_etag(task), if_none_match, response)
+    return task
+
+
+def revalidate_page(
+    page: Annotated[TaskPage, Depends(list_tasks)],
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> TaskPage:
+    """Set the ETag of a page of tasks on the response, or answer with 304 if the client already has the same page.
+
+    :param page: The requested page of tasks.
+    :param response: The response to set the ETag header on.
+    :param if_none_match: The ETags the client has cached (optional).
+    :return: The requested page of tasks.
+    :raises HTTPException: With status 304 if one of the ETags matches the page.
+    """
+    check_etag(page_etag(page), if_none_match, response)
+    return page
 
 
-def get_task(task: Annotated[Task, Depends(get_task_by_id)]) -> TaskRead:
+def get_task(task: Annotated[Task, Depends(revalidate_task)]) -> TaskRead:
     """Retrieve single task by task id.
 
     :param task: The task object to retrieve.
@@ -63,32 +164,201 @@ def create_task(task: TaskCreate) -> TaskRead:
         description=task.description,
         is_completed=task.is_completed,
     )
-    db_task.save()
+    sync_task_repository.save(db_task)
+    task_cache.put(db_task)
+    task_changes.publish("created", db_task)
+    task_search.add(db_task)
     return TaskRead(**db_task.attribute_values)
 
 
-def update_task(current_task: Annotated[Task, Depends(get_task_by_id)], task: TaskUpdate) -> TaskRead:
-    """Update a task with the provided information.
+def _update(task_id: str, changes: dict[str, Any], version: int | None) -> tuple[Task, bool]:
+    """Update a task, merging unconditional updates into those of concurrent requests when write coalescing is on.
 
-    :param current_task: The current task to be updated.
-    :type current_task: Task
+    :return: The updated task and whether it was written by a concurrent request.
+    """
+    if version is not None or task_update_coalescer.window_seconds <= 0:
+        return sync_task_repository.update(task_id, changes, version), False
+
+    updated_task, shared, delay = task_update_coalescer.submit(
+        task_id, changes, lambda merged: sync_task_repository.update(task_id, merged)
+    )
+    record_coalesced_write(delay, shared)
+    return updated_task, shared
+
+
+def update_task(task_id: UUID, task: TaskUpdate, if_match: Annotated[str | None, Header()] = None) -> TaskRead:
+    """Update the provided fields of a task in a single conditional write.
+
+    Without If-Match, and with write coalescing on, the update may be merged with the updates of the same task made by
+    concurrent requests, all of them getting the task as written by the merged update.
+
+    :param task_id: The ID of the task.
     :param task: The updated task.
-    :type task: TaskUpdate
+    :param if_match: The task version the update is based on (optional).
     :return: The updated task.
-    :rtype: TaskRead
+    :raises HTTPException: If the task does not exist or its version does not match.
     """
-    if task.description is not None:
-        current_task.description = task.description
-    if task.is_completed is not None:
-        current_task.is_completed = task.is_completed
-    current_task.save()
-    return TaskRead(**current_task.attribute_values)
+    version = parse_if_match(if_match)
+    try:
+        updated_task, shared = _update(str(task_id), update_changes(str(task_id), task), version)
+    except UpdateError as exc:
+        task_cache.invalidate(str(task_id))
+        if not is_condition_failure(exc):
+            raise
+        # a version mismatch and a missing task fail the same condition, only the former needs the extra read
+        raise condition_failure_error(version is not None and sync_task_repository.exists(str(task_id))) from exc
+
+    if not shared:
+        task_cache.put(updated_task)
+        task_changes.publish("updated", updated_task)
+        task_search.add(updated_task)
+    return TaskRead(**updated_task.attribute_values)
 
 
-def delete_task(current_task: Annotated[Task, Depends(get_task_by_id)]) -> None:
-    """Delete a task.
+def delete_task(task_id: UUID, if_match: Annotated[str | None, Header()] = None) -> None:
+    """Delete a task in a single conditional write.
 
-    :param current_task: The task to be deleted.
+    :param task_id: The ID of the task.
+    :param if_match: The task version the deletion is based on (optional).
     :return: None
+    :raises HTTPException: If the task does not exist or its version does not match.
     """
-    current_task.delete()
+    version = parse_if_match(if_match)
+    try:
+        deleted_task = sync_task_repository.delete(str(task_id), version)
+    except DeleteError as exc:
+        task_cache.invalidate(str(task_id))
+        if not is_condition_failure(exc):
+            raise
+        raise condition_failure_error(version is not None and sync_task_repository.exists(str(task_id))) from exc
+
+    task_cache.remove(deleted_task)
+    task_changes.publish("deleted", deleted_task)
+    task_search.remove(deleted_task)
+
+
+def _unavailable_result(task_id: UUID) -> TaskBatchResult:
+    return TaskBatchResult(
+        id=task_id, status=status.HTTP_503_SERVICE_UNAVAILABLE, error="task not processed, please retry"
+    )
+
+
+def _missing_result(task_id: UUID, unprocessed: set[str]) -> TaskBatchResult:
+    if str(task_id) in unprocessed:
+        return _unavailable_result(task_id)
+    return TaskBatchResult(id=task_id, status=status.HTTP_404_NOT_FOUND, error="task not found")
+
+
+def batch_get_tasks(request: TaskBatchGet) -> TaskBatchResponse:
+    """Retrieve multiple tasks by their IDs.
+
+    :param request: The IDs of the tasks to retrieve.
+    :return: The result of each requested task, in request order.
+    """
+    found, unprocessed = sync_task_repository.batch_get([str(task_id) for task_id in request.ids])
+    results = []
+    for task_id in request.ids:
+        task = found.get(str(task_id))
+        if task is None:
+            results.append(_missing_result(task_id, unprocessed))
+            continue
+        task_cache.put(task)
+        results.append(TaskBatchResult(id=task_id, status=status.HTTP_200_OK, task=TaskRead(**task.attribute_values)))
+    return TaskBatchResponse(results=results)
+
+
+def batch_create_tasks(request: TaskBatchCreate) -> TaskBatchResponse:
+    """Create multiple tasks.
+
+    :param request: The tasks to create.
+    :return: The result of each created task, in request order.
+    """
+    # batch writes bypass Model.save, so the initial version is set here
+    db_tasks = [
+        Task(id=str(uuid4()), description=task.description, is_completed=task.is_completed, version=1)
+        for task in request.tasks
+    ]
+    unprocessed = sync_task_repository.batch_write(put_tasks=db_tasks)
+
+    results = []
+    for db_task in db_tasks:
+        if db_task.id in unprocessed:
+            results.append(_unavailable_result(UUID(db_task.id)))
+            continue
+        task_cache.put(db_task)
+        task_changes.publish("created", db_task)
+        task_search.add(db_task)
+        results.append(
+            TaskBatchResult(
+                id=UUID(db_task.id), status=status.HTTP_201_CREATED, task=TaskRead(**db_task.attribute_values)
+            )
+        )
+    return TaskBatchResponse(results=results)
+
+
+def _batch_update_task(current_task: Task, task: TaskBatchUpdateItem) -> TaskBatchResult:
+    """Update a task of a batch in a write conditional on the version read by the batch."""
+    try:
+        updated_task = sync_task_repository.update(
+            current_task.id, update_changes(current_task.id, task), current_task.version
+        )
+    except UpdateError as exc:
+        task_cache.invalidate(current_task.id)
+        if not is_condition_failure(exc):
+            return _unavailable_result(task.id)
+        error = condition_failure_error(sync_task_repository.exists(current_task.id))
+        return TaskBatchResult(id=task.id, status=error.status_code, error=error.detail)
+
+    task_cache.put(updated_task)
+    task_changes.publish("updated", updated_task)
+    task_search.add(updated_task)
+    return TaskBatchResult(id=task.id, status=status.HTTP_200_OK, task=TaskRead(**updated_task.attribute_values))
+
+
+def batch_update_tasks(request: TaskBatchUpdate) -> TaskBatchResponse:
+    """Update multiple tasks.
+
+    Each task is updated in its own write, conditional on the version read at the start of the batch, so a task
+    changed concurrently is reported with status 409 instead of being overwritten. The writes run concurrently, each
+    in a copy of the request context.
+
+    :param request: The updates to apply.
+    :return: The result of each updated task, in request order.
+    """
+    found, unprocessed = sync_task_repository.batch_get([str(task.id) for task in request.tasks])
+    updates = [(found[str(task.id)], task) for task in request.tasks if str(task.id) in found]
+
+    updated: dict[UUID, TaskBatchResult] = {}
+    if updates:
+        with ThreadPoolExecutor(max_workers=min(len(updates), _BATCH_UPDATE_WORKERS)) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, _batch_update_task, current_task, task)
+                for current_task, task in updates
+            ]
+            updated = {result.id: result for result in (future.result() for future in futures)}
+
+    return TaskBatchResponse(
+        results=[updated.get(task.id) or _missing_result(task.id, unprocessed) for task in request.tasks]
+    )
+
+
+def batch_delete_tasks(request: TaskBatchDelete) -> TaskBatchResponse:
+    """Delete multiple tasks.
+
+    :param request: The IDs of the tasks to delete.
+    :return: The result of each deleted task, in request order.
+    """
+    found, unprocessed = sync_task_repository.batch_get([str(task_id) for task_id in request.ids])
+    unprocessed |= sync_task_repository.batch_write(delete_tasks=list(found.values()))
+
+    results = []
+    for task_id in request.ids:
+        current_task = found.get(str(task_id))
+        if current_task is None or current_task.id in unprocessed:
+            results.append(_missing_result(task_id, unprocessed))
+            continue
+        task_cache.remove(current_task)
+        task_changes.publish("deleted", current_task)
+        task_search.remove(current_task)
+        results.append(TaskBatchResult(id=task_id, status=status.HTTP_204_NO_CONTENT))
+    return TaskBatchResponse(results=results)
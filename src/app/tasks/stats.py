@@ -0,0 +1,144 @@
+"""Recount the tasks and repair the task counters.
+
+The counters served by GET /tasks/stats are kept up to date by a consumer of the task table stream, the handler of this
+module. Rebuild them from a scan of the table after they drifted, or on tables written without the consumer.
+
+Usage:
+    python -m app.tasks.stats [--segments 4]
+"""
+
+import argparse
+import itertools
+import sys
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from typing import Any
+
+from pynamodb.attributes import NumberAttribute, UnicodeAttribute, UTCDateTimeAttribute
+from pynamodb.exceptions import DoesNotExist
+from pynamodb.models import Model
+
+from ..config import settings
+from .models import Task
+from .repository import sync_task_repository
+from .schemas import TaskStats
+
+TASKS_COUNTER = "tasks"
+DEFAULT_SEGMENTS = 4
+
+
+class TaskCounter(Model):
+
+    """Task counters DynamoDB model, kept in their own table so the counter writes do not feed the task table stream."""
+
+    class Meta:
+
+        """Task counter model configuration."""
+
+        host = settings.db_host
+        table_name = settings.db_stats_table or f"{settings.db_tasks_table}-stats"
+
+    name = UnicodeAttribute(hash_key=True)
+    total = NumberAttribute(default=0)
+    completed = NumberAttribute(default=0)
+    updated_at = UTCDateTimeAttribute(null=True)
+
+
+def get_stats() -> TaskStats:
+    """Return the task counters, read with a single GetItem whatever the number of tasks.
+
+    :return: The task counters, zero if they were never written.
+    """
+    try:
+        counter = TaskCounter.get(TASKS_COUNTER)
+    except DoesNotExist:
+        return TaskStats()
+    return TaskStats(total=int(counter.total), completed=int(counter.completed), updated_at=counter.updated_at)
+
+
+def _is_completed(image: dict[str, Any] | None) -> bool:
+    return image is not None and bool(image.get(Task.is_completed.attr_name, {}).get("BOOL", False))
+
+
+def stream_deltas(records: Iterable[dict[str, Any]]) -> tuple[int, int]:
+    """Sum the changes of the task counters made by DynamoDB stream records of the task table.
+
+    :param records: The stream records, with both the old and the new image of the items.
+    :return: The change of the total and completed counters.
+    """
+    total = completed = 0
+    for record in records:
+        change = record.get("dynamodb", {})
+        old_image, new_image = change.get("OldImage"), change.get("NewImage")
+        total += (new_image is not None) - (old_image is not None)
+        completed += _is_completed(new_image) - _is_completed(old_image)
+    return total, completed
+
+
+def apply_stream_records(records: Iterable[dict[str, Any]]) -> None:
+    """Add the changes made by DynamoDB stream records of the task table to the task counters.
+
+    :param records: The stream records, with both the old and the new image of the items.
+    """
+    total, completed = stream_deltas(records)
+    if not total and not completed:
+        return
+    TaskCounter(TASKS_COUNTER).update(
+        actions=[
+            TaskCounter.total.add(total),
+            TaskCounter.completed.add(completed),
+            TaskCounter.updated_at.set(datetime.now(UTC)),
+        ]
+    )
+
+
+def handler(event: dict[str, Any], _context: Any) -> None:
+    """Apply a batch of task table stream records to the task counters.
+
+    The changes of the whole batch are added with a single UpdateItem, so a batch retried after a failed invocation
+    is not counted twice.
+    """
+    apply_stream_records(event.get("Records", []))
+
+
+def _count_segment(segment: int, total_segments: int) -> tuple[int, int]:
+    total = completed = 0
+    for task in sync_task_repository.scan(segment, total_segments, [Task.is_completed.attr_name]):
+        total += 1
+        completed += task.is_completed
+    return total, completed
+
+
+def rebuild_stats(segments: int = DEFAULT_SEGMENTS) -> TaskStats:
+    """Recount the tasks with a parallel scan of the task repository and overwrite the task counters.
+
+    Tasks changed while the table is scanned may be counted twice or not at all, rebuild while writes are quiet.
+
+    :param segments: Number of table segments scanned in parallel.
+    :return: The rebuilt task counters.
+    """
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        counts = list(executor.map(_count_segment, range(segments), itertools.repeat(segments)))
+
+    task_stats = TaskStats(
+        total=sum(total for total, _ in counts),
+        completed=sum(completed for _, completed in counts),
+        updated_at=datetime.now(UTC),
+    )
+    TaskCounter(TASKS_COUNTER, **task_stats.model_dump()).save()
+    return task_stats
+
+
+def main() -> int:
+    """Rebuild the task counters from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0] if __doc__ else None)
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS, help="table segments scanned in parallel")
+    args = parser.parse_args()
+
+    print(rebuild_stats(args.segments).model_dump_json(indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
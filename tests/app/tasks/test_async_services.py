@@ -0,0 +1,174 @@
+import uuid
+
+import boto3
+import pytest
+from fastapi import HTTPException
+from moto.server import ThreadedMotoServer
+from src.app.tasks import async_services
+from src.app.tasks.async_services import create_task, delete_task, get_task, get_task_by_id, list_tasks, update_task
+from src.app.tasks.models import Task
+from src.app.tasks.repository import AsyncTaskRepository
+from src.app.tasks.schemas import TaskCreate, TaskPartial, TaskRead, TaskUpdate
+
+_tasks = [
+    Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+    Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
+    Task(id="130f7f01-4e9a-468c-8daf-bdb6143331f7", description="description_3", is_completed=False),
+]
+
+
+@pytest.fixture(scope="module")
+def moto_server():
+    """Start a moto server the async DynamoDB client can connect to."""
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+@pytest.fixture
+async def setup_test_data(moto_server, monkeypatch):
+    """Create a test table with test data on the moto server and point the async repository to it."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(Task.Meta, "host", moto_server)
+
+    client = boto3.client("dynamodb", endpoint_url=moto_server, region_name=Task.Meta.region)
+    client.create_table(
+        TableName=Task.Meta.table_name,
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "bucket", "AttributeType": "S"},
+            {"AttributeName": "created_at", "AttributeType": "S"},
+            {"AttributeName": "open_bucket", "AttributeType": "S"},
+        ],
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "created_at_index",
+                "KeySchema": [
+                    {"AttributeName": "bucket", "KeyType": "HASH"},
+                    {"AttributeName": "created_at", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "open_index",
+                "KeySchema": [
+                    {"AttributeName": "open_bucket", "KeyType": "HASH"},
+                    {"AttributeName": "created_at", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    repository = AsyncTaskRepository(max_pool_connections=2)
+    monkeypatch.setattr(async_services, "task_repository", repository)
+    for task in _tasks:
+        await repository.save(Task.from_raw_data(task.serialize()))
+
+    yield
+    await repository.close()
+    client.delete_table(TableName=Task.Meta.table_name)
+
+
+@pytest.mark.anyio
+async def test_get_task_by_id(setup_test_data):
+    """Test get_task_by_id function."""
+    task = await get_task_by_id(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"))
+    assert await get_task(task) == TaskRead(
+        id=uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"), description="description_2", is_completed=True
+    )
+    assert task.version == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_task_by_id(uuid.UUID("45c2ec2f-2b6c-4c6b-8d53-f0c9c6f6ac3e"))
+    assert str(exc_info.value) == "404: task not found"
+
+
+@pytest.mark.anyio
+async def test_list_tasks(setup_test_data):
+    """Test list_tasks paginates with the continuation token."""
+    page = await list_tasks(None, 2)
+    assert [task.description for task in page.items] == ["description_1", "description_2"]
+
+    page = await list_tasks(page.next_cursor, 2)
+    assert [task.description for task in page.items] == ["description_3"]
+
+    with pytest.raises(HTTPException) as exc_info:
+        await list_tasks("invalid.cursor", 2)
+    assert str(exc_info.value) == "400: invalid cursor"
+
+
+@pytest.mark.anyio
+async def test_list_tasks_filters(setup_test_data):
+    """Test list_tasks filters by completion status, projects the selected fields and follows status updates."""
+    page = await list_tasks(None, 10, False, "description")
+    assert page.items == [TaskPartial(description="description_1"), TaskPartial(description="description_3")]
+    assert page.model_dump() == {
+        "items": [{"description": "description_1"}, {"description": "description_3"}],
+        "next_cursor": None,
+    }
+
+    await update_task(uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"), TaskUpdate(is_completed=True))
+
+    page = await list_tasks(None, 10, False)
+    assert [task.description for task in page.items] == ["description_3"]
+    page = await list_tasks(None, 10, True)
+    assert [task.description for task in page.items] == ["description_1", "description_2"]
+
+
+@pytest.mark.anyio
+async def test_create_task(setup_test_data):
+    """Test create_task function."""
+    created_task = await create_task(TaskCreate(description="description_4", is_completed=True))
+
+    assert created_task.description == "description_4"
+    assert created_task.is_completed
+    assert created_task == await get_task(await get_task_by_id(created_task.id))
+
+
+@pytest.mark.anyio
+async def test_update_task(setup_test_data):
+    """Test update_task only changes the provided fields and checks the If-Match version."""
+    task_id = uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894")
+
+    updated_task = await update_task(task_id, TaskUpdate(is_completed=False), if_match='"1"')
+
+    assert updated_task == TaskRead(id=task_id, description="description_2", is_completed=False)
+    assert (await get_task_by_id(task_id)).version == 2  # noqa: PLR2004
+
+    with pytest.raises(HTTPException) as exc_info:
+        await update_task(task_id, TaskUpdate(is_completed=True), if_match='"1"')
+    assert str(exc_info.value) == "409: task version does not match"
+
+    with pytest.raises(HTTPException) as exc_info:
+        await update_task(uuid.uuid4(), TaskUpdate(is_completed=True))
+    assert str(exc_info.value) == "404: task not found"
+
+
+@pytest.mark.anyio
+async def test_delete_task(setup_test_data):
+    """Test delete_task function."""
+    task_id = uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await delete_task(task_id, if_match='"2"')
+    assert str(exc_info.value) == "409: task version does not match"
+
+    await delete_task(task_id, if_match='"1"')
+
+    assert [task.description for task in (await list_tasks(None, 10)).items] == ["description_1", "description_3"]
+
+    with pytest.raises(HTTPException) as exc_info:
+        await delete_task(task_id)
+    assert str(exc_info.value) == "404: task not found"
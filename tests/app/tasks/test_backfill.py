@@ -0,0 +1,53 @@
+import sys
+
+import pytest
+from moto import mock_aws
+from src.app.tasks.backfill import BackfillResult, backfill_tasks, is_stale, main
+from src.app.tasks.models import TASKS_BUCKET, TASKS_BUCKET_SHARDS, Task
+
+from .test_router import setup_test_client
+
+LEGACY_IDS = [
+    "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4",
+    "edd63ebf-fbc2-4691-bc0c-70a7f78cf894",
+    "130f7f01-4e9a-468c-8daf-bdb6143331f7",
+]
+RESHARDED_ID = "45c2ec2f-2b6c-4c6b-8d53-f0c9c6f6ac3e"
+CURRENT_ID = "9b1f4c1e-5b9a-4e37-8f0a-0f4a1cde2a11"
+
+
+@pytest.fixture
+def setup_test_data():
+    """Create a task table holding tasks written before and after the index keys were added."""
+    with mock_aws():
+        Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        connection = Task._get_connection()
+        # written before the buckets existed
+        for task_id in LEGACY_IDS:
+            attributes = {"description": {"S": "legacy"}, "is_completed": {"BOOL": False}, "version": {"N": "1"}}
+            connection.put_item(task_id, attributes=attributes)
+        # written with more buckets
+        Task(id=RESHARDED_ID, description="resharded").save()
+        wrong_bucket = f"{TASKS_BUCKET}#{TASKS_BUCKET_SHARDS}"
+        connection.update_item(RESHARDED_ID, actions=[Task.bucket.set(wrong_bucket), Task.open_bucket.set(wrong_bucket)])
+        Task(id=CURRENT_ID, description="current").save()
+        yield
+
+
+def test_backfill_tasks(setup_test_data, monkeypatch, capsys):
+    """Test tasks with missing or stale index keys are written again and listed, the others are left untouched."""
+    client = setup_test_client()
+    assert [task["id"] for task in client.get("/tasks").json()["items"]] == [CURRENT_ID]
+
+    assert backfill_tasks(segments=2) == BackfillResult(scanned=5, written=4, conflicts=0)
+    assert not any(is_stale(task) for task in Task.scan())
+    assert Task.get(CURRENT_ID).version == 1
+    assert Task.get(LEGACY_IDS[0]).version == 2  # noqa: PLR2004
+
+    listed = {task["id"] for task in client.get("/tasks").json()["items"]}
+    assert listed == {CURRENT_ID, RESHARDED_ID, *LEGACY_IDS}
+    assert {task["id"] for task in client.get("/tasks", params={"is_completed": False}).json()["items"]} == listed
+
+    monkeypatch.setattr(sys, "argv", ["backfill", "--segments", "2"])
+    assert main() == 0
+    assert "scanned 5 tasks, wrote 0" in capsys.readouterr().out
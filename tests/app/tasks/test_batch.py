@@ -0,0 +1,109 @@
+import pytest
+from moto import mock_aws
+from pynamodb.exceptions import PutError
+from src.app.tasks import batch
+from src.app.tasks.batch import batch_get, batch_write
+from src.app.tasks.models import Task
+
+Task.Meta.table_name = "test-tasks-table"
+Task.Meta.host = None
+
+
+class FakeConnection:
+
+    """Connection returning the configured responses for batch operations."""
+
+    def __init__(self, responses: list[dict]):
+        self.responses = responses
+        self.requests = []
+
+    def batch_get_item(self, keys):
+        """Record the requested keys and return the next response."""
+        self.requests.append(keys)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Disable the backoff sleep."""
+    monkeypatch.setattr(batch, "_backoff", lambda _: None)
+
+
+def _tasks(count: int) -> list[Task]:
+    return [Task(id=f"task-{idx:03d}", description=f"description_{idx}", version=1) for idx in range(count)]
+
+
+def test_batch_get_retries_unprocessed_keys(monkeypatch, no_backoff):
+    """Test batch_get resubmits unprocessed keys and reports the ones that are never processed."""
+    task = _tasks(1)[0]
+    connection = FakeConnection(
+        [
+            {
+                "Responses": {"test-tasks-table": []},
+                "UnprocessedKeys": {"test-tasks-table": {"Keys": [{"id": {"S": "task-000"}}]}},
+            },
+            {"Responses": {"test-tasks-table": [task.to_dynamodb_dict()]}, "UnprocessedKeys": {}},
+        ]
+    )
+    monkeypatch.setattr(Task, "_get_connection", classmethod(lambda _: connection))
+
+    found, unprocessed = batch_get(["task-000", "task-001"])
+
+    assert list(found) == ["task-000"]
+    assert unprocessed == set()
+    assert connection.requests[1] == [{"id": {"S": "task-000"}}]
+
+
+def test_batch_get_gives_up_after_max_attempts(monkeypatch, no_backoff):
+    """Test batch_get reports keys still unprocessed after the last attempt."""
+    unprocessed_response = {
+        "Responses": {"test-tasks-table": []},
+        "UnprocessedKeys": {"test-tasks-table": {"Keys": [{"id": {"S": "task-000"}}]}},
+    }
+    connection = FakeConnection([unprocessed_response] * batch.MAX_ATTEMPTS)
+    monkeypatch.setattr(Task, "_get_connection", classmethod(lambda _: connection))
+
+    assert batch_get(["task-000"]) == ({}, {"task-000"})
+    assert len(connection.requests) == batch.MAX_ATTEMPTS
+
+
+@mock_aws
+def test_batch_write_and_get_chunks():
+    """Test batch_write and batch_get split requests into DynamoDB sized chunks."""
+    Task().create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+    tasks = _tasks(120)
+
+    assert batch_write(put_tasks=tasks) == set()
+    found, unprocessed = batch_get([task.id for task in tasks])
+    assert sorted(found) == [task.id for task in tasks]
+    assert unprocessed == set()
+
+    assert batch_write(delete_tasks=tasks[:30]) == set()
+    found, _ = batch_get([task.id for task in tasks])
+    assert sorted(found) == [task.id for task in tasks[30:]]
+
+    Task().delete_table()
+
+
+def test_batch_write_retries_failed_operations(monkeypatch, no_backoff):
+    """Test batch_write resubmits only the unprocessed items."""
+    committed = []
+
+    class FakeBatchWrite:
+        def __init__(self):
+            self.puts = []
+            self.failed_operations = []
+
+        def save(self, task):
+            self.puts.append(task)
+
+        def commit(self):
+            committed.append([task.id for task in self.puts])
+            if len(committed) == 1:
+                self.failed_operations = [{"PutRequest": {"Item": {"id": {"S": "task-001"}}}}]
+                raise PutError("Failed to batch write items: max_retry_attempts exceeded")
+
+    monkeypatch.setattr(Task, "batch_write", classmethod(lambda _, auto_commit: FakeBatchWrite()))
+
+    assert batch_write(put_tasks=_tasks(2)) == set()
+    assert committed == [["task-000", "task-001"], ["task-001"]]
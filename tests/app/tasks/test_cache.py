@@ -0,0 +1,77 @@
+import fakeredis
+import pytest
+from src.app.cache import CacheStats, MemoryCache, RedisCache
+from src.app.tasks.cache import TaskCache
+from src.app.tasks.models import Task
+
+_task_id = "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"
+
+
+def _task(version: int, description: str = "description_1") -> Task:
+    return Task(id=_task_id, description=description, is_completed=False, version=version)
+
+
+def test_task_cache_read_through():
+    """Test TaskCache returns cached tasks and counts hits and misses."""
+    cache = TaskCache(MemoryCache(max_size=10, ttl_seconds=60))
+    assert cache.get(_task_id) is None
+
+    cache.put(_task(1))
+    task = cache.get(_task_id)
+
+    assert task.id == _task_id
+    assert task.description == "description_1"
+    assert task.version == 1
+    assert cache.stats == CacheStats(hits=1, misses=1, evictions=0)
+
+
+def test_task_cache_keeps_newest_version():
+    """Test TaskCache never replaces a newer version with an older one."""
+    cache = TaskCache(MemoryCache(max_size=10, ttl_seconds=60))
+    cache.put(_task(2, "description_2"))
+    cache.put(_task(1, "description_1"))
+
+    assert cache.get(_task_id).description == "description_2"
+
+    cache.put(_task(3, "description_3"))
+    assert cache.get(_task_id).description == "description_3"
+
+
+def test_task_cache_remove_leaves_tombstone():
+    """Test TaskCache does not cache a deleted task again from a stale read."""
+    cache = TaskCache(MemoryCache(max_size=10, ttl_seconds=60))
+    cache.put(_task(1))
+    cache.remove(_task(1))
+    cache.put(_task(1))
+
+    assert cache.get(_task_id) is None
+
+
+def test_task_cache_invalidate():
+    """Test TaskCache invalidate drops the entry."""
+    cache = TaskCache(MemoryCache(max_size=10, ttl_seconds=60))
+    cache.put(_task(2))
+    cache.invalidate(_task_id)
+    cache.put(_task(1))
+
+    assert cache.get(_task_id).version == 1
+
+
+def test_task_cache_put_racing_newer_version(monkeypatch: pytest.MonkeyPatch):
+    """Test TaskCache put does not overwrite a newer version cached between its version check and its write."""
+    client = fakeredis.FakeRedis()
+    cache = TaskCache(RedisCache(client, ttl_seconds=60))
+    is_stale = TaskCache._is_stale
+    raced = []
+
+    def racing_is_stale(task: Task, data: bytes | None) -> bool:
+        if not raced:
+            raced.append(task.version)
+            TaskCache(RedisCache(client, ttl_seconds=60)).put(_task(3, "description_3"))
+        return is_stale(task, data)
+
+    monkeypatch.setattr(TaskCache, "_is_stale", staticmethod(racing_is_stale))
+    cache.put(_task(2, "description_2"))
+
+    assert raced == [2]
+    assert cache.get(_task_id).description == "description_3"
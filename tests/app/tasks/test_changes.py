@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from src.app.changes import MemoryBroker
+from src.app.tasks import changes
+from src.app.tasks.changes import TaskChangeFeed, decode_position, encode_position, event_stream, poll_changes
+from src.app.tasks.models import Task
+from starlette import status
+
+from .test_router import setup_test_client
+
+TASK_ID = "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+def _feed(max_size: int = 10) -> TaskChangeFeed:
+    return TaskChangeFeed(MemoryBroker(max_size=max_size))
+
+
+def test_publish():
+    """Test task changes are published as TaskChange JSON, without the task for deletions."""
+    feed = _feed()
+    task = Task(id=TASK_ID, description="description_1", version=2)
+
+    feed.publish("updated", task)
+    feed.publish("deleted", task)
+
+    assert [json.loads(event.data) for event in feed.broker.read(0, 10)] == [
+        {
+            "type": "updated",
+            "id": TASK_ID,
+            "version": 2,
+            "task": {"description": "description_1", "is_completed": False, "id": TASK_ID},
+        },
+        {"type": "deleted", "id": TASK_ID, "version": 2, "task": None},
+    ]
+    TaskChangeFeed(None).publish("created", task)
+
+
+def test_decode_position():
+    """Test cursors resume from their position and are rejected when malformed or from another log."""
+    broker = MemoryBroker(max_size=10)
+    broker.publish(b"{}")
+
+    assert decode_position(broker, None) == 1
+    assert decode_position(broker, encode_position(broker, 0)) == 0
+
+    for cursor, expected in (
+        ("invalid", "400: invalid cursor"),
+        (f"{broker.epoch}-x", "400: invalid cursor"),
+        (encode_position(MemoryBroker(max_size=10), 0), "410: cursor expired, list the tasks again"),
+    ):
+        with pytest.raises(HTTPException) as exc_info:
+            decode_position(broker, cursor)
+        assert str(exc_info.value) == expected
+
+
+@pytest.mark.anyio
+async def test_poll_changes():
+    """Test long polls return the changes after the cursor, waiting for one if there is none yet."""
+    feed = _feed(max_size=2)
+    broker = feed.broker
+    cursor = encode_position(broker, 0)
+
+    resp = await poll_changes(broker, cursor, 0, 10)
+    assert json.loads(resp.body) == {"changes": [], "cursor": cursor}
+
+    poll = asyncio.create_task(poll_changes(broker, cursor, 5, 10))
+    await asyncio.sleep(0)
+    feed.publish("created", Task(id=TASK_ID, description="description_1", version=1))
+    page = json.loads((await poll).body)
+    assert [change["type"] for change in page["changes"]] == ["created"]
+    assert page["cursor"] == encode_position(broker, 1)
+
+    # the change after the cursor is dropped once max_size newer changes are kept
+    for _ in range(3):
+        broker.publish(b"{}")
+    with pytest.raises(HTTPException) as exc_info:
+        await poll_changes(broker, page["cursor"], 0, 10)
+    assert str(exc_info.value) == "410: cursor expired, list the tasks again"
+
+
+@pytest.mark.anyio
+async def test_event_stream():
+    """Test changes are streamed as server-sent events with heartbeats, and a reset once the client fell behind."""
+    broker = MemoryBroker(max_size=2)
+    broker.publish(b'{"n":1}')
+    stream = event_stream(broker, 0, 0.01)
+
+    assert await anext(stream) == f'id: {broker.epoch}-1\nevent: change\ndata: {{"n":1}}\n\n'.encode()
+    assert await anext(stream) == b": heartbeat\n\n"
+
+    for _ in range(3):
+        broker.publish(b"{}")
+    assert await anext(stream) == b"event: reset\ndata: {}\n\n"
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+
+
+def test_list_changes(monkeypatch):
+    """Test the change feed endpoint long polls, and is not found while the feed is disabled."""
+    feed = _feed()
+    monkeypatch.setattr(changes, "task_changes", feed)
+    client = setup_test_client()
+
+    resp = client.get("/tasks:changes?wait=0")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json() == {"changes": [], "cursor": encode_position(feed.broker, 0)}
+
+    resp = client.get("/tasks:changes", params={"cursor": "invalid"}, headers={"Accept": "text/event-stream"})
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    # the Last-Event-ID of a reconnecting event stream takes precedence over the cursor
+    params = {"cursor": encode_position(feed.broker, 0), "wait": 0}
+    resp = client.get("/tasks:changes", params=params, headers={"Last-Event-ID": "invalid"})
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    monkeypatch.setattr(changes, "task_changes", TaskChangeFeed(None))
+    assert client.get("/tasks:changes?wait=0").status_code == status.HTTP_404_NOT_FOUND
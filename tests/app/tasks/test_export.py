@@ -0,0 +1,93 @@
+import gzip
+import json
+
+import pytest
+from moto import mock_aws
+from src.app.tasks import export
+from src.app.tasks.export import CHUNK_ITEMS, accepts_gzip, export_chunks, gzip_chunks
+from src.app.tasks.models import Task
+from src.app.tasks.repository import MemoryTaskRepository
+from starlette import status
+
+from .test_router import setup_test_client
+
+TASKS = 250
+
+_accepts_gzip_test_cases = {
+    "should not accept gzip without Accept-Encoding": (None, False),
+    "should accept gzip": ("gzip, deflate, br", True),
+    "should accept gzip with a quality": ("br;q=1.0, gzip;q=0.5", True),
+    "should accept any coding": ("*", True),
+    "should not accept gzip with quality 0": ("gzip;q=0, br", False),
+    "should not accept other codings": ("br, identity", False),
+}
+
+
+@pytest.fixture
+def setup_test_data():
+    """Create a test table holding TASKS tasks."""
+    with mock_aws():
+        Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        with Task.batch_write() as batch:
+            for idx in range(TASKS):
+                batch.save(Task(id=f"{idx:08x}-0000-4000-8000-000000000000", description=f"task {idx}", version=1))
+        yield
+
+
+@pytest.mark.parametrize("total_segments", [1, 4], ids=["sequential scan", "parallel segment scan"])
+def test_export_chunks(setup_test_data, total_segments: int):
+    """Test every task is exported once, in chunks of complete NDJSON lines."""
+    chunks = list(export_chunks(total_segments))
+    lines = [json.loads(line) for chunk in chunks for line in chunk.decode("utf-8").splitlines()]
+
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+    assert all(chunk.count(b"\n") <= CHUNK_ITEMS for chunk in chunks)
+    assert sorted(line["description"] for line in lines) == sorted(f"task {idx}" for idx in range(TASKS))
+    assert lines[0].keys() == {"description", "is_completed", "id"}
+
+
+def test_export_chunks_memory_storage(monkeypatch: pytest.MonkeyPatch):
+    """Test the tasks of the configured repository are exported, without reading the task table."""
+    repository = MemoryTaskRepository()
+    for idx in range(TASKS):
+        repository.save(Task(id=f"{idx:08x}-0000-4000-8000-000000000000", description=f"task {idx}"))
+    monkeypatch.setattr(export, "sync_task_repository", repository)
+
+    for total_segments in (1, 4):
+        lines = [line for chunk in export_chunks(total_segments) for line in chunk.decode("utf-8").splitlines()]
+        assert len(lines) == TASKS
+def test_export_chunks_segment_error():
+    """Test a failed segment scan ends a parallel export with its error."""
+    with mock_aws(), pytest.raises(Exception, match="ResourceNotFoundException"):
+        list(export_chunks(2))
+
+
+def test_gzip_chunks():
+    """Test chunks are compressed into a single gzip stream."""
+    assert gzip.decompress(b"".join(gzip_chunks([b'{"a":1}\n', b"", b'{"b":2}\n']))) == b'{"a":1}\n{"b":2}\n'
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    _accepts_gzip_test_cases.values(),
+    ids=_accepts_gzip_test_cases.keys(),
+)
+def test_accepts_gzip(accept_encoding: str | None, expected: bool):
+    """Test the Accept-Encoding header is negotiated."""
+    assert accepts_gzip(accept_encoding) == expected
+
+
+def test_export_tasks(setup_test_data):
+    """Test the export endpoint streams NDJSON, gzip compressed if accepted."""
+    client = setup_test_client()
+
+    resp = client.get("/tasks:export", headers={"Accept-Encoding": "identity"})
+    assert resp.headers["Content-Type"] == "application/x-ndjson"
+    assert "Content-Encoding" not in resp.headers
+    assert len(resp.text.splitlines()) == TASKS
+
+    resp = client.get("/tasks:export?segments=2", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert len(resp.text.splitlines()) == TASKS
+
+    assert client.get("/tasks:export?segments=17").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
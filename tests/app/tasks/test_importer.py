@@ -0,0 +1,196 @@
+import json
+import sys
+from uuid import UUID, uuid5
+
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from pynamodb.exceptions import PutError
+from src.app.changes import MemoryBroker
+from src.app.tasks import importer
+from src.app.tasks.changes import TaskChangeFeed
+from src.app.tasks.importer import (
+    AdaptiveThrottle,
+    ImportCheckpoint,
+    _lines,
+    _write_batch,
+    import_tasks,
+    main,
+    read_tasks,
+)
+from src.app.tasks.models import Task
+from src.app.tasks.schemas import TaskCreate
+from src.app.tasks.search import MemorySearchIndex, TaskSearch
+from starlette import status
+
+from .test_router import setup_test_client
+
+ROWS = 60
+INVALID_ROWS = {7, 33}
+IMPORT_ID = UUID("6b1f3c1e-5d0a-4c1e-9b59-3f2b6a1c0d11")
+
+_read_tasks_test_cases = {
+    "should read NDJSON rows and skip blank lines": (
+        ['{"description": "a"}\n', "\n", '{"description": "b", "is_completed": true}\n'],
+        "ndjson",
+        [TaskCreate(description="a"), TaskCreate(description="b", is_completed=True)],
+    ),
+    "should report invalid NDJSON rows": (
+        ['{"description": "a"\n', '{"is_completed": false}\n'],
+        "ndjson",
+        ["invalid JSON: Expecting ',' delimiter", "description: Field required"],
+    ),
+    "should read CSV rows with a header row": (
+        ["description,is_completed\n", "a,true\n", "b,\n", '"multi\n', 'line",0\n'],
+        "csv",
+        [
+            TaskCreate(description="a", is_completed=True),
+            TaskCreate(description="b"),
+            TaskCreate(description="multi\nline"),
+        ],
+    ),
+    "should report invalid CSV rows": (
+        ["description,is_completed\n", "a,maybe\n"],
+        "csv",
+        ["is_completed: Input should be a valid boolean, unable to interpret input"],
+    ),
+}
+
+
+def _input_lines() -> list[str]:
+    return [
+        "not json\n" if row in INVALID_ROWS else json.dumps({"description": f"task {row}"}) + "\n"
+        for row in range(ROWS)
+    ]
+
+
+@pytest.fixture
+def setup_test_data():
+    """Create an empty test table."""
+    with mock_aws():
+        Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        yield
+
+
+@pytest.mark.parametrize(
+    "lines,fmt,expected",
+    _read_tasks_test_cases.values(),
+    ids=_read_tasks_test_cases.keys(),
+)
+def test_read_tasks(lines: list[str], fmt: importer.ImportFormat, expected: list[TaskCreate | str]):
+    """Test rows are parsed and validated one at a time."""
+    assert list(read_tasks(lines, fmt)) == expected
+
+
+def test_lines():
+    """Test a chunked stream is split into lines, including multi-byte characters split across chunks."""
+    encoded = "a\nbé\n\nc".encode()
+    assert list(_lines([encoded[:3], encoded[3:4], encoded[4:]])) == ["a\n", "bé\n", "\n", "c"]
+
+
+def test_import_tasks(setup_test_data, monkeypatch):
+    """Test valid rows are imported with IDs derived from the import, published and indexed, and invalid rows reported."""
+    feed = TaskChangeFeed(MemoryBroker(max_size=ROWS))
+    monkeypatch.setattr(importer, "task_changes", feed)
+    monkeypatch.setattr(importer, "task_search", TaskSearch(MemorySearchIndex()))
+    checkpoint = ImportCheckpoint(import_id=IMPORT_ID)
+    progress = []
+
+    report = import_tasks(_input_lines(), workers=3, checkpoint=checkpoint, on_progress=progress.append)
+
+    assert (report.rows, report.imported, report.failed) == (ROWS, ROWS - len(INVALID_ROWS), len(INVALID_ROWS))
+    assert [error.row for error in report.errors] == [row + 1 for row in sorted(INVALID_ROWS)]
+    assert progress
+    assert (checkpoint.rows, checkpoint.imported, checkpoint.failed) == (ROWS, report.imported, report.failed)
+    assert Task.count() == report.imported
+    assert Task.get(str(uuid5(IMPORT_ID, "0"))).description == "task 0"
+    assert len(feed.broker.read(0, ROWS)) == report.imported
+    assert importer.task_search.rank("task 0") == [(str(uuid5(IMPORT_ID, "0")), 2.0)]
+
+
+def test_import_tasks_resume(setup_test_data):
+    """Test an import resumes after the checkpoint and rows written again overwrite the same tasks."""
+    import_tasks(_input_lines()[:40], checkpoint=ImportCheckpoint(import_id=IMPORT_ID))
+    checkpoint = ImportCheckpoint(import_id=IMPORT_ID, rows=30)
+
+    report = import_tasks(_input_lines(), checkpoint=checkpoint)
+
+    assert (report.rows, report.imported, report.failed) == (ROWS - 30, ROWS - 30 - 1, 1)
+    assert checkpoint.rows == ROWS
+    assert Task.count() == ROWS - len(INVALID_ROWS)
+
+
+def test_write_batch_throttling(monkeypatch):
+    """Test throttled writes are retried with a growing delay and tasks still unprocessed are returned."""
+    tasks = [Task(id="a"), Task(id="b")]
+    throttled = ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "BatchWriteItem")
+    responses: list[set[str] | Exception] = [PutError("throttled", throttled), {"b"}, set()]
+    calls = []
+
+    def fake_batch_write(put_tasks: list[Task]) -> set[str]:
+        calls.append([task.id for task in put_tasks])
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(importer.sync_task_repository, "batch_write", fake_batch_write)
+    throttle = AdaptiveThrottle(base_delay=0.001, max_delay=0.002)
+
+    assert _write_batch(tasks, throttle) == set()
+    assert calls == [["a", "b"], ["a", "b"], ["b"]]
+    assert throttle.delay == 0.001  # noqa: PLR2004
+
+    monkeypatch.setattr(importer, "MAX_WRITE_ROUNDS", 2)
+    responses.extend([{"a"}, {"a"}])
+    assert _write_batch(tasks, throttle) == {"a"}
+    assert throttle.delay == 0.002  # noqa: PLR2004
+
+
+def test_adaptive_throttle():
+    """Test the delay doubles on throttling up to the maximum and halves back to zero."""
+    throttle = AdaptiveThrottle(base_delay=0.01, max_delay=0.03)
+    delays = []
+    for throttled in (True, True, True, False, False, False):
+        if throttled:
+            throttle.throttled()
+        else:
+            throttle.succeeded()
+        delays.append(throttle.delay)
+
+    assert delays == [0.01, 0.02, 0.03, 0.015, 0.0075, 0.0]
+
+
+def test_import_tasks_endpoint(setup_test_data):
+    """Test the import endpoint streams NDJSON and CSV bodies into the table."""
+    client = setup_test_client()
+
+    resp = client.post(
+        "/tasks:import?workers=2",
+        content="".join(_input_lines()).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["imported"] == ROWS - len(INVALID_ROWS)
+    assert resp.json()["errors"][0] == {"row": 8, "error": "invalid JSON: Expecting value"}
+
+    resp = client.post(
+        "/tasks:import", content=b"description,is_completed\na,true\nb,false\n", headers={"Content-Type": "text/csv"}
+    )
+    assert resp.json()["imported"] == 2  # noqa: PLR2004
+    assert Task.count() == ROWS - len(INVALID_ROWS) + 2
+
+
+def test_main(setup_test_data, tmp_path, monkeypatch, capsys):
+    """Test the command line import saves its checkpoint and resumes from it."""
+    input_path = tmp_path / "tasks.csv"
+    input_path.write_text("description\na\n\n", encoding="utf-8")
+    checkpoint_path = tmp_path / "checkpoint.json"
+    monkeypatch.setattr(sys, "argv", ["importer", str(input_path), "--checkpoint", str(checkpoint_path)])
+
+    assert main() == 0
+    assert json.loads(capsys.readouterr().out)["imported"] == 1
+    assert ImportCheckpoint.load(checkpoint_path).rows == 1
+
+    assert main() == 0
+    assert Task.count() == 1
@@ -0,0 +1,182 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from moto import mock_aws
+from pynamodb.exceptions import DeleteError, DoesNotExist, PutError, UpdateError
+from src.app.config import Settings
+from src.app.tasks.models import TASKS_BUCKETS, Task, bucket_value
+from src.app.tasks.repository import (
+    AsyncMemoryTaskRepository,
+    DynamoDBTaskRepository,
+    MemoryTaskRepository,
+    TaskRepository,
+    create_task_repositories,
+)
+
+_CREATED_AT = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+def _task(idx: int, is_completed: bool = False) -> Task:
+    return Task(
+        id=f"task-{idx:03d}",
+        description=f"description_{idx}",
+        is_completed=is_completed,
+        created_at=_CREATED_AT + timedelta(seconds=idx),
+    )
+
+
+@pytest.fixture(params=["dynamodb", "memory"])
+def repository(request):
+    """Yield every task repository, the conformance tests below must pass against each of them."""
+    if request.param == "memory":
+        yield MemoryTaskRepository()
+        return
+    with mock_aws():
+        Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        yield DynamoDBTaskRepository()
+        Task.delete_table()
+
+
+def _condition_failed(exc: pytest.ExceptionInfo) -> bool:
+    return exc.value.cause_response_code == "ConditionalCheckFailedException"
+
+
+def test_save_and_get(repository: TaskRepository):
+    """Test saved tasks are read back with a version incremented on every save, outdated saves fail."""
+    task = _task(1)
+    repository.save(task)
+    assert task.version == 1
+
+    stored = repository.get(task.id)
+    assert (stored.description, stored.version) == ("description_1", 1)
+    assert stored.bucket == stored.open_bucket == bucket_value(task.id)
+    assert stored.bucket in TASKS_BUCKETS
+    assert repository.exists(task.id)
+
+    stored.is_completed = True
+    repository.save(stored)
+    assert repository.get(task.id).version == 2  # noqa: PLR2004
+    assert repository.get(task.id).open_bucket is None
+
+    with pytest.raises(PutError) as exc_info:
+        repository.save(task)
+    assert _condition_failed(exc_info)
+    with pytest.raises(PutError) as exc_info:
+        repository.save(_task(1))
+    assert _condition_failed(exc_info)
+
+    with pytest.raises(DoesNotExist):
+        repository.get("missing")
+    assert not repository.exists("missing")
+
+
+def test_update(repository: TaskRepository):
+    """Test updates set and remove attributes in a conditional write, incrementing the version."""
+    repository.save(_task(1))
+
+    updated = repository.update("task-001", {"is_completed": True, "open_bucket": None}, version=1)
+    assert (updated.is_completed, updated.open_bucket, updated.version) == (True, None, 2)
+    assert repository.get("task-001").is_completed
+
+    assert repository.update("task-001", {"description": "updated"}).version == 3  # noqa: PLR2004
+    for task_id, version in (("task-001", 1), ("missing", None)):
+        with pytest.raises(UpdateError) as exc_info:
+            repository.update(task_id, {"description": "conflict"}, version)
+        assert _condition_failed(exc_info)
+    assert repository.get("task-001").description == "updated"
+
+
+def test_delete(repository: TaskRepository):
+    """Test deletes are conditional on the version and return the deleted task."""
+    repository.save(_task(1))
+
+    with pytest.raises(DeleteError) as exc_info:
+        repository.delete("task-001", version=2)
+    assert _condition_failed(exc_info)
+
+    assert repository.delete("task-001", version=1).description == "description_1"
+    with pytest.raises(DeleteError) as exc_info:
+        repository.delete("task-001")
+    assert _condition_failed(exc_info)
+    assert not repository.exists("task-001")
+
+
+def _query_all(repository: TaskRepository, limit: int, **kwargs) -> list[list[str]]:
+    pages = []
+    last_evaluated_key = None
+    while True:
+        tasks, last_evaluated_key = repository.query(limit, last_evaluated_key, **kwargs)
+        pages.append([task.id for task in tasks])
+        if last_evaluated_key is None:
+            return pages
+
+
+def test_query(repository: TaskRepository):
+    """Test the shards are merged into pages in creation order and incomplete tasks are read from the open index."""
+    repository.batch_write(put_tasks=[_task(idx, is_completed=idx % 2 == 0) for idx in (4, 1, 3, 2, 0)])
+
+    assert _query_all(repository, 2) == [["task-000", "task-001"], ["task-002", "task-003"], ["task-004"]]
+    for is_completed, expected in ((True, ["task-000", "task-002", "task-004"]), (False, ["task-001", "task-003"])):
+        pages = _query_all(repository, 2, is_completed=is_completed)
+        assert [task_id for page in pages for task_id in page] == expected
+        assert all(len(page) <= 2 for page in pages)  # noqa: PLR2004
+
+    for is_completed, bucket in ((False, "open_bucket"), (None, "bucket")):
+        tasks, last_evaluated_key = repository.query(1, is_completed=is_completed)
+        assert set(last_evaluated_key) <= set(TASKS_BUCKETS)
+        for shard, key in last_evaluated_key.items():
+            assert key is None or (set(key), key[bucket]["S"]) == ({"id", bucket, "created_at"}, shard)
+
+    tasks, _ = repository.query(1, attributes=["id", "is_completed"])
+    assert (tasks[0].id, tasks[0].is_completed, tasks[0].description) == ("task-000", True, None)
+
+
+def test_batch_get_and_write(repository: TaskRepository):
+    """Test batch writes put and delete tasks unconditionally and batch gets return those found."""
+    tasks = [_task(idx) for idx in range(3)]
+    for task in tasks:
+        task.version = 1
+    assert repository.batch_write(put_tasks=tasks) == set()
+    assert repository.batch_write(delete_tasks=tasks[:1]) == set()
+
+    found, unprocessed = repository.batch_get(["task-000", "task-001", "task-002"])
+    assert sorted(found) == ["task-001", "task-002"]
+    assert found["task-001"].version == 1
+    assert unprocessed == set()
+
+
+
+def test_scan(repository: TaskRepository):
+    """Test scans read every task once, whole or split in segments, with the selected attributes."""
+    for idx in range(10):
+        repository.save(_task(idx, is_completed=idx % 2 == 0))
+
+    assert sorted(task.id for task in repository.scan()) == [f"task-{idx:03d}" for idx in range(10)]
+    segments = [[task.id for task in repository.scan(segment, 3)] for segment in range(3)]
+    assert sorted(task_id for segment in segments for task_id in segment) == [f"task-{idx:03d}" for idx in range(10)]
+
+    tasks = list(repository.scan(attributes=[Task.is_completed.attr_name]))
+    assert sum(task.is_completed for task in tasks) == 5  # noqa: PLR2004
+    assert all(task.description is None for task in tasks)
+@pytest.mark.anyio
+async def test_async_memory_task_repository():
+    """Test the async memory repository serves the tasks of the memory repository it wraps."""
+    sync_repository, async_repository = create_task_repositories(
+        Settings(db_tasks_table="tasks", storage_backend="memory")
+    )
+    assert isinstance(async_repository, AsyncMemoryTaskRepository)
+
+    sync_repository.save(_task(1))
+    assert (await async_repository.get("task-001")).description == "description_1"
+    assert (await async_repository.update("task-001", {"description": "updated"})).version == 2  # noqa: PLR2004
+    tasks, _ = await async_repository.query(10)
+    assert [task.description for task in tasks] == ["updated"]
+    await async_repository.delete("task-001")
+    assert not sync_repository.exists("task-001")
+    await async_repository.close()
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, FastAPI
+from moto import mock_aws
+from src.app.tasks.models import Task
 from src.app.tasks.router import tasks_router
 from starlette import status
 from starlette.testclient import TestClient
@@ -30,3 +32,38 @@ def test_list_tasks():
             }
         ]
     }
+
+
+def test_batch_get_tasks():
+    """Test batch get validation."""
+    task_id = "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"
+    resp = setup_test_client().post("/tasks:batchGet", json={"ids": [task_id, task_id]})
+
+    assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert resp.json()["detail"][0]["msg"] == "Value error, task ids must be unique"
+
+
+@mock_aws
+def test_get_task_etag():
+    """Test task reads return an ETag and answer 304 when the client has the current version."""
+    Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+    task = Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1")
+    task.save()
+    client = setup_test_client()
+
+    for url in (f"/tasks/{task.id}", "/tasks"):
+        resp = client.get(url)
+        etag = resp.headers["ETag"]
+        assert resp.status_code == status.HTTP_200_OK
+
+        resp = client.get(url, headers={"If-None-Match": f'"stale", W/{etag}'})
+        assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+        assert resp.headers["ETag"] == etag
+        assert resp.content == b""
+
+    resp = client.patch(f"/tasks/{task.id}", json={"is_completed": True})
+    assert resp.json() == {"id": task.id, "description": "description_1", "is_completed": True}
+    resp = client.get(f"/tasks/{task.id}", headers={"If-None-Match": '"1"'})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["ETag"] == '"2"'
+    assert client.get("/tasks", headers={"If-None-Match": etag}).status_code == status.HTTP_200_OK
@@ -0,0 +1,247 @@
+import pytest
+from moto import mock_aws
+from src.app.config import Settings
+from src.app.tasks import search
+from src.app.tasks.models import Task
+from src.app.tasks.repository import MemoryTaskRepository
+from src.app.tasks.search import (
+    DynamoDBSearchIndex,
+    MemorySearchIndex,
+    Posting,
+    SearchIndex,
+    TaskSearch,
+    TaskSearchTerm,
+    apply_stream_records,
+    create_search_index,
+    rebuild_index,
+    tokenize,
+)
+from starlette import status
+
+from .test_router import setup_test_client
+
+_TASK_IDS = [
+    "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4",
+    "3f2b8a54-6a7e-4a65-9d4e-2b7d8f1c9e10",
+    "7b1e5c2d-9f3a-4e8b-8c6d-1a2b3c4d5e6f",
+    "edd63ebf-fbc2-4691-bc0c-70a7f78cf894",
+]
+
+_tokenize_test_cases = {
+    "should count lowercase word terms": ("Buy milk, buy BREAD!", {"buy": 2, "milk": 1, "bread": 1}),
+    "should keep digits and underscores": ("call_mom at 5pm", {"call_mom": 1, "at": 1, "5pm": 1}),
+    "should truncate long terms": ("a" * 100, {"a" * 64: 1}),
+    "should return no terms for empty text": (None, {}),
+}
+
+
+@pytest.mark.parametrize("text,expected", _tokenize_test_cases.values(), ids=_tokenize_test_cases.keys())
+def test_tokenize(text: str | None, expected: dict[str, int]):
+    """Test texts are split into lowercase terms with their number of occurrences."""
+    assert tokenize(text) == expected
+
+
+@pytest.fixture(params=["memory", "dynamodb"])
+def index(request):
+    """Yield every search index, the tests below must pass against each of them."""
+    if request.param == "memory":
+        yield MemorySearchIndex()
+        return
+    with mock_aws():
+        TaskSearchTerm.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        yield DynamoDBSearchIndex()
+
+
+def _postings(index: SearchIndex, term: str, prefix: bool) -> list[Posting]:
+    return sorted(index.postings(term, prefix))
+
+
+def test_search_index(index: SearchIndex):
+    """Test terms are looked up as a whole or by prefix and replaced when a task is indexed again."""
+    index.index("task-1", {"milk": 2, "bread": 1})
+    index.index("task-2", {"milky": 1, "mill": 1})
+
+    assert _postings(index, "milk", prefix=False) == [Posting("milk", "task-1", 2)]
+    assert _postings(index, "mil", prefix=True) == [
+        Posting("milk", "task-1", 2),
+        Posting("milky", "task-2", 1),
+        Posting("mill", "task-2", 1),
+    ]
+    assert _postings(index, "mi", prefix=False) == []
+
+    index.index("task-1", {"bread": 1, "butter": 1})
+    assert _postings(index, "milk", prefix=True) == [Posting("milky", "task-2", 1)]
+    assert _postings(index, "b", prefix=False) == []
+
+    index.index("task-2", {})
+    assert _postings(index, "mil", prefix=True) == []
+    assert _postings(index, "bu", prefix=True) == [Posting("butter", "task-1", 1)]
+
+
+def test_task_search_rank():
+    """Test every query term must match, whole terms and repeated terms ranking higher."""
+    task_search = TaskSearch(MemorySearchIndex())
+    for task_id, description in (
+        ("a", "buy milk"),
+        ("b", "buy milk and milk powder"),
+        ("c", "buy milky tea"),
+        ("d", "sell milk"),
+    ):
+        task_search.add(Task(id=task_id, description=description))
+
+    assert task_search.rank("buy milk") == [("b", 3.0), ("a", 2.0), ("c", pytest.approx(1.8))]
+    assert task_search.rank("MILK sell") == [("d", 2.0)]
+    assert task_search.rank("buy coffee") == []
+
+    task_search.remove(Task(id="b", description="buy milk and milk powder"))
+    assert [task_id for task_id, _ in task_search.rank("milk")] == ["a", "d", "c"]
+    assert TaskSearch(None).rank("milk") == []
+
+
+def test_task_search_rank_page():
+    """Test only the tasks ranked after the cursor are returned, up to the limit."""
+    task_search = TaskSearch(MemorySearchIndex())
+    for task_id, description in (("a", "milk"), ("b", "milk milk"), ("c", "milk"), ("d", "milk milk milk")):
+        task_search.add(Task(id=task_id, description=description))
+
+    assert task_search.rank("milk", limit=2) == [("d", 3.0), ("b", 2.0)]
+    assert task_search.rank("milk", after=(2.0, "b"), limit=2) == [("a", 1.0), ("c", 1.0)]
+    assert task_search.rank("milk", after=(1.0, "a")) == [("c", 1.0)]
+
+
+def test_task_search_index_failure(caplog):
+    """Test a failed index update is logged rather than failing the task write."""
+
+    class FailingIndex(MemorySearchIndex):
+
+        """Search index failing every update."""
+
+        def index(self, task_id: str, terms: dict[str, int]) -> None:
+            """Fail to index the task."""
+            raise RuntimeError("index unavailable")
+
+    TaskSearch(FailingIndex()).add(Task(id="a", description="buy milk"))
+    assert "failed to index task a" in caplog.text
+
+
+def test_task_search_stream_indexing():
+    """Test the services leave the index to the stream consumer when indexing is not inline."""
+    task_search = TaskSearch(MemorySearchIndex(), inline=False)
+    task_search.add(Task(id="a", description="buy milk"))
+    assert task_search.rank("milk") == []
+
+    task_search.index_task("a", "buy milk")
+    assert task_search.rank("milk") == [("a", 1.0)]
+
+
+def _stream_record(task_id: str, old: str | None, new: str | None) -> dict:
+    change: dict = {"Keys": {"id": {"S": task_id}}}
+    for image, description in (("OldImage", old), ("NewImage", new)):
+        if description is not None:
+            change[image] = {"id": {"S": task_id}, "description": {"S": description}}
+    return {"dynamodb": change}
+
+
+def test_apply_stream_records(monkeypatch):
+    """Test stream records index created and updated tasks and remove deleted ones, in order."""
+    monkeypatch.setattr(search, "task_search", TaskSearch(MemorySearchIndex(), inline=False))
+    apply_stream_records(
+        [
+            _stream_record("a", None, "buy milk"),
+            _stream_record("b", None, "buy bread"),
+            _stream_record("a", "buy milk", "buy tea"),
+            _stream_record("b", "buy bread", None),
+        ]
+    )
+    assert search.task_search.rank("buy") == [("a", 1.0)]
+    assert search.task_search.rank("milk") == []
+    assert search.task_search.rank("tea") == [("a", 1.0)]
+
+
+def test_create_search_index():
+    """Test the search index is selected by the settings."""
+    assert create_search_index(Settings(db_tasks_table="tasks")) is None
+    assert isinstance(create_search_index(Settings(db_tasks_table="tasks", search_backend="memory")), MemorySearchIndex)
+    dynamodb_index = create_search_index(Settings(db_tasks_table="tasks", search_backend="dynamodb"))
+    assert isinstance(dynamodb_index, DynamoDBSearchIndex)
+
+
+@pytest.fixture
+def setup_test_data(monkeypatch):
+    """Create the task table and index tasks in a fresh memory search index."""
+    monkeypatch.setattr(search, "task_search", TaskSearch(MemorySearchIndex()))
+    with mock_aws():
+        Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        for task_id, description in zip(
+            _TASK_IDS, ["Buy milk", "buy milk and milk powder", "Buy milky tea", "Walk the dog"], strict=True
+        ):
+            task = Task(id=task_id, description=description)
+            task.save()
+            search.task_search.add(task)
+        yield
+
+
+def test_search_tasks(setup_test_data):
+    """Test the search endpoint pages through the matching tasks, best matches first."""
+    client = setup_test_client()
+
+    resp = client.get("/tasks/search", params={"q": "buy mil", "limit": 2})
+    assert resp.status_code == status.HTTP_200_OK
+    page = resp.json()
+    assert [(item["id"], item["description"]) for item in page["items"]] == [
+        (_TASK_IDS[1], "buy milk and milk powder"),
+        (_TASK_IDS[0], "Buy milk"),
+    ]
+    assert page["items"][0]["score"] == pytest.approx(1 + 2 * 3 / 4)
+
+    resp = client.get("/tasks/search", params={"q": "buy mil", "limit": 2, "cursor": page["next_cursor"]})
+    assert [item["id"] for item in resp.json()["items"]] == [_TASK_IDS[2]]
+    assert resp.json()["next_cursor"] is None
+
+    Task.get(_TASK_IDS[2]).delete()
+    resp = client.get("/tasks/search", params={"q": "tea"})
+    assert resp.json() == {"items": [], "next_cursor": None}
+
+
+_search_errors_test_cases = {
+    "should reject queries without terms": ({"q": "?!"}, "400: query has no terms"),
+    "should reject invalid cursors": ({"q": "milk", "cursor": "invalid"}, "400: invalid cursor"),
+}
+
+
+@pytest.mark.parametrize("params,expected", _search_errors_test_cases.values(), ids=_search_errors_test_cases.keys())
+def test_search_tasks_errors(setup_test_data, params: dict[str, str], expected: str):
+    """Test invalid queries and cursors are rejected."""
+    resp = setup_test_client().get("/tasks/search", params=params)
+    assert f"{resp.status_code}: {resp.json()['detail']}" == expected
+
+
+def test_search_tasks_disabled(monkeypatch):
+    """Test the search endpoint answers 404 when search is disabled."""
+    monkeypatch.setattr(search, "task_search", TaskSearch(None))
+    resp = setup_test_client().get("/tasks/search", params={"q": "milk"})
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+@mock_aws
+def test_rebuild_index(monkeypatch):
+    """Test every task of the table is indexed by a parallel scan."""
+    monkeypatch.setattr(search, "task_search", TaskSearch(MemorySearchIndex()))
+    Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+    for idx in range(5):
+        Task(id=f"task-{idx}", description=f"description {idx}").save()
+
+    assert rebuild_index(segments=2) == 5  # noqa: PLR2004
+    assert len(search.task_search.rank("description")) == 5  # noqa: PLR2004
+
+
+def test_rebuild_index_memory_storage(monkeypatch):
+    """Test the tasks of the configured repository are indexed, without scanning the task table."""
+    repository = MemoryTaskRepository()
+    for idx in range(3):
+        repository.save(Task(id=f"task-{idx}", description=f"description {idx}"))
+    monkeypatch.setattr(search, "sync_task_repository", repository)
+    monkeypatch.setattr(search, "task_search", TaskSearch(MemorySearchIndex()))
+
+    assert rebuild_index(segments=2) == 3  # noqa: PLR2004
+    assert [task_id for task_id, _ in search.task_search.rank("description 1")] == ["task-1"]
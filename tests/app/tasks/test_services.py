@@ -1,13 +1,47 @@
+import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import ClassVar
 
 import pytest
 from fastapi import HTTPException
 from moto import mock_aws
-from pynamodb.exceptions import PutError
-from src.app.tasks.models import Task
-from src.app.tasks.schemas import TaskCreate, TaskRead, TaskUpdate
-from src.app.tasks.services import create_task, delete_task, get_task, get_task_by_id, list_tasks, update_task
+from src.app.cache import CacheStats, MemoryCache, NullCache
+from src.app.changes import MemoryBroker
+from src.app.coalesce import WriteCoalescer
+from src.app.cursor import encode_cursor, get_cursor_secret
+from src.app.metrics import RequestMetrics, _current_metrics
+from src.app.singleflight import SingleFlight, SingleFlightStats
+from src.app.tasks import services
+from src.app.tasks.cache import TaskCache
+from src.app.tasks.changes import TaskChangeFeed
+from src.app.tasks.models import TASKS_BUCKETS, Task
+from src.app.tasks.schemas import (
+    TaskBatchCreate,
+    TaskBatchDelete,
+    TaskBatchGet,
+    TaskBatchResponse,
+    TaskBatchResult,
+    TaskBatchUpdate,
+    TaskBatchUpdateItem,
+    TaskCreate,
+    TaskPartial,
+    TaskRead,
+    TaskUpdate,
+)
+from src.app.tasks.services import (
+    batch_create_tasks,
+    batch_delete_tasks,
+    batch_get_tasks,
+    batch_update_tasks,
+    create_task,
+    delete_task,
+    get_task,
+    get_task_by_id,
+    list_tasks,
+    update_task,
+)
 
 Task.Meta.table_name = "test-tasks-table"
 Task.Meta.host = None
@@ -67,8 +101,122 @@ class TestServices:
 
         assert str(exc_info.value) == expected_exc[1]
 
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [[Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True)]],
+        indirect=True,
+        ids=["should read through and write through the task cache"],
+    )
+    def test_get_task_by_id_cached(self, setup_test_data, monkeypatch):
+        """Test get_task_by_id reads through the task cache and writes keep it up to date."""
+        cache = TaskCache(MemoryCache(max_size=10, ttl_seconds=60))
+        monkeypatch.setattr(services, "task_cache", cache)
+        task_id = uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894")
+
+        get_task_by_id(task_id)
+        assert get_task_by_id(task_id).description == "description_2"
+        assert cache.stats == CacheStats(hits=1, misses=1, evictions=0)
+
+        update_task(task_id, TaskUpdate(description="description_3"))
+        assert Task.get(str(task_id)).description == "description_3"
+        assert get_task_by_id(task_id).description == "description_3"
+
+        delete_task(task_id)
+        with pytest.raises(HTTPException) as exc_info:
+            get_task_by_id(task_id)
+        assert str(exc_info.value) == "404: task not found"
+
+    @mock_aws
+    @pytest.mark.parametrize("setup_test_data", [[]], indirect=True, ids=["should publish every task change"])
+    def test_task_changes_published(self, setup_test_data, monkeypatch):
+        """Test creating, updating and deleting tasks publishes their changes in order."""
+        feed = TaskChangeFeed(MemoryBroker(max_size=10))
+        monkeypatch.setattr(services, "task_changes", feed)
+
+        task = create_task(TaskCreate(description="description_1"))
+        update_task(task.id, TaskUpdate(is_completed=True))
+        delete_task(task.id)
+
+        changes = [json.loads(event.data) for event in feed.broker.read(0, 10)]
+        assert [(change["type"], change["version"]) for change in changes] == [
+            ("created", 1),
+            ("updated", 2),
+            ("deleted", 2),
+        ]
+        assert changes[1]["task"] == {"description": "description_1", "is_completed": True, "id": str(task.id)}
+
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [[Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True)]],
+        indirect=True,
+        ids=["should share one GetItem between concurrent reads of the same task"],
+    )
+    def test_get_task_by_id_coalesced(self, setup_test_data, monkeypatch):
+        """Test concurrent get_task_by_id calls for the same task are coalesced and recorded in the metrics."""
+        monkeypatch.setattr(services, "task_cache", TaskCache(NullCache()))
+        monkeypatch.setattr(services, "task_get_flight", SingleFlight())
+        get_calls = []
+        task_get = Task.get
+
+        def slow_get(*args, **kwargs) -> Task:
+            get_calls.append(args)
+            time.sleep(0.1)
+            return task_get(*args, **kwargs)
+
+        monkeypatch.setattr(Task, "get", slow_get)
+        request_metrics = [RequestMetrics() for _ in range(4)]
+
+        def get_with_metrics(metrics: RequestMetrics) -> Task:
+            _current_metrics.set(metrics)
+            return get_task_by_id(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"))
+
+        with ThreadPoolExecutor(max_workers=len(request_metrics)) as executor:
+            tasks = list(executor.map(get_with_metrics, request_metrics))
+
+        assert {task.description for task in tasks} == {"description_2"}
+        assert len(get_calls) == 1
+        assert services.task_get_flight.stats == SingleFlightStats(leaders=1, coalesced=len(request_metrics) - 1)
+        assert sum(metrics.coalesced_reads for metrics in request_metrics) == len(request_metrics) - 1
+
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [[Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=False)]],
+        indirect=True,
+        ids=["should merge concurrent updates of the same task into one write"],
+    )
+    def test_update_task_coalesced(self, setup_test_data, monkeypatch):
+        """Test concurrent update_task calls without If-Match are merged into one write and recorded in the metrics."""
+        monkeypatch.setattr(services, "task_update_coalescer", WriteCoalescer(window_seconds=0.2))
+        feed = TaskChangeFeed(MemoryBroker(max_size=10))
+        monkeypatch.setattr(services, "task_changes", feed)
+        task_id = uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894")
+        updates = [TaskUpdate(description="description_3"), TaskUpdate(is_completed=True)]
+        request_metrics = [RequestMetrics() for _ in updates]
+
+        def update_with_metrics(metrics: RequestMetrics, task: TaskUpdate) -> TaskRead:
+            _current_metrics.set(metrics)
+            return update_task(task_id, task)
+
+        with ThreadPoolExecutor(max_workers=len(updates)) as executor:
+            tasks = list(executor.map(update_with_metrics, request_metrics, updates))
+
+        assert {(task.description, task.is_completed) for task in tasks} == {("description_3", True)}
+        assert Task.get(str(task_id)).version == 2  # noqa: PLR2004
+        assert services.task_update_coalescer.stats.model_dump(include={"updates", "writes"}) == {
+            "updates": 2,
+            "writes": 1,
+        }
+        assert sum(metrics.coalesced_writes for metrics in request_metrics) == 1
+        assert [json.loads(event.data)["type"] for event in feed.broker.read(0, 10)] == ["updated"]
+
+        update_task(task_id, TaskUpdate(description="description_4"), if_match='"2"')
+        assert services.task_update_coalescer.stats.updates == 2  # noqa: PLR2004
+
     list_tasks_test_cases: ClassVar = {
-        "should list first tasks when after_id is None and limit is 1": (
+        "should list first tasks when cursor is None and limit is 1": (
             [
                 Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
                 Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
@@ -83,19 +231,58 @@ class TestServices:
                 )
             ],
         ),
-        "should list second tasks when after_id is first task id and limit is 1": (
+        "should list all tasks in creation order when limit is greater than table size": (
+            [
+                Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
+                Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+            ],
+            (None, 10),
+            None,
+            [
+                TaskRead(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
+                TaskRead(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+            ],
+        ),
+        "should list incomplete tasks from the open index": (
             [
                 Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
                 Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
             ],
-            (uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"), 1),
+            (None, 10, False),
             None,
             [TaskRead(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False)],
         ),
-        "should raise HTTPException if after_id is invalid": (
+        "should list completed tasks": (
+            [
+                Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+                Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
+            ],
+            (None, 10, True),
+            None,
+            [TaskRead(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True)],
+        ),
+        "should only return the selected fields": (
+            [
+                Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+                Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
+            ],
+            (None, 10, None, "id, is_completed"),
+            None,
+            [
+                TaskPartial(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", is_completed=False),
+                TaskPartial(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", is_completed=True),
+            ],
+        ),
+        "should raise HTTPException if cursor is invalid": (
             [],
-            (uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"), None),
-            (HTTPException, "400: invalid task id"),
+            ("invalid.cursor", 1),
+            (HTTPException, "400: invalid cursor"),
+            None,
+        ),
+        "should raise HTTPException if fields are invalid": (
+            [],
+            (None, 1, None, "id,owner"),
+            (HTTPException, "400: invalid fields: owner"),
             None,
         ),
     }
@@ -116,9 +303,7 @@ class TestServices:
     ):
         """Test list_tasks function."""
         if expected_exc is None:
-            tasks = list_tasks(*opts)
-            for idx in range(len(tasks)):
-                assert tasks[idx] == expected_tasks[idx]
+            assert list_tasks(*opts).items == expected_tasks
             return
 
         with pytest.raises(expected_exc[0]) as exc_info:
@@ -126,6 +311,61 @@ class TestServices:
 
         assert str(exc_info.value) == expected_exc[1]
 
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [
+            [
+                Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+                Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
+                Task(id="130f7f01-4e9a-468c-8daf-bdb6143331f7", description="description_3", is_completed=False),
+            ]
+        ],
+        indirect=True,
+        ids=["should walk all pages with the continuation token"],
+    )
+    def test_list_tasks_pagination(self, setup_test_data):
+        """Test list_tasks paginates with the continuation token."""
+        descriptions = []
+        cursor = None
+        for _ in range(3):
+            page = list_tasks(cursor, 2)
+            descriptions.extend(task.description for task in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert descriptions == ["description_1", "description_2", "description_3"]
+
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [
+            [
+                Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+                Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=False),
+            ]
+        ],
+        indirect=True,
+        ids=["should keep the open index in line with the completion status"],
+    )
+    def test_list_tasks_open_index(self, setup_test_data):
+        """Test list_tasks follows completion status updates and rejects cursors of another listing."""
+        update_task(uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"), TaskUpdate(is_completed=True))
+        assert [task.description for task in list_tasks(None, 10, False).items] == ["description_2"]
+
+        update_task(uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"), TaskUpdate(is_completed=False))
+        page = list_tasks(None, 1, False)
+        assert [task.description for task in page.items] == ["description_1"]
+        assert page.model_dump()["items"][0].keys() == {"description", "is_completed", "id"}
+
+        open_key = {"id": {"S": "0c977aea"}, "open_bucket": {"S": TASKS_BUCKETS[0]}, "created_at": {"S": "2024"}}
+        other_key = {TASKS_BUCKETS[0]: open_key}
+        for cursor_key in (other_key, {"tasks": None}, {TASKS_BUCKETS[0]: {"id": {"S": "0c977aea"}}}):
+            with pytest.raises(HTTPException) as exc_info:
+                list_tasks(encode_cursor(cursor_key, get_cursor_secret()), 1)
+            assert str(exc_info.value) == "400: invalid cursor"
+
     def test_get_task(self):
         """Test get_task function."""
         assert get_task(
@@ -197,7 +437,7 @@ class TestServices:
         is_completed = False
 
         updated_task = update_task(
-            get_task_by_id(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894")),
+            uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"),
             TaskUpdate(description=description, is_completed=is_completed),
         )
 
@@ -217,24 +457,62 @@ class TestServices:
         ids=["should update task"],
     )
     def test_update_task(self, setup_test_data):
-        """Test successfully update task with update_task function."""
-        task = get_task_by_id(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"))
-        task2 = get_task_by_id(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"))
+        """Test update_task only changes the provided fields and checks the If-Match version."""
+        task_id = uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894")
 
-        description = "description_3"
-        is_completed = False
+        updated_task = update_task(task_id, TaskUpdate(is_completed=False), if_match='"1"')
 
-        updated_task = update_task(task, TaskUpdate(description=description, is_completed=is_completed))
-
-        assert updated_task.id == get_task(task).id
-        assert updated_task.description == description
-        assert updated_task.is_completed == is_completed
+        assert updated_task == TaskRead(id=task_id, description="description_2", is_completed=False)
+        assert Task.get(str(task_id)).version == 2  # noqa: PLR2004
 
         # test optimistic locking
-        with pytest.raises(PutError) as exc_info:
-            update_task(task2, TaskUpdate(description=description, is_completed=is_completed))
+        with pytest.raises(HTTPException) as exc_info:
+            update_task(task_id, TaskUpdate(description="description_3"), if_match='"1"')
+
+        assert str(exc_info.value) == "409: task version does not match"
+
+    update_task_errors_test_cases: ClassVar = {
+        "should raise HTTPException if task not found": (
+            uuid.UUID("130f7f01-4e9a-468c-8daf-bdb6143331f7"),
+            None,
+            "404: task not found",
+        ),
+        "should raise HTTPException if task not found with If-Match": (
+            uuid.UUID("130f7f01-4e9a-468c-8daf-bdb6143331f7"),
+            '"1"',
+            "404: task not found",
+        ),
+        "should raise HTTPException if If-Match is invalid": (
+            uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"),
+            "not-a-version",
+            "400: invalid If-Match header",
+        ),
+    }
 
-        assert "ConditionalCheckFailedException" in str(exc_info.value)
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data,task_id,if_match,expected_exc",
+        [
+            (
+                [Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True)],
+                *case,
+            )
+            for case in update_task_errors_test_cases.values()
+        ],
+        ids=update_task_errors_test_cases.keys(),
+        indirect=["setup_test_data"],
+    )
+    def test_update_and_delete_task_errors(
+        self, setup_test_data, task_id: uuid.UUID, if_match: str | None, expected_exc: str
+    ):
+        """Test update_task and delete_task raise HTTPException for missing tasks and invalid headers."""
+        with pytest.raises(HTTPException) as exc_info:
+            update_task(task_id, TaskUpdate(description="description_3"), if_match=if_match)
+        assert str(exc_info.value) == expected_exc
+
+        with pytest.raises(HTTPException) as exc_info:
+            delete_task(task_id, if_match=if_match)
+        assert str(exc_info.value) == expected_exc
 
     @mock_aws
     @pytest.mark.parametrize(
@@ -250,9 +528,141 @@ class TestServices:
     )
     def test_delete_task(self, setup_test_data):
         """Test delete_task function."""
-        delete_task(get_task_by_id(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894")))
-        assert list_tasks(None, 10) == [
+        with pytest.raises(HTTPException) as exc_info:
+            delete_task(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"), if_match='"2"')
+        assert str(exc_info.value) == "409: task version does not match"
+
+        delete_task(uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"), if_match='W/"1"')
+        assert list_tasks(None, 10).items == [
             TaskRead(
                 id=uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"), description="description_1", is_completed=False
             )
         ]
+
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [
+            [
+                Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False),
+                Task(id="edd63ebf-fbc2-4691-bc0c-70a7f78cf894", description="description_2", is_completed=True),
+            ]
+        ],
+        indirect=True,
+        ids=["should report batch get results per task"],
+    )
+    def test_batch_get_tasks(self, setup_test_data):
+        """Test batch_get_tasks function."""
+        assert batch_get_tasks(
+            TaskBatchGet(
+                ids=[
+                    uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"),
+                    uuid.UUID("130f7f01-4e9a-468c-8daf-bdb6143331f7"),
+                ]
+            )
+        ) == TaskBatchResponse(
+            results=[
+                TaskBatchResult(
+                    id=uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"),
+                    status=200,
+                    task=TaskRead(
+                        id=uuid.UUID("edd63ebf-fbc2-4691-bc0c-70a7f78cf894"),
+                        description="description_2",
+                        is_completed=True,
+                    ),
+                ),
+                TaskBatchResult(
+                    id=uuid.UUID("130f7f01-4e9a-468c-8daf-bdb6143331f7"), status=404, error="task not found"
+                ),
+            ]
+        )
+
+    @mock_aws
+    def test_batch_create_tasks(self, setup_test_data):
+        """Test batch_create_tasks function."""
+        resp = batch_create_tasks(
+            TaskBatchCreate(
+                tasks=[
+                    TaskCreate(description="description_1"),
+                    TaskCreate(description="description_2", is_completed=True),
+                ]
+            )
+        )
+
+        assert [result.status for result in resp.results] == [201, 201]
+        for result in resp.results:
+            assert get_task(get_task_by_id(result.id)) == result.task
+        assert get_task_by_id(resp.results[0].id).version == 1
+
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [[Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False)]],
+        indirect=True,
+        ids=["should update existing tasks and report missing tasks"],
+    )
+    def test_batch_update_tasks(self, setup_test_data):
+        """Test batch_update_tasks function."""
+        task_id = uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4")
+
+        resp = batch_update_tasks(
+            TaskBatchUpdate(
+                tasks=[
+                    TaskBatchUpdateItem(id=task_id, is_completed=True),
+                    TaskBatchUpdateItem(id=uuid.UUID("130f7f01-4e9a-468c-8daf-bdb6143331f7"), description="missing"),
+                ]
+            )
+        )
+
+        assert [result.status for result in resp.results] == [200, 404]
+        assert resp.results[0].task == TaskRead(id=task_id, description="description_1", is_completed=True)
+        assert get_task(get_task_by_id(task_id)) == resp.results[0].task
+
+        # concurrent single task updates based on the previous version still fail
+        with pytest.raises(HTTPException) as exc_info:
+            update_task(task_id, TaskUpdate(description="description_2"), if_match='"1"')
+        assert str(exc_info.value) == "409: task version does not match"
+
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [[Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False)]],
+        indirect=True,
+        ids=["should not overwrite a task updated after the batch read it"],
+    )
+    def test_batch_update_tasks_racing_update(self, setup_test_data, monkeypatch):
+        """Test batch_update_tasks reports a conflict for a task updated between its read and its write."""
+        task_id = uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4")
+        batch_get = services.sync_task_repository.batch_get
+
+        def racing_batch_get(task_ids):
+            found = batch_get(task_ids)
+            update_task(task_id, TaskUpdate(description="description_2"))
+            return found
+
+        monkeypatch.setattr(services.sync_task_repository, "batch_get", racing_batch_get)
+        resp = batch_update_tasks(TaskBatchUpdate(tasks=[TaskBatchUpdateItem(id=task_id, description="description_3")]))
+
+        assert [(result.status, result.error) for result in resp.results] == [(409, "task version does not match")]
+        assert get_task(get_task_by_id(task_id)).description == "description_2"
+
+    @mock_aws
+    @pytest.mark.parametrize(
+        "setup_test_data",
+        [[Task(id="0c977aea-c1e3-4f60-b27f-2ba7e24bcca4", description="description_1", is_completed=False)]],
+        indirect=True,
+        ids=["should delete existing tasks and report missing tasks"],
+    )
+    def test_batch_delete_tasks(self, setup_test_data):
+        """Test batch_delete_tasks function."""
+        resp = batch_delete_tasks(
+            TaskBatchDelete(
+                ids=[
+                    uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"),
+                    uuid.UUID("130f7f01-4e9a-468c-8daf-bdb6143331f7"),
+                ]
+            )
+        )
+
+        assert [result.status for result in resp.results] == [204, 404]
+        assert list_tasks(None, 10).items == []
@@ -0,0 +1,104 @@
+import sys
+
+import pytest
+from moto import mock_aws
+from src.app.tasks import stats
+from src.app.tasks.models import Task
+from src.app.tasks.repository import MemoryTaskRepository
+from src.app.tasks.stats import (
+    TASKS_COUNTER,
+    TaskCounter,
+    get_stats,
+    handler,
+    main,
+    rebuild_stats,
+    stream_deltas,
+)
+from starlette import status
+
+from .test_router import setup_test_client
+
+
+def _image(is_completed: bool) -> dict:
+    return {"id": {"S": "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"}, "is_completed": {"BOOL": is_completed}}
+
+
+def _record(old_image: dict | None = None, new_image: dict | None = None) -> dict:
+    change = {"Keys": {"id": {"S": "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"}}}
+    if old_image is not None:
+        change["OldImage"] = old_image
+    if new_image is not None:
+        change["NewImage"] = new_image
+    return {"dynamodb": change}
+
+
+_stream_deltas_test_cases = {
+    "should count inserted tasks": ([_record(new_image=_image(False)), _record(new_image=_image(True))], (2, 1)),
+    "should count completed and reopened tasks": (
+        [_record(_image(False), _image(True)), _record(_image(True), _image(False)), _record(_image(False), _image(True))],
+        (0, 1),
+    ),
+    "should not count overwritten tasks twice": ([_record(_image(True), _image(True))], (0, 0)),
+    "should count removed tasks": ([_record(old_image=_image(True)), _record(old_image=_image(False))], (-2, -1)),
+}
+
+
+@pytest.fixture
+def setup_test_data():
+    """Create empty task and counter tables."""
+    with mock_aws():
+        Task.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        TaskCounter.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+        yield
+
+
+@pytest.mark.parametrize(
+    "records,expected",
+    _stream_deltas_test_cases.values(),
+    ids=_stream_deltas_test_cases.keys(),
+)
+def test_stream_deltas(records: list[dict], expected: tuple[int, int]):
+    """Test stream records are summed into changes of the total and completed counters."""
+    assert stream_deltas(records) == expected
+
+
+def test_handler(setup_test_data):
+    """Test batches of stream records are added to the counters and served by the stats endpoint."""
+    assert get_stats().total == 0
+
+    handler({"Records": [_record(new_image=_image(False)), _record(new_image=_image(True))]}, None)
+    handler({"Records": [_record(_image(False), _image(True))]}, None)
+    handler({"Records": [_record(_image(True), _image(True))]}, None)
+
+    resp = setup_test_client().get("/tasks/stats")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json()["total"] == 2  # noqa: PLR2004
+    assert resp.json()["completed"] == 2  # noqa: PLR2004
+    assert resp.json()["updated_at"] is not None
+
+
+def test_rebuild_stats(setup_test_data, monkeypatch, capsys):
+    """Test the counters are recounted from a scan of the task table, overwriting drifted values."""
+    for index in range(10):
+        Task(id=f"task-{index}", description=f"description_{index}", is_completed=index % 3 == 0).save()
+    TaskCounter(TASKS_COUNTER, total=100, completed=100).save()
+
+    stats = rebuild_stats(segments=3)
+    assert (stats.total, stats.completed) == (10, 4)
+    assert get_stats() == stats
+
+    Task(id="task-10", description="description_10").save()
+    monkeypatch.setattr(sys, "argv", ["stats", "--segments", "2"])
+    assert main() == 0
+    assert '"total": 11' in capsys.readouterr().out
+
+
+def test_rebuild_stats_memory_storage(setup_test_data, monkeypatch):
+    """Test the tasks of the configured repository are recounted, without scanning the task table."""
+    repository = MemoryTaskRepository()
+    for index in range(4):
+        repository.save(Task(id=f"task-{index}", is_completed=index == 0))
+    monkeypatch.setattr(stats, "sync_task_repository", repository)
+
+    assert rebuild_stats(segments=2).total == 4  # noqa: PLR2004
+    assert get_stats().completed == 1
@@ -1,4 +1,6 @@
+from moto import mock_aws
 from src.app.main import app
+from src.app.tasks.models import task_pool_stats
 from starlette import status
 from starlette.testclient import TestClient
 
@@ -11,3 +13,11 @@ def test_list_tasks_validation_error():
     assert resp.json() == {
         "detail": [{"message": "error location: query limit, input should be less than or equal to 100"}]
     }
+
+
+@mock_aws
+def test_lifespan():
+    """Test the app opens the DynamoDB client on startup and closes it on shutdown."""
+    with TestClient(app):
+        assert task_pool_stats() is not None
+    assert task_pool_stats() is None
@@ -0,0 +1,119 @@
+import fakeredis
+import pytest
+from src.app.cache import MemoryCache, RedisCache
+
+_redis_ttl_ms = 1500
+
+
+class FakeClock:
+
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+def test_memory_cache_evicts_least_recently_used():
+    """Test MemoryCache evicts the least recently used entry when full."""
+    cache = MemoryCache(max_size=2, ttl_seconds=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert cache.evictions == 1
+
+
+def test_memory_cache_expires_entries():
+    """Test MemoryCache expires entries after the TTL."""
+    clock = FakeClock()
+    cache = MemoryCache(max_size=2, ttl_seconds=10, clock=clock)
+    cache.set("a", b"1")
+
+    clock.now = 9.9
+    assert cache.get("a") == b"1"
+
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.evictions == 1
+
+
+def test_memory_cache_delete():
+    """Test MemoryCache delete."""
+    cache = MemoryCache(max_size=2, ttl_seconds=60)
+    cache.set("a", b"1")
+    cache.delete("a")
+    cache.delete("b")
+
+    assert cache.get("a") is None
+    assert cache.evictions == 0
+
+
+def test_memory_cache_invalid_size():
+    """Test MemoryCache rejects a non-positive size."""
+    with pytest.raises(ValueError) as exc_info:
+        MemoryCache(max_size=0, ttl_seconds=60)
+    assert str(exc_info.value) == "max_size must be greater than 0"
+
+
+def test_redis_cache():
+    """Test RedisCache against an in-memory Redis server."""
+    client = fakeredis.FakeRedis()
+    cache = RedisCache(client, ttl_seconds=_redis_ttl_ms / 1000)
+    cache.set("a", b"1")
+
+    assert cache.get("a") == b"1"
+    assert 0 < client.pttl("a") <= _redis_ttl_ms
+
+    cache.delete("a")
+    assert cache.get("a") is None
+
+
+def test_memory_cache_update():
+    """Test MemoryCache update stores the replacement of the current value, None keeping it."""
+    cache = MemoryCache(max_size=2, ttl_seconds=60)
+    cache.update("a", lambda current: b"1" if current is None else None)
+    cache.update("a", lambda current: None)
+    cache.update("a", lambda current: (current or b"") + b"2")
+
+    assert cache.get("a") == b"12"
+
+
+def test_redis_cache_update_retries_concurrent_writes():
+    """Test RedisCache update reads the value again when another client changed it during the update."""
+    client = fakeredis.FakeRedis()
+    cache = RedisCache(client, ttl_seconds=_redis_ttl_ms / 1000)
+    seen = []
+
+    def replace(current: bytes | None) -> bytes:
+        seen.append(current)
+        if len(seen) == 1:
+            client.set("a", b"concurrent")
+        return (current or b"") + b"!"
+
+    cache.update("a", replace)
+
+    assert seen == [None, b"concurrent"]
+    assert cache.get("a") == b"concurrent!"
+    assert 0 < client.pttl("a") <= _redis_ttl_ms
+
+
+def test_redis_cache_update_drops_contended_keys():
+    """Test RedisCache update deletes a key changed by another client on every attempt."""
+    client = fakeredis.FakeRedis()
+    cache = RedisCache(client, ttl_seconds=_redis_ttl_ms / 1000)
+
+    def replace(current: bytes | None) -> bytes:
+        client.set("a", b"concurrent")
+        return b"1"
+
+    cache.update("a", replace)
+    assert cache.get("a") is None
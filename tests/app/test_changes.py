@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+import pytest
+from src.app.changes import ChangeEvent, CursorExpiredError, MemoryBroker, create_change_broker
+from src.app.config import Settings
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+def test_memory_broker_read():
+    """Test changes are read in order after a sequence number and dropped past max_size."""
+    broker = MemoryBroker(max_size=3)
+    assert broker.last_seq == 0
+    assert broker.read(0, 10) == []
+
+    for data in (b"1", b"2", b"3", b"4"):
+        broker.publish(data)
+
+    assert broker.last_seq == 4  # noqa: PLR2004
+    assert broker.read(1, 10) == [ChangeEvent(2, b"2"), ChangeEvent(3, b"3"), ChangeEvent(4, b"4")]
+    assert broker.read(2, 1) == [ChangeEvent(3, b"3")]
+    assert broker.read(4, 10) == []
+
+    with pytest.raises(CursorExpiredError, match="changes after 0 were dropped"):
+        broker.read(0, 10)
+    with pytest.raises(CursorExpiredError, match="change 5 was never published"):
+        broker.read(5, 10)
+
+
+def test_memory_broker_epoch():
+    """Test every broker has its own epoch."""
+    assert MemoryBroker(max_size=1).epoch != MemoryBroker(max_size=1).epoch
+    with pytest.raises(ValueError, match="max_size must be greater than 0"):
+        MemoryBroker(max_size=0)
+
+
+@pytest.mark.anyio
+async def test_memory_broker_wait():
+    """Test waiting readers are woken up by changes published from other threads, or time out."""
+    broker = MemoryBroker(max_size=10)
+    assert await broker.wait(0, 0.01) is False
+
+    waiter = asyncio.create_task(broker.wait(0, 5))
+    await asyncio.sleep(0)
+    publisher = threading.Thread(target=broker.publish, args=(b"1",))
+    publisher.start()
+
+    assert await waiter is True
+    publisher.join()
+    assert await broker.wait(0, 5) is True
+
+
+def test_create_change_broker():
+    """Test the change broker is selected by the settings."""
+    assert isinstance(create_change_broker(Settings(db_tasks_table="tasks", changes_max_size=5)), MemoryBroker)
+    assert create_change_broker(Settings(db_tasks_table="tasks", changes_backend="none")) is None
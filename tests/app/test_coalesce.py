@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.app.coalesce import AsyncWriteCoalescer, Changes, WriteCoalescer, WriteCoalescerStats
+
+WINDOW_SECONDS = 0.1
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+def test_write_coalescer():
+    """Test changes submitted for the same key within the window are merged into one write shared by every caller."""
+    coalescer: WriteCoalescer[Changes] = WriteCoalescer(WINDOW_SECONDS)
+    writes = []
+
+    def write(changes: Changes) -> Changes:
+        writes.append(dict(changes))
+        return changes
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        leader = executor.submit(coalescer.submit, "a", {"description": "first", "is_completed": False}, write)
+        while coalescer.stats.updates < 1:
+            threading.Event().wait(0.001)
+        followers = [
+            executor.submit(coalescer.submit, "a", {"description": "second"}, write),
+            executor.submit(coalescer.submit, "a", {"is_completed": True}, write),
+        ]
+        results = [leader.result()] + [follower.result() for follower in followers]
+
+    assert writes == [{"description": "second", "is_completed": True}]
+    assert [result[:2] for result in results] == [
+        ({"description": "second", "is_completed": True}, False),
+        ({"description": "second", "is_completed": True}, True),
+        ({"description": "second", "is_completed": True}, True),
+    ]
+    assert results[0][2] >= WINDOW_SECONDS
+
+    assert coalescer.submit("a", {"description": "third"}, write)[:2] == ({"description": "third"}, False)
+    assert coalescer.submit("b", {"description": "fourth"}, write)[:2] == ({"description": "fourth"}, False)
+    stats = coalescer.stats
+    assert (stats.updates, stats.writes, stats.merge_ratio) == (5, 3, pytest.approx(5 / 3))
+
+
+def test_write_coalescer_max_waiting():
+    """Test batches are closed early once max_waiting threads wait, rather than holding them for the window."""
+    coalescer: WriteCoalescer[Changes] = WriteCoalescer(window_seconds=10.0, max_waiting=1)
+    writes = []
+
+    def write(changes: Changes) -> Changes:
+        writes.append(dict(changes))
+        return changes
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(coalescer.submit, "a", {"description": "first"}, write)
+        while coalescer.stats.updates < 1:
+            threading.Event().wait(0.001)
+        # another key is written at once, the key in its window is closed by the next submission
+        assert coalescer.submit("b", {"description": "other"}, write)[:2] == ({"description": "other"}, False)
+        follower = executor.submit(coalescer.submit, "a", {"is_completed": True}, write)
+        results = [leader.result(timeout=5), follower.result(timeout=5)]
+
+    assert [result[:2] for result in results] == [
+        ({"description": "first", "is_completed": True}, False),
+        ({"description": "first", "is_completed": True}, True),
+    ]
+    assert results[0][2] < coalescer.window_seconds
+    assert writes == [{"description": "other"}, {"description": "first", "is_completed": True}]
+
+    with pytest.raises(ValueError, match="max_waiting must be greater than 0"):
+        WriteCoalescer(WINDOW_SECONDS, max_waiting=0)
+
+
+def test_write_coalescer_error():
+    """Test the exception raised by the write is raised to every caller of the batch, and the next batch is written."""
+    coalescer: WriteCoalescer[Changes] = WriteCoalescer(WINDOW_SECONDS)
+
+    def write(changes: Changes) -> Changes:
+        raise ValueError("write failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(coalescer.submit, "a", {"description": str(idx)}, write) for idx in range(2)]
+        for future in futures:
+            with pytest.raises(ValueError, match="write failed"):
+                future.result()
+
+    assert coalescer.submit("a", {"description": "ok"}, dict)[:2] == ({"description": "ok"}, False)
+    assert WriteCoalescerStats().merge_ratio == 0.0
+
+
+@pytest.mark.anyio
+async def test_async_write_coalescer():
+    """Test concurrent coroutines share one write per key, even when the one which opened the batch is cancelled."""
+    coalescer: AsyncWriteCoalescer[Changes] = AsyncWriteCoalescer(WINDOW_SECONDS)
+    writes = []
+
+    async def write(changes: Changes) -> Changes:
+        writes.append(dict(changes))
+        return changes
+
+    leader = asyncio.create_task(coalescer.submit("a", {"description": "first"}, write))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(coalescer.submit("a", {"is_completed": True}, write))
+    await asyncio.sleep(0)
+    leader.cancel()
+    results = await asyncio.gather(follower, coalescer.submit("b", {"description": "other"}, write))
+
+    assert [result[:2] for result in results] == [
+        ({"description": "first", "is_completed": True}, True),
+        ({"description": "other"}, False),
+    ]
+    assert writes == [{"description": "first", "is_completed": True}, {"description": "other"}]
+    assert (coalescer.stats.updates, coalescer.stats.writes) == (3, 2)
+
+    async def failing_write(changes: Changes) -> Changes:
+        raise ValueError("write failed")
+
+    with pytest.raises(ValueError, match="write failed"):
+        await coalescer.submit("a", {"description": "failed"}, failing_write)
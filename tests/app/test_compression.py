@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mangum import Mangum
+from src.app.compression import CompressionMiddleware, negotiate_encoding
+from starlette import status
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+MIN_SIZE = 100
+LARGE_ITEMS = [{"id": idx, "description": f"description_{idx}"} for idx in range(50)]
+
+_negotiate_encoding_test_cases = {
+    "should not encode without Accept-Encoding": (None, ("br", "gzip"), None),
+    "should prefer the server order on equal quality": ("gzip, deflate, br", ("br", "gzip"), "br"),
+    "should pick the highest quality": ("br;q=0.5, gzip", ("br", "gzip"), "gzip"),
+    "should skip codings the server does not support": ("br", ("gzip",), None),
+    "should accept any coding with a wildcard": ("*", ("gzip",), "gzip"),
+    "should not encode codings refused with q=0": ("gzip;q=0, *;q=0.5", ("br", "gzip"), "br"),
+    "should ignore invalid quality values": ("gzip;q=high", ("gzip",), None),
+}
+
+
+@pytest.fixture
+def lambda_event_loop():
+    """Set the current event loop Mangum runs the app on, as the Lambda runtime does."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def setup_test_app() -> FastAPI:
+    """Set up an app with compressed responses."""
+    test_app = FastAPI()
+    test_app.add_middleware(CompressionMiddleware, min_size=MIN_SIZE)
+
+    @test_app.get("/large")
+    async def large() -> JSONResponse:
+        return JSONResponse(LARGE_ITEMS)
+
+    @test_app.get("/small")
+    async def small() -> JSONResponse:
+        return JSONResponse({"id": 1})
+
+    @test_app.get("/binary")
+    async def binary() -> Response:
+        return Response(b"\x00" * MIN_SIZE * 2, media_type="image/png")
+
+    @test_app.get("/encoded")
+    async def encoded() -> Response:
+        return Response(
+            gzip.compress(b"a" * MIN_SIZE * 2), media_type="text/plain", headers={"Content-Encoding": "gzip"}
+        )
+
+    @test_app.get("/stream")
+    async def stream() -> StreamingResponse:
+        return StreamingResponse(iter([b"a" * MIN_SIZE, b"b" * MIN_SIZE]), media_type="text/plain")
+
+    @test_app.get("/text")
+    async def text() -> PlainTextResponse:
+        return PlainTextResponse("a" * MIN_SIZE)
+
+    return test_app
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,encodings,expected",
+    _negotiate_encoding_test_cases.values(),
+    ids=_negotiate_encoding_test_cases.keys(),
+)
+def test_negotiate_encoding(accept_encoding: str | None, encodings: tuple[str, ...], expected: str | None):
+    """Test the content coding is negotiated from the Accept-Encoding header."""
+    assert negotiate_encoding(accept_encoding, encodings) == expected
+
+
+def test_compression_middleware():
+    """Test large responses of compressible types are gzip compressed and the others pass through unchanged."""
+    client = TestClient(setup_test_app())
+
+    resp = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert int(resp.headers["Content-Length"]) < len(JSONResponse(LARGE_ITEMS).body)
+    assert resp.json() == LARGE_ITEMS
+
+    resp = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert resp.json() == LARGE_ITEMS
+
+    assert client.get("/text", headers={"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+    for path in ("/small", "/binary", "/stream"):
+        resp = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in resp.headers, path
+        assert "Vary" not in resp.headers, path
+    assert client.get("/stream").text == "a" * MIN_SIZE + "b" * MIN_SIZE
+
+    resp = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert resp.text == "a" * MIN_SIZE * 2
+
+
+def test_compression_middleware_brotli():
+    """Test responses are brotli compressed when the brotli extra is installed and the client accepts it."""
+    pytest.importorskip("brotli")
+    client = TestClient(setup_test_app())
+
+    resp = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "br"
+    assert resp.json() == LARGE_ITEMS
+
+
+def test_compression_middleware_mangum(lambda_event_loop):
+    """Test compressed responses returned through Mangum decode back to the original body."""
+    handler = Mangum(setup_test_app(), lifespan="off")
+    event = {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": "/large",
+        "rawQueryString": "",
+        "headers": {"accept-encoding": "gzip", "host": "api.example.com"},
+        "requestContext": {
+            "http": {"method": "GET", "path": "/large", "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1"},
+            "stage": "$default",
+        },
+        "isBase64Encoded": False,
+    }
+
+    result = handler(event, {})
+
+    assert result["statusCode"] == status.HTTP_200_OK
+    assert result["headers"]["content-encoding"] == "gzip"
+    body = base64.b64decode(result["body"]) if result["isBase64Encoded"] else result["body"].encode("utf-8")
+    assert gzip.decompress(body) == JSONResponse(LARGE_ITEMS).body
@@ -5,18 +5,18 @@ from src.app.config import Settings
 _settings_test_cases = {
     "should load settings from environment variables": (
         {"DEBUG": "true", "DB_HOST": "http://dynamodb:8000", "DB_TASKS_TABLE": "test_tasks"},
-        Settings(
-            project_name="Todo List",
-            api_prefix="/v1",
-            debug=True,
-            db_host="http://dynamodb:8000",
-            db_tasks_table="test_tasks",
-        ),
+        {
+            "project_name": "Todo List",
+            "api_prefix": "/v1",
+            "debug": True,
+            "db_host": "http://dynamodb:8000",
+            "db_tasks_table": "test_tasks",
+        },
         None,
     ),
     "should raise ValidationError if environment variables missing": (
         {"DEBUG": "true", "DB_HOST": "http://dynamodb:8000"},
-        Settings(debug=True, db_host="http://dynamodb:8000", db_tasks_table="test_tasks"),
+        {"debug": True, "db_host": "http://dynamodb:8000", "db_tasks_table": "test_tasks"},
         ValidationError,
     ),
 }
@@ -28,11 +28,19 @@ _settings_test_cases = {
     ids=_settings_test_cases.keys(),
     indirect=["setup_env"],
 )
-def test_settings(setup_env, expected_settings, expected_exc: Exception):
+def test_settings(setup_env, expected_settings: dict, expected_exc: Exception):
     """Test settings."""
     if expected_exc is None:
-        assert Settings() == expected_settings
+        # built within the test environment, the variables of the outer environment are not read
+        assert Settings() == Settings(**expected_settings)
         return
 
     with pytest.raises(expected_exc):
         Settings()
+
+
+def test_settings_version():
+    """Test the statically configured app version takes precedence over the module version."""
+    assert Settings(db_tasks_table="test_tasks", app_version="1.2.3").version == "1.2.3"
+    default = Settings(db_tasks_table="test_tasks").version
+    assert Settings(db_tasks_table="test_tasks", app_version="").version == default
@@ -0,0 +1,48 @@
+import pytest
+from src.app.cursor import InvalidCursorError, decode_cursor, encode_cursor
+
+_secret = b"test-secret"
+_key = {"id": {"S": "0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"}, "bucket": {"S": "tasks"}}
+
+_decode_cursor_test_cases = {
+    "should decode cursor signed with the same secret": (
+        encode_cursor(_key, _secret),
+        _secret,
+        None,
+        _key,
+    ),
+    "should raise InvalidCursorError if secret does not match": (
+        encode_cursor(_key, _secret),
+        b"another-secret",
+        (InvalidCursorError, "invalid cursor signature"),
+        None,
+    ),
+    "should raise InvalidCursorError if payload is tampered": (
+        "e30." + encode_cursor(_key, _secret).partition(".")[2],
+        _secret,
+        (InvalidCursorError, "invalid cursor signature"),
+        None,
+    ),
+    "should raise InvalidCursorError if cursor is malformed": (
+        "not-a-cursor",
+        _secret,
+        (InvalidCursorError, "invalid cursor signature"),
+        None,
+    ),
+}
+
+
+@pytest.mark.parametrize(
+    "cursor,secret,expected_exc,expected_key",
+    _decode_cursor_test_cases.values(),
+    ids=_decode_cursor_test_cases.keys(),
+)
+def test_decode_cursor(cursor: str, secret: bytes, expected_exc: tuple | None, expected_key: dict | None):
+    """Test decode_cursor function."""
+    if expected_exc is None:
+        assert decode_cursor(cursor, secret) == expected_key
+        return
+
+    with pytest.raises(expected_exc[0]) as exc_info:
+        decode_cursor(cursor, secret)
+    assert str(exc_info.value) == expected_exc[1]
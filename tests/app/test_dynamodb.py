@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+from moto.server import ThreadedMotoServer
+from pynamodb.connection import Connection
+from src.app.config import Settings
+from src.app.dynamodb import PoolStats, client_options, configure_client, pool_stats
+from src.app.tasks.models import Task
+
+TABLE_NAME = "test-dynamodb-table"
+
+
+@pytest.fixture(scope="module")
+def moto_server():
+    """Start a moto server, so requests go through the connection pool of the client."""
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint_url = f"http://{host}:{port}"
+    boto3.client(
+        "dynamodb",
+        endpoint_url=endpoint_url,
+        region_name="us-east-1",
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+    ).create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    yield endpoint_url
+    server.stop()
+
+
+def test_configure_client(monkeypatch):
+    """Test the botocore client of a connection is created with the timeouts, retries and keepalive of the settings."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    config = Settings(
+        db_tasks_table="tasks",
+        db_connect_timeout_seconds=0.5,
+        db_read_timeout_seconds=1.5,
+        db_max_pool_connections=3,
+        db_retry_mode="adaptive",
+        db_max_attempts=2,
+        db_tcp_keepalive=True,
+    )
+    connection = Connection(region="us-east-1")
+
+    configure_client(connection, config)
+
+    client_config = connection.client.meta.config
+    assert (client_config.connect_timeout, client_config.read_timeout) == (0.5, 1.5)
+    assert client_config.max_pool_connections == 3  # noqa: PLR2004
+    assert client_config.retries == {"mode": "adaptive", "total_max_attempts": 2}
+    assert client_config.tcp_keepalive
+    assert client_options(config)["retries"] == client_config.retries
+    # kept by the client PynamoDB creates again without credentials
+    assert connection._max_retry_attempts_exception == 1
+
+    monkeypatch.setattr(Task, "_connection", None)
+    assert Task._get_connection().connection.client.meta.config.retries["mode"] == "standard"
+
+
+def test_pool_stats(moto_server, monkeypatch):
+    """Test the connections in use and idle are counted and connections discarded by a full pool are reported."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    connection = Connection(region="us-east-1", host=moto_server)
+    configure_client(connection, Settings(db_tasks_table="tasks", db_max_pool_connections=1))
+    client = connection.client
+
+    stats = pool_stats(client)
+    assert (stats.max_connections, stats.in_use, stats.idle) == (1, 0, 0)
+
+    client.describe_table(TableName=TABLE_NAME)
+    assert pool_stats(client) == PoolStats(max_connections=1, idle=1, discarded=stats.discarded)
+
+    barrier = threading.Barrier(4)
+
+    def describe_table(_: int) -> None:
+        barrier.wait()
+        client.describe_table(TableName=TABLE_NAME)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(describe_table, range(4)))
+
+    stats_after = pool_stats(client)
+    assert stats_after.in_use == 0
+    assert stats_after.discarded > stats.discarded
@@ -1,6 +1,8 @@
 import pytest
+from botocore.exceptions import ClientError
 from fastapi.exceptions import RequestValidationError
-from src.app.exception_handlers import validation_exception_handler
+from pynamodb.exceptions import GetError, PutError
+from src.app.exception_handlers import throttling_exception_handler, validation_exception_handler
 from starlette import status
 from starlette.responses import JSONResponse
 
@@ -39,3 +41,20 @@ def test_validation_exception_handler(exc: Exception, expected_exc, expected_res
     with pytest.raises(expected_exc[0]) as exc_info:
         validation_exception_handler(None, exc)
     assert str(exc_info.value) == expected_exc[1]
+
+
+def _client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": "message"}}, "GetItem")
+
+
+def test_throttling_exception_handler():
+    """Test DynamoDB throttling is answered with 503 and Retry-After, other errors are raised again."""
+    exc = GetError("throttled", _client_error("ProvisionedThroughputExceededException"))
+    resp = throttling_exception_handler(None, exc)
+    assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert resp.headers["Retry-After"] == "1"
+    assert resp.body == b'{"detail":[{"message":"database is throttling requests, please retry"}]}'
+
+    exc = PutError("failed", _client_error("ConditionalCheckFailedException"))
+    with pytest.raises(PutError):
+        throttling_exception_handler(None, exc)
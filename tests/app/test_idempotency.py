@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from moto import mock_aws
+from src.app.idempotency import (
+    REPLAYED_HEADER,
+    DynamoDBIdempotencyStore,
+    IdempotencyMiddleware,
+    IdempotencyModel,
+    IdempotencyPolicy,
+    IdempotencyRecord,
+    IdempotencyStore,
+    MemoryIdempotencyStore,
+)
+from starlette import status
+from starlette.responses import JSONResponse
+
+IdempotencyModel.Meta.table_name = "test-idempotency-table"
+IdempotencyModel.Meta.host = None
+
+TTL_SECONDS = 60.0
+COMPLETED = IdempotencyRecord(
+    fingerprint="abc",
+    status_code=status.HTTP_201_CREATED,
+    headers=[("content-type", "application/json")],
+    body=b'{"id":1}',
+    expires_at=0.0,
+)
+
+
+class FakeClock:
+
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+def setup_test_client(store: IdempotencyStore, wait_seconds: float = 1.0) -> httpx.AsyncClient:
+    """Set up a test client for an app creating items, which fails for negative values."""
+    test_app = FastAPI()
+    counter = itertools.count(1)
+    test_app.add_middleware(
+        IdempotencyMiddleware,
+        store=store,
+        paths=["/items"],
+        policy=IdempotencyPolicy(ttl_seconds=TTL_SECONDS, wait_seconds=wait_seconds),
+    )
+
+    @test_app.post("/items", status_code=status.HTTP_201_CREATED)
+    async def create_item(item: dict[str, int]) -> JSONResponse:
+        await asyncio.sleep(0.1)
+        if item["value"] < 0:
+            return JSONResponse({"detail": "failed"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return JSONResponse({"id": next(counter), **item}, status_code=status.HTTP_201_CREATED)
+
+    @test_app.post("/other")
+    async def create_other() -> dict[str, int]:
+        return {"id": next(counter)}
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=test_app), base_url="http://test")
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+def test_memory_idempotency_store():
+    """Test keys are reserved once, hold their response and expire."""
+    clock = FakeClock()
+    store = MemoryIdempotencyStore(clock=clock)
+
+    assert store.reserve("key", "abc", TTL_SECONDS) is None
+    assert store.reserve("key", "abc", TTL_SECONDS) == IdempotencyRecord(fingerprint="abc", expires_at=1060.0)
+
+    store.complete("key", COMPLETED.model_copy(update={"expires_at": 1060.0}))
+    assert store.get("key").completed
+
+    clock.now = 1060.0
+    assert store.get("key") is None
+    assert store.reserve("key", "def", TTL_SECONDS) is None
+
+    store.release("key")
+    assert store.get("key") is None
+
+
+def test_memory_idempotency_store_max_keys():
+    """Test the oldest keys are dropped once the store holds max_keys keys."""
+    store = MemoryIdempotencyStore(max_keys=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        assert store.reserve(key, "abc", TTL_SECONDS) is None
+
+    assert store.get("a") is None
+    assert store.get("b") is not None
+    assert store.get("c") is not None
+
+    with pytest.raises(ValueError, match="max_keys must be greater than 0"):
+        MemoryIdempotencyStore(max_keys=0)
+
+
+@mock_aws
+def test_dynamodb_idempotency_store():
+    """Test keys are reserved with a conditional put, hold their response and can be released."""
+    IdempotencyModel.create_table(read_capacity_units=1, write_capacity_units=1, wait=True)
+    store = DynamoDBIdempotencyStore()
+
+    assert store.reserve("key", "abc", TTL_SECONDS) is None
+    record = store.reserve("key", "abc", TTL_SECONDS)
+    assert record is not None
+    assert not record.completed
+
+    store.complete("key", COMPLETED.model_copy(update={"expires_at": record.expires_at}))
+    assert store.get("key") == COMPLETED.model_copy(update={"expires_at": record.expires_at})
+
+    store.release("key")
+    assert store.get("key") is None
+    assert store.reserve("key", "abc", -1) is None
+    assert store.get("key") is None
+    assert store.reserve("key", "def", TTL_SECONDS) is None
+
+
+@pytest.mark.anyio
+async def test_idempotency_middleware():
+    """Test retries with the same key replay the stored response and keys cannot be reused for other requests."""
+    async with setup_test_client(MemoryIdempotencyStore()) as client:
+        first = await client.post("/items", json={"value": 1}, headers={"Idempotency-Key": "a"})
+        retry = await client.post("/items", json={"value": 1}, headers={"Idempotency-Key": "a"})
+        assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+        assert first.json() == retry.json() == {"id": 1, "value": 1}
+        assert REPLAYED_HEADER not in first.headers
+        assert retry.headers[REPLAYED_HEADER] == "true"
+
+        resp = await client.post("/items", json={"value": 2}, headers={"Idempotency-Key": "a"})
+        assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        resp = await client.post("/items", json={"value": 1}, headers={"Idempotency-Key": "x" * 256})
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+        assert (await client.post("/items", json={"value": 1})).json()["id"] == 2  # noqa: PLR2004
+        assert (await client.post("/other", headers={"Idempotency-Key": "a"})).json()["id"] == 3  # noqa: PLR2004
+
+        # keys are scoped to the client
+        resp = await client.post("/items", json={"value": 1}, headers={"Idempotency-Key": "a", "X-API-Key": "other"})
+        assert resp.json() == {"id": 4, "value": 1}
+        assert REPLAYED_HEADER not in resp.headers
+
+
+@pytest.mark.anyio
+async def test_idempotency_middleware_concurrent_requests():
+    """Test concurrent requests with the same key are handled once and server errors are not stored."""
+    async with setup_test_client(MemoryIdempotencyStore()) as client:
+        responses = await asyncio.gather(
+            *(client.post("/items", json={"value": 1}, headers={"Idempotency-Key": "a"}) for _ in range(3))
+        )
+        assert {resp.json()["id"] for resp in responses} == {1}
+        assert sum(REPLAYED_HEADER in resp.headers for resp in responses) == 2  # noqa: PLR2004
+
+        for _ in range(2):
+            resp = await client.post("/items", json={"value": -1}, headers={"Idempotency-Key": "b"})
+            assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert REPLAYED_HEADER not in resp.headers
+
+    async with setup_test_client(MemoryIdempotencyStore(), wait_seconds=0.0) as client:
+        responses = await asyncio.gather(
+            *(client.post("/items", json={"value": 1}, headers={"Idempotency-Key": "a"}) for _ in range(2))
+        )
+        assert sorted(resp.status_code for resp in responses) == [status.HTTP_201_CREATED, status.HTTP_409_CONFLICT]
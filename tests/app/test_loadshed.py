@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import httpx
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.session import get_session
+from fastapi import FastAPI
+from src.app import loadshed
+from src.app.loadshed import (
+    DynamoDBHealth,
+    HealthStats,
+    LoadShedder,
+    LoadSheddingMiddleware,
+    LoadSheddingPolicy,
+    install_health_hooks,
+)
+from starlette import status
+
+from .test_idempotency import FakeClock
+
+MAX_IN_FLIGHT = 20
+_policy = LoadSheddingPolicy(max_in_flight=MAX_IN_FLIGHT, latency_target_seconds=0.1, max_throttle_rate=0.05)
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+def test_dynamodb_health():
+    """Test the latency and throttle rate are computed over the calls of the window, every attempt counting."""
+    clock = FakeClock()
+    health = DynamoDBHealth(window_seconds=10, clock=clock)
+    assert health.stats == HealthStats(calls=0, mean_latency=0.0, throttle_rate=0.0)
+
+    health.record(0.1)
+    clock.now += 5
+    health.record(0.3, attempts=3, throttled=2)
+    assert health.stats == pytest.approx(HealthStats(calls=2, mean_latency=0.2, throttle_rate=0.5))
+
+    clock.now += 5
+    assert health.stats == pytest.approx(HealthStats(calls=1, mean_latency=0.3, throttle_rate=2 / 3))
+    clock.now += 5
+    assert health.stats.calls == 0
+
+
+class _Raw:
+
+    """Raw HTTP response body, as read by botocore."""
+
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def stream(self) -> Iterator[bytes]:
+        """Yield the body."""
+        yield self._body
+
+
+def test_health_hooks(monkeypatch):
+    """Test the throttled attempts the client retries recovered from are counted."""
+    health = DynamoDBHealth()
+    monkeypatch.setattr(loadshed, "dynamodb_health", health)
+    install_health_hooks()
+    client = get_session().create_client(
+        "dynamodb",
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+        config=Config(retries={"mode": "standard", "total_max_attempts": 3}),
+    )
+    bodies = [
+        (status.HTTP_400_BAD_REQUEST, {"__type": "ThrottlingException", "message": "Rate exceeded"}),
+        (status.HTTP_400_BAD_REQUEST, {"__type": "ThrottlingException", "message": "Rate exceeded"}),
+        (status.HTTP_200_OK, {}),
+    ]
+
+    def send(request: Any, **_: Any) -> AWSResponse:
+        status_code, body = bodies.pop(0)
+        return AWSResponse(request.url, status_code, {}, _Raw(json.dumps(body).encode()))
+
+    client.meta.events.register("before-send.dynamodb.GetItem", send)
+    monkeypatch.setattr(time, "sleep", lambda _: None)
+    client.get_item(TableName="tasks", Key={"id": {"S": "task-1"}})
+
+    assert health.stats.calls == 1
+    assert health.stats.throttle_rate == pytest.approx(2 / 3)
+
+
+def test_load_shedder():
+    """Test the in-flight limit is halved while DynamoDB is slow or throttling, and grows back once it recovered."""
+    clock = FakeClock()
+    health = DynamoDBHealth(clock=clock)
+    shedder = LoadShedder(_policy, health=health, clock=clock)
+
+    assert all(shedder.try_acquire() for _ in range(MAX_IN_FLIGHT))
+    assert not shedder.try_acquire()
+    for _ in range(MAX_IN_FLIGHT):
+        shedder.release()
+
+    # halved on slow calls
+    health.record(0.5)
+    clock.now += 1
+    assert shedder.try_acquire()
+    assert shedder.limit == MAX_IN_FLIGHT // 2
+
+    # halved down to min_in_flight while throttled, the requests already admitted stay in flight
+    health.record(0.01, throttled=1)
+    for _ in range(5):
+        clock.now += 1
+        shedder.try_acquire()
+    assert shedder.limit == _policy.min_in_flight
+    assert shedder.in_flight == _policy.min_in_flight + 1
+
+    # grows back by a tenth of max_in_flight once healthy
+    clock.now += 10
+    shedder.release()
+    assert shedder.try_acquire()
+    assert shedder.limit == _policy.min_in_flight + MAX_IN_FLIGHT // 10
+
+    with pytest.raises(ValueError, match="min_in_flight must be greater than 0 and at most max_in_flight"):
+        LoadShedder(_policy._replace(max_in_flight=1, min_in_flight=2))
+
+
+@pytest.mark.anyio
+async def test_load_shedding_middleware():
+    """Test requests over the limit are answered 503 with Retry-After, exempt paths are always handled."""
+    test_app = FastAPI()
+    shedder = LoadShedder(_policy._replace(max_in_flight=1))
+    test_app.add_middleware(LoadSheddingMiddleware, shedder=shedder, exempt_paths=["/stream"])
+
+    @test_app.get("/items")
+    async def list_items() -> list[int]:
+        await asyncio.sleep(0.1)
+        return []
+
+    @test_app.get("/stream")
+    async def stream() -> list[int]:
+        return []
+
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/items"))
+        await asyncio.sleep(0.05)
+
+        resp = await client.get("/items")
+        assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert resp.headers["Retry-After"] == "1"
+        assert resp.json() == {"detail": [{"message": "service overloaded, please retry"}]}
+        assert (await client.get("/stream")).status_code == status.HTTP_200_OK
+
+        assert (await first).status_code == status.HTTP_200_OK
+    assert shedder.in_flight == 0
@@ -0,0 +1,102 @@
+import json
+import logging
+
+import pytest
+from botocore.session import get_session
+from fastapi import FastAPI
+from moto import mock_aws
+from src.app.dynamodb import PoolStats
+from src.app.metrics import (
+    UNMATCHED_ROUTE,
+    DynamoDBMetricsMiddleware,
+    _consumed_capacity_units,
+    current_metrics,
+    install_dynamodb_hooks,
+)
+from starlette import status
+from starlette.testclient import TestClient
+
+TABLE_NAME = "test-metrics-table"
+DYNAMODB_CALLS = 3
+
+_consumed_capacity_test_cases = {
+    "should return 0 if consumed capacity is missing": (None, 0.0),
+    "should return capacity units of single item operations": ({"TableName": "tasks", "CapacityUnits": 0.5}, 0.5),
+    "should sum capacity units of batch operations": (
+        [{"TableName": "tasks", "CapacityUnits": 1.0}, {"TableName": "other", "CapacityUnits": 2.5}],
+        3.5,
+    ),
+}
+
+
+def setup_test_client(emf_namespace: str | None = None, pool_stats: PoolStats | None = None) -> TestClient:
+    """Set up a test client for an app reading an item from DynamoDB."""
+    install_dynamodb_hooks()
+    test_app = FastAPI()
+    test_app.add_middleware(DynamoDBMetricsMiddleware, emf_namespace=emf_namespace, pool_stats=lambda: pool_stats)
+
+    @test_app.get("/items/{item_id}")
+    def get_item(item_id: str) -> dict[str, bool]:
+        client = get_session().create_client("dynamodb", region_name="us-east-1")
+        client.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        client.put_item(TableName=TABLE_NAME, Item={"id": {"S": item_id}})
+        item = client.get_item(TableName=TABLE_NAME, Key={"id": {"S": item_id}})
+        return {"found": "Item" in item}
+
+    return TestClient(test_app)
+
+
+@mock_aws
+def test_dynamodb_metrics_middleware(caplog, capsys):
+    """Test the DynamoDB calls of a request are returned in Server-Timing, logged and written as EMF."""
+    with caplog.at_level(logging.INFO, logger="src.app.metrics"):
+        resp = setup_test_client(
+            emf_namespace="TestNamespace", pool_stats=PoolStats(max_connections=10, in_use=4, idle=2)
+        ).get("/items/abc")
+
+    assert resp.json() == {"found": True}
+    assert resp.headers["Server-Timing"].startswith("db;dur=")
+    assert f"{DYNAMODB_CALLS} calls" in resp.headers["Server-Timing"]
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["method"] == "GET"
+    assert record["route"] == "/items/{item_id}"
+    assert record["status"] == status.HTTP_200_OK
+    assert record["dynamodb"]["calls"] == DYNAMODB_CALLS
+    assert set(record["dynamodb"]["operations"]) == {"CreateTable", "PutItem", "GetItem"}
+    assert record["dynamodb"]["read_capacity_units"] > 0
+    assert record["pool"] == {"max_connections": 10, "in_use": 4, "idle": 2, "discarded": 0}
+
+    emf = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert emf["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "TestNamespace"
+    assert emf["Route"] == "/items/{item_id}"
+    assert emf["DynamoDBCalls"] == DYNAMODB_CALLS
+    assert emf["PoolUtilization"] == 40.0  # noqa: PLR2004
+
+
+def test_dynamodb_metrics_middleware_unmatched_route(caplog, capsys):
+    """Test requests not matching a route are logged without EMF output."""
+    with caplog.at_level(logging.INFO, logger="src.app.metrics"):
+        resp = setup_test_client().get("/unknown")
+
+    assert resp.headers["Server-Timing"].startswith('db;dur=0.00;desc="0 calls')
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["route"] == UNMATCHED_ROUTE
+    assert "pool" not in record
+    assert capsys.readouterr().out == ""
+    assert current_metrics() is None
+
+
+@pytest.mark.parametrize(
+    "consumed,expected",
+    _consumed_capacity_test_cases.values(),
+    ids=_consumed_capacity_test_cases.keys(),
+)
+def test_consumed_capacity_units(consumed: dict | list | None, expected: float):
+    """Test consumed capacity is summed across tables."""
+    assert _consumed_capacity_units(consumed) == expected
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from src.app.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, ProfilingMiddleware, ProfilingPolicy, StackSampler
+from starlette import status
+from starlette.testclient import TestClient
+
+
+def _busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_stack_sampler():
+    """Test the sampler records the stacks of the other threads as collapsed stacks."""
+    sampler = StackSampler(interval_seconds=0.001)
+    sampler.start()
+    _busy(0.1)
+    sampler.stop()
+
+    assert sampler.samples > 0
+    assert any(stack.startswith("MainThread;") and "_busy" in stack for stack in sampler.stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in sampler.collapsed().splitlines())
+
+
+def _client(policy: ProfilingPolicy, **kwargs) -> TestClient:
+    test_app = FastAPI()
+    test_app.add_middleware(ProfilingMiddleware, policy=policy._replace(interval_seconds=0.001), **kwargs)
+
+    @test_app.get("/items/{item_id}")
+    def get_item(item_id: int) -> int:
+        _busy(0.05)
+        return item_id
+
+    return TestClient(test_app)
+
+
+def test_profiling_middleware_token(tmp_path):
+    """Test requests with the debug token are profiled to the output directory, the others are not."""
+    client = _client(ProfilingPolicy(token="secret", output_dir=tmp_path))
+
+    resp = client.get("/items/1", headers={PROFILE_HEADER: "secret", "X-Request-ID": "request-1"})
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers[PROFILE_ID_HEADER] == "request-1"
+    profile = (tmp_path / "GET_items_item_id-request-1.collapsed").read_text()
+    assert "get_item" in profile
+
+    for headers in ({PROFILE_HEADER: "wrong"}, {}):
+        resp = client.get("/items/1", headers=headers)
+        assert PROFILE_ID_HEADER not in resp.headers
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_profiling_middleware_sample_rate(caplog):
+    """Test drawn requests are profiled to the log with their route and request id."""
+    draws = iter([0.05, 0.5])
+    client = _client(ProfilingPolicy(sample_rate=0.1), sample=lambda: next(draws))
+
+    with caplog.at_level(logging.INFO, logger="src.app.profiling"):
+        profiled = client.get("/items/1")
+        assert PROFILE_ID_HEADER not in client.get("/items/2").headers
+
+    records = [json.loads(record.getMessage()) for record in caplog.records if record.getMessage().startswith("{")]
+    assert [(record["profile"], record["route"]) for record in records] == [
+        (profiled.headers[PROFILE_ID_HEADER], "/items/{item_id}")
+    ]
+    assert records[0]["samples"] > 0
+    assert (records[0]["scope"], records[0]["overlapping_requests"]) == ("process", 0)
+
+    with pytest.raises(ValueError, match="sample_rate must be between 0 and 1"):
+        ProfilingMiddleware(FastAPI(), ProfilingPolicy(sample_rate=2))
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_profiling_middleware_overlapping_requests(caplog):
+    """Test the requests handled while a request is profiled are counted in its profile."""
+    test_app = FastAPI()
+    test_app.add_middleware(ProfilingMiddleware, policy=ProfilingPolicy(token="secret", interval_seconds=0.001))
+
+    @test_app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> int:
+        await asyncio.sleep(0.05)
+        return item_id
+
+    transport = httpx.ASGITransport(app=test_app)
+    with caplog.at_level(logging.INFO, logger="src.app.profiling"):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(
+                client.get("/items/1"),
+                client.get("/items/2", headers={PROFILE_HEADER: "secret"}),
+                client.get("/items/3"),
+            )
+
+    records = [json.loads(record.getMessage()) for record in caplog.records if record.getMessage().startswith("{")]
+    assert [record["overlapping_requests"] for record in records] == [2]
@@ -0,0 +1,88 @@
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from src.app.config import Settings
+from src.app.ratelimit import (
+    MemoryRateLimitStore,
+    RateLimitMiddleware,
+    RedisRateLimitStore,
+    create_rate_limit_store,
+    take_token,
+)
+from starlette import status
+from starlette.testclient import TestClient
+
+from .test_idempotency import FakeClock
+
+_take_token_test_cases = {
+    "should take a token from a full bucket": ((5.0, 0.0, 0.0, 1.0, 5), (4.0, 0.0)),
+    "should refill the bucket up to burst": ((0.0, 0.0, 100.0, 1.0, 5), (4.0, 0.0)),
+    "should refill the bucket at rate": ((0.0, 0.0, 0.5, 4.0, 5), (1.0, 0.0)),
+    "should return the seconds until a token is available": ((0.0, 0.0, 0.25, 1.0, 5), (0.25, 0.75)),
+}
+
+
+@pytest.mark.parametrize("args,expected", _take_token_test_cases.values(), ids=_take_token_test_cases.keys())
+def test_take_token(args: tuple, expected: tuple[float, float]):
+    """Test take_token refills the bucket and takes a token if one is available."""
+    assert take_token(*args) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "store_factory",
+    [
+        lambda clock: MemoryRateLimitStore(clock=clock),
+        lambda clock: RedisRateLimitStore(fakeredis.FakeRedis(), clock=clock),
+    ],
+    ids=["memory", "redis"],
+)
+def test_rate_limit_store(store_factory):
+    """Test every client has its own bucket, refilled over time."""
+    clock = FakeClock()
+    store = store_factory(clock)
+
+    assert [store.take("a", 1.0, 2) for _ in range(3)] == pytest.approx([0.0, 0.0, 1.0])
+    assert store.take("b", 1.0, 2) == 0.0
+
+    clock.now += 0.5
+    assert store.take("a", 1.0, 2) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert store.take("a", 1.0, 2) == 0.0
+
+
+def test_memory_rate_limit_store_max_keys():
+    """Test the buckets of the least recently seen clients are dropped."""
+    store = MemoryRateLimitStore(max_keys=1, clock=FakeClock())
+    assert store.take("a", 1.0, 1) == 0.0
+    assert store.take("b", 1.0, 1) == 0.0
+    assert store.take("a", 1.0, 1) == 0.0
+
+    with pytest.raises(ValueError, match="max_keys must be greater than 0"):
+        MemoryRateLimitStore(max_keys=0)
+
+
+def test_create_rate_limit_store():
+    """Test the rate limit store is selected by the settings."""
+    store = create_rate_limit_store(Settings(db_tasks_table="tasks", rate_limit_backend="memory"))
+    assert isinstance(store, MemoryRateLimitStore)
+    assert create_rate_limit_store(Settings(db_tasks_table="tasks")) is None
+
+
+def test_rate_limit_middleware():
+    """Test clients are limited by API key, or address, and answered 429 with Retry-After."""
+    test_app = FastAPI()
+    test_app.add_middleware(RateLimitMiddleware, store=MemoryRateLimitStore(clock=FakeClock()), rate=0.5, burst=1)
+
+    @test_app.get("/items")
+    async def list_items() -> list[int]:
+        return []
+
+    client = TestClient(test_app)
+    assert client.get("/items").status_code == status.HTTP_200_OK
+    assert client.get("/items", headers={"X-API-Key": "a"}).status_code == status.HTTP_200_OK
+
+    resp = client.get("/items", headers={"X-API-Key": "a"})
+    assert resp.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert resp.headers["Retry-After"] == "2"
+    assert resp.json() == {"detail": [{"message": "rate limit exceeded"}]}
+    assert client.get("/items").status_code == status.HTTP_429_TOO_MANY_REQUESTS
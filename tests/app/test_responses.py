@@ -0,0 +1,29 @@
+import uuid
+
+import pytest
+from src.app.responses import ModelResponse
+from src.app.tasks.schemas import TaskPage, TaskRead
+
+
+def test_model_response():
+    """Test ModelResponse encodes models straight to JSON bytes."""
+    task_id = uuid.UUID("0c977aea-c1e3-4f60-b27f-2ba7e24bcca4")
+    page = TaskPage.model_construct(
+        items=[TaskRead.model_construct(id=task_id, description="description_1", is_completed=False)],
+        next_cursor=None,
+    )
+
+    resp = ModelResponse(page, headers={"ETag": '"1"'})
+
+    assert resp.body == (
+        b'{"items":[{"description":"description_1","is_completed":false,'
+        b'"id":"0c977aea-c1e3-4f60-b27f-2ba7e24bcca4"}],"next_cursor":null}'
+    )
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.headers["etag"] == '"1"'
+
+
+def test_model_response_unsupported_type():
+    """Test ModelResponse rejects content that is not JSON serializable."""
+    with pytest.raises(TypeError):
+        ModelResponse({"value": object()})
@@ -0,0 +1,60 @@
+import os
+import types
+
+import pytest
+from src.app import server
+from src.app.config import Settings
+
+
+def test_server_options():
+    """Test the uvicorn options follow the settings, with a worker per CPU by default."""
+    options = server.server_options(Settings(db_tasks_table="tasks"))
+    assert options["workers"] == os.cpu_count()
+    assert (options["port"], options["backlog"], options["lifespan"]) == (8080, 2048, "on")
+    assert not options["access_log"]
+
+    options = server.server_options(
+        Settings(db_tasks_table="tasks", server_workers=2, server_limit_concurrency=100, metrics_enabled=False)
+    )
+    assert (options["workers"], options["limit_concurrency"], options["access_log"]) == (2, 100, True)
+
+
+def test_worker_environment():
+    """Test several workers require shared idempotency keys and run without the in-memory change feed."""
+    config = Settings(db_tasks_table="tasks", idempotency_backend="dynamodb")
+    assert server.worker_environment(config, 1) == {}
+    assert server.worker_environment(config, 2) == {"CHANGES_BACKEND": "none"}
+    assert server.worker_environment(config.model_copy(update={"changes_backend": "none"}), 2) == {}
+    assert server.worker_environment(Settings(db_tasks_table="tasks"), 1) == {}
+
+    with pytest.raises(ValueError, match="IDEMPOTENCY_BACKEND=memory keeps the keys of each of the 2 workers apart"):
+        server.worker_environment(Settings(db_tasks_table="tasks"), 2)
+
+
+def test_main(monkeypatch: pytest.MonkeyPatch):
+    """Test the server runs the app by import string, so it can be loaded by every worker."""
+    calls = []
+    uvicorn = types.SimpleNamespace(run=lambda app, **options: calls.append((app, options)))
+    monkeypatch.setattr(server.importlib, "import_module", lambda name: uvicorn)
+    monkeypatch.setenv("CHANGES_BACKEND", "memory")
+    config = Settings(db_tasks_table="tasks", server_workers=2, idempotency_backend="dynamodb")
+    monkeypatch.setattr(server, "settings", config)
+
+    assert server.main() == 0
+    assert calls == [("app.main:app", server.server_options(config))]
+    assert os.environ["CHANGES_BACKEND"] == "none"
+
+    monkeypatch.setattr(server, "settings", config.model_copy(update={"idempotency_backend": "memory"}))
+    assert server.main() == 1
+    assert len(calls) == 1
+
+
+def test_main_without_uvicorn(monkeypatch: pytest.MonkeyPatch, capsys):
+    """Test the server exits with an error when uvicorn is not installed."""
+
+    def import_module(name: str) -> None:
+        raise ImportError(name)
+
+    monkeypatch.setattr(server.importlib, "import_module", import_module)
+    assert server.main() == 1
+    assert "requires uvicorn" in capsys.readouterr().err
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.app.singleflight import AsyncSingleFlight, SingleFlight, SingleFlightStats
+
+CALLERS = 5
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run the async tests on asyncio."""
+    return "asyncio"
+
+
+def test_single_flight():
+    """Test concurrent calls for the same key share the leader's result, and calls for other keys do not."""
+    flight: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn() -> int:
+        calls.append(1)
+        started.set()
+        release.wait()
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        leader = executor.submit(flight.do, "a", fn)
+        started.wait()
+        followers = [executor.submit(flight.do, "a", fn) for _ in range(CALLERS - 1)]
+        while flight.stats.coalesced < CALLERS - 1:
+            threading.Event().wait(0.001)
+        release.set()
+
+        assert leader.result() == (1, False)
+        assert [follower.result() for follower in followers] == [(1, True)] * (CALLERS - 1)
+
+    assert flight.do("a", lambda: 2) == (2, False)
+    assert flight.do("b", lambda: 3) == (3, False)
+    assert flight.stats == SingleFlightStats(leaders=3, coalesced=CALLERS - 1)
+
+
+def test_single_flight_error():
+    """Test the exception of the leader's call is raised to every caller and the key is not kept."""
+    flight: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fn() -> int:
+        started.set()
+        release.wait()
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "a", fn)
+        started.wait()
+        follower = executor.submit(flight.do, "a", fn)
+        while flight.stats.coalesced < 1:
+            threading.Event().wait(0.001)
+        release.set()
+
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="failed"):
+                future.result()
+
+    assert flight.do("a", lambda: 1) == (1, False)
+
+
+@pytest.mark.anyio
+async def test_async_single_flight():
+    """Test concurrent coroutines for the same key share the leader's result or exception."""
+    flight: AsyncSingleFlight[int] = AsyncSingleFlight()
+    calls = []
+
+    async def fn() -> int:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    results = await asyncio.gather(*(flight.do("a", fn) for _ in range(CALLERS)))
+    assert results == [(1, False)] + [(1, True)] * (CALLERS - 1)
+    assert await flight.do("a", fn) == (2, False)
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    results = await asyncio.gather(flight.do("b", fail), flight.do("b", fn), return_exceptions=True)
+    assert [str(result) for result in results] == ["failed", "failed"]
+    assert flight.stats == SingleFlightStats(leaders=3, coalesced=CALLERS)
+
+
+@pytest.mark.anyio
+async def test_async_single_flight_leader_cancelled():
+    """Test a waiting coroutine makes the call again if the leader is cancelled."""
+    flight: AsyncSingleFlight[int] = AsyncSingleFlight()
+
+    async def fn() -> int:
+        await asyncio.sleep(0.01)
+        return 1
+
+    leader = asyncio.create_task(flight.do("a", fn))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("a", fn))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == (1, False)
+    assert leader.cancelled()